@@ -28,6 +28,48 @@ app.conf.beat_schedule = {
         "schedule": 60.0,  # every minute
     },
 
+    # 🔹 Recommender — rescore customers with new ratings/interactions
+    "recommender-precompute-top-n": {
+        "task": "recommender.tasks.precompute_top_n_recommendations",
+        "schedule": 900.0,  # every 15 minutes
+    },
+
+    # 🔹 Recommender — apply changed Items to the TF-IDF content index
+    "recommender-refresh-content-index": {
+        "task": "recommender.tasks.refresh_content_index",
+        "schedule": 600.0,  # every 10 minutes
+    },
+
+    # 🔹 Recommender — re-mine co-purchase rules for cross-sell / upsell
+    "recommender-mine-association-rules": {
+        "task": "recommender.tasks.mine_association_rules",
+        "schedule": crontab(hour=2, minute=30),  # nightly
+    },
+
+    # 🔹 Recommender — patch item similarities from new ratings/interactions
+    "recommender-update-item-cooccurrence": {
+        "task": "recommender.tasks.update_item_cooccurrence",
+        "schedule": 900.0,  # every 15 minutes
+    },
+
+    # 🔹 Recommender — re-sign customers with new purchases in the MinHash index
+    "recommender-refresh-customer-similarity": {
+        "task": "recommender.tasks.refresh_customer_similarity_index",
+        "schedule": 600.0,  # every 10 minutes
+    },
+
+    # 🔹 Recommender — time-decayed popularity per branch / segment / category
+    "recommender-refresh-product-popularity": {
+        "task": "recommender.tasks.refresh_product_popularity",
+        "schedule": 3600.0,  # hourly
+    },
+
+    # 🔹 Recommender — upsell / cross-sell rules evaluated over all open leads
+    "recommender-build-lead-rule-suggestions": {
+        "task": "recommender.tasks.build_lead_rule_suggestions",
+        "schedule": crontab(hour=3, minute=0),  # nightly
+    },
+
     # Example: your email sender tasks (uncomment when ready)
     # 'send-hot-lead-emails-every-day-11-12': {
     #     'task': 'email_sender.tasks.send_hot_lead_emails',
@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 import os
 from sklearn.metrics.pairwise import cosine_similarity
+from recommender.artifacts import save_frame
 
 # Paths
 input_path = os.path.join(os.getcwd(), "trained_models", "recsys_interactions_cleaned.csv")
@@ -28,7 +29,12 @@ print(similarity_df.head())
 pivot_df.to_csv(matrix_path)
 similarity_df.to_csv(model_path)
 
+# memory-mapped copies read by the recommender (similarity last: it versions the pair)
+save_frame(matrix_path, pivot_df)
+save_frame(model_path, similarity_df)
+
 print(f"\n💾 Saved matrices:")
 print(f"User–Item Matrix → {matrix_path}")
 print(f"User Similarity Matrix → {model_path}")
+print("(+ .npy/.json artifacts next to each CSV)")
 print("\n✅ Training completed successfully!")
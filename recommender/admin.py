@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Item, Rating, SavedModel, Interaction, PestRecommendation
+from .models import Item, Rating, SavedModel, Interaction, PestRecommendation, PrecomputedRecommendation
 from crmapp.models import SentMessageLog  # only CRM log model
 
  
@@ -9,6 +9,7 @@ admin.site.register(Rating)
 admin.site.register(SavedModel)
 admin.site.register(Interaction)
 admin.site.register(PestRecommendation)
+admin.site.register(PrecomputedRecommendation)
 
 # Register CRM logs separately if needed
 # admin.site.register(MessageTemplates)
@@ -0,0 +1,202 @@
+# recommender/als.py
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+from threadpoolctl import threadpool_limits
+
+
+class ImplicitALS:
+    """
+    Implicit-feedback matrix factorization with alternating least squares
+    (Hu, Koren & Volinsky): every observed (user, item) cell is a preference
+    p=1 with confidence c = 1 + alpha * value, unobserved cells are p=0, c=1.
+
+    Each half-step solves one small (factors x factors) system per user (or
+    item). Rows are grouped into blocks of similar length that are solved with
+    batched matmul/solve calls in a thread pool; numpy releases the GIL inside
+    those calls, so blocks run on all cores.
+    """
+
+    def __init__(self, factors=64, regularization=0.1, alpha=40.0, iterations=15,
+                 n_jobs=None, block_size=512, patience=2, eval_k=10, random_state=0):
+        self.factors = factors
+        self.regularization = regularization
+        self.alpha = alpha
+        self.iterations = iterations
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        self.block_size = block_size
+        self.patience = patience
+        self.eval_k = eval_k
+        self.random_state = random_state
+
+        self.user_factors = None
+        self.item_factors = None
+        self.history = []          # [{"iteration", "recall", "seconds"}, ...]
+        self.best_iteration = None
+
+    # ------------------------
+    # Training
+    # ------------------------
+    def fit(self, user_items, validation=None):
+        """
+        user_items: sparse (n_users x n_items) interaction strengths.
+        validation: optional sparse matrix of held-out interactions (same shape);
+        training stops once recall@eval_k has not improved for `patience` iterations
+        and the best factors are kept.
+        """
+        Cui = sp.csr_matrix(user_items, dtype=np.float32)
+        Cui.eliminate_zeros()
+        Ciu = Cui.T.tocsr()
+        n_users, n_items = Cui.shape
+
+        rng = np.random.default_rng(self.random_state)
+        scale = 0.01
+        self.user_factors = (rng.standard_normal((n_users, self.factors)) * scale).astype(np.float32)
+        self.item_factors = (rng.standard_normal((n_items, self.factors)) * scale).astype(np.float32)
+        self.history = []
+        self.best_iteration = None
+
+        best_recall, best, stale = -1.0, None, 0
+        # one BLAS thread per worker so the pool, not BLAS, uses the cores
+        with threadpool_limits(limits=1 if self.n_jobs > 1 else None), \
+                ThreadPoolExecutor(max_workers=self.n_jobs) as pool:
+            for iteration in range(1, self.iterations + 1):
+                started = time.perf_counter()
+                self.user_factors = self._solve(Cui, self.item_factors, pool)
+                self.item_factors = self._solve(Ciu, self.user_factors, pool)
+                entry = {"iteration": iteration, "seconds": time.perf_counter() - started}
+
+                if validation is not None:
+                    recall = self.recall_at_k(Cui, validation, self.eval_k)
+                    entry["recall"] = recall
+                    if recall > best_recall:
+                        best_recall, stale = recall, 0
+                        best = (self.user_factors.copy(), self.item_factors.copy())
+                        self.best_iteration = iteration
+                    else:
+                        stale += 1
+                self.history.append(entry)
+                if validation is not None and stale >= self.patience:
+                    break
+
+        if best is not None:
+            self.user_factors, self.item_factors = best
+        elif self.best_iteration is None:
+            self.best_iteration = len(self.history)
+        return self
+
+    def partial_fit(self, user_items, users, items, iterations=2):
+        """
+        Warm start: keep the current factors (already aligned to `user_items`,
+        new rows initialised by the caller) and re-solve only the given user
+        and item rows. Cost grows with the changed rows, not the history.
+        """
+        Cui = sp.csr_matrix(user_items, dtype=np.float32)
+        Cui.eliminate_zeros()
+        Ciu = Cui.T.tocsr()
+        users = np.asarray(sorted(users), dtype=np.int64)
+        items = np.asarray(sorted(items), dtype=np.int64)
+
+        with threadpool_limits(limits=1 if self.n_jobs > 1 else None), \
+                ThreadPoolExecutor(max_workers=self.n_jobs) as pool:
+            for _ in range(iterations):
+                started = time.perf_counter()
+                self.user_factors = self._solve(Cui, self.item_factors, pool, rows=users, out=self.user_factors)
+                self.item_factors = self._solve(Ciu, self.user_factors, pool, rows=items, out=self.item_factors)
+                self.history.append({"iteration": len(self.history) + 1, "seconds": time.perf_counter() - started,
+                                     "partial": True})
+        return self
+
+    def _solve(self, Cui, Y, pool, rows=None, out=None):
+        """
+        Least-squares update of the factors of every row of Cui given Y (or only
+        of `rows`, starting from a copy of `out`).
+        """
+        YtY = Y.T @ Y
+        base = YtY + self.regularization * np.eye(self.factors, dtype=np.float32)
+        if out is None:
+            out = np.zeros((Cui.shape[0], self.factors), dtype=np.float32)
+        else:
+            out = out.copy()
+            if rows is not None:
+                out[rows] = 0.0     # rows without interactions end at zero, as in a full solve
+        if Cui.nnz == 0:
+            return out
+
+        def solve_block(rows):
+            # rows have similar interaction counts (see _blocks), so padding
+            # them to the longest one costs little
+            lengths = np.diff(Cui.indptr)[rows]
+            offsets = np.arange(lengths.max())
+            mask = offsets[None, :] < lengths[:, None]
+            pos = np.where(mask, Cui.indptr[rows][:, None] + offsets[None, :], 0)
+            Yu = Y[Cui.indices[pos]]                                     # b x L x f
+            extra = np.where(mask, self.alpha * Cui.data[pos], 0.0).astype(np.float32)  # c - 1
+
+            # A = YtY + Yu^T (Cu - I) Yu + reg*I ;  b = Yu^T Cu p(u)
+            YuT = np.swapaxes(Yu, 1, 2)
+            A = base + (YuT * extra[:, None, :]) @ Yu
+            b = YuT @ (mask + extra)[:, :, None]
+            out[rows] = np.linalg.solve(A, b)[:, :, 0]
+
+        list(pool.map(solve_block, self._blocks(Cui, rows)))
+        return out
+
+    def _blocks(self, Cui, rows=None):
+        """Rows with interactions, sorted by count and cut into blocks of bounded padded size."""
+        lengths = np.diff(Cui.indptr)
+        order = np.argsort(lengths, kind="stable") if rows is None else rows[np.argsort(lengths[rows], kind="stable")]
+        order = order[lengths[order] > 0]
+        budget = self.block_size * 64  # padded (rows x interactions) cells per block
+        blocks, start = [], 0
+        for end in range(1, len(order) + 1):
+            size = end - start
+            if end == len(order) or size >= self.block_size or (size + 1) * lengths[order[end]] > budget:
+                blocks.append(order[start:end])
+                start = end
+        return blocks
+
+    # ------------------------
+    # Evaluation
+    # ------------------------
+    def recall_at_k(self, train, validation, k=10, block_size=1024):
+        """Mean recall@k over users with held-out items, training items masked."""
+        train = sp.csr_matrix(train)
+        validation = sp.csr_matrix(validation)
+        users = np.flatnonzero(np.diff(validation.indptr))
+        if users.size == 0:
+            return 0.0
+        k = min(k, self.item_factors.shape[0])
+        recalls = []
+        for start in range(0, users.size, block_size):
+            block = users[start:start + block_size]
+            scores = self.user_factors[block] @ self.item_factors.T
+            seen = train[block].tocoo()
+            scores[seen.row, seen.col] = -np.inf
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row, user in enumerate(block):
+                held = validation.indices[validation.indptr[user]:validation.indptr[user + 1]]
+                recalls.append(np.isin(held, top[row]).sum() / min(len(held), k))
+        return float(np.mean(recalls))
+
+
+def train_validation_split(user_items, fraction=0.1, random_state=0):
+    """
+    Hold out `fraction` of each user's interactions (users with a single
+    interaction keep it for training). Returns (train, validation) CSR matrices.
+    """
+    coo = sp.coo_matrix(user_items)
+    rng = np.random.default_rng(random_state)
+    held = rng.random(coo.nnz) < fraction
+
+    # never hold out a user's only interaction
+    counts = np.bincount(coo.row, minlength=coo.shape[0])
+    held &= counts[coo.row] > 1
+
+    def build(mask):
+        return sp.csr_matrix((coo.data[mask], (coo.row[mask], coo.col[mask])), shape=coo.shape)
+
+    return build(~held), build(held)
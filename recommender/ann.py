@@ -0,0 +1,113 @@
+# recommender/ann.py
+import numpy as np
+from django.conf import settings
+
+
+# ------------------------
+# Settings
+# ------------------------
+ANN_TABLES = getattr(settings, "RECOMMENDER_ANN_TABLES", 8)
+ANN_BITS = getattr(settings, "RECOMMENDER_ANN_BITS", 14)
+# Candidates re-ranked with the exact dot product (0 = trust the LSH ordering)
+ANN_RERANK = getattr(settings, "RECOMMENDER_ANN_RERANK", 2000)
+# Below this many items the exact path is already fast enough
+ANN_MIN_ITEMS = getattr(settings, "RECOMMENDER_ANN_MIN_ITEMS", 2000)
+
+
+class ItemFactorLSH:
+    """
+    Random-projection LSH over CF item factors for top-K inner-product search.
+
+    Sign bits of random projections bucket item factors by direction (angular
+    LSH); the candidates found in the query's buckets are then re-ranked with
+    the exact inner product, which takes care of the vector norms. Each of the
+    `n_tables` tables keeps its codes sorted, so a lookup is a binary search
+    plus the bucket size. Queries also probe every bucket one bit away
+    (multi-probe).
+    """
+
+    def __init__(self, planes, codes, order):
+        self.planes = planes      # (n_tables, n_bits, factors)
+        self.codes = codes        # (n_tables, n_items) sorted codes
+        self.order = order        # (n_tables, n_items) item positions in code order
+
+    @property
+    def n_tables(self):
+        return self.planes.shape[0]
+
+    @property
+    def n_bits(self):
+        return self.planes.shape[1]
+
+    # ------------------------
+    # Building
+    # ------------------------
+    @classmethod
+    def build(cls, item_factors, n_tables=ANN_TABLES, n_bits=ANN_BITS, random_state=0):
+        vectors = np.asarray(item_factors, dtype=np.float32)
+        rng = np.random.default_rng(random_state)
+        planes = rng.standard_normal((n_tables, n_bits, vectors.shape[1])).astype(np.float32)
+        raw = cls._hash(planes, vectors)                 # (n_tables, n_items)
+        order = np.argsort(raw, axis=1, kind="stable")
+        codes = np.take_along_axis(raw, order, axis=1)
+        return cls(planes, codes, order.astype(np.int32))
+
+    @staticmethod
+    def _hash(planes, vectors):
+        bits = (np.einsum("tbf,nf->tnb", planes, vectors) > 0).astype(np.int64)
+        weights = 1 << np.arange(planes.shape[1], dtype=np.int64)
+        return bits @ weights
+
+    # ------------------------
+    # Querying
+    # ------------------------
+    def candidates(self, user_vector, multiprobe=True):
+        """(item positions, collision counts) of the buckets the query falls into."""
+        query = np.asarray(user_vector, dtype=np.float32)
+        keys = self._hash(self.planes, query[None, :])[:, 0]     # (n_tables,)
+        probes = keys[:, None]
+        if multiprobe:
+            flips = 1 << np.arange(self.n_bits, dtype=np.int64)
+            probes = np.hstack([probes, keys[:, None] ^ flips[None, :]])
+
+        found = []
+        for table, table_probes in enumerate(probes):
+            lo = np.searchsorted(self.codes[table], table_probes, side="left")
+            hi = np.searchsorted(self.codes[table], table_probes, side="right")
+            for a, b in zip(lo, hi):
+                if b > a:
+                    found.append(self.order[table, a:b])
+        if not found:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found), return_counts=True)
+
+    def search(self, user_vector, item_factors, top_k=10, rerank=ANN_RERANK, multiprobe=True):
+        """
+        Approximate top-K item positions for `user_vector`, best first.
+        The `rerank` most-colliding candidates are scored exactly; rerank=0 keeps
+        the collision-count order. Falls back to the exact scan when the buckets
+        return fewer than top_k candidates.
+        """
+        positions, counts = self.candidates(user_vector, multiprobe=multiprobe)
+        if positions.size < top_k:
+            return exact_top_k(item_factors, user_vector, top_k)
+
+        if rerank:
+            if positions.size > rerank:
+                keep = np.argpartition(-counts, rerank - 1)[:rerank]
+                positions = positions[keep]
+            return positions[_top_k(item_factors[positions] @ user_vector, top_k)]
+        return positions[np.argsort(-counts, kind="stable")[:top_k]]
+
+
+def exact_top_k(item_factors, user_vector, top_k=10):
+    """Exact top-K item positions by inner product (argpartition, not a full sort)."""
+    return _top_k(item_factors @ user_vector, top_k)
+
+
+def _top_k(scores, top_k):
+    n = min(top_k, len(scores))
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    part = np.argpartition(-scores, n - 1)[:n]
+    return part[np.argsort(-scores[part], kind="stable")]
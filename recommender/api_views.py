@@ -1,9 +1,9 @@
 # recommender/api_views.py
 from django.http import JsonResponse, HttpResponseBadRequest
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Count
 from recommender.models import Item
-from crmapp.models import customer_details, TaxInvoice, TaxInvoiceItem
+from recommender.association_rules import get_rule_index, customer_products, most_purchased
+from crmapp.models import customer_details
 import json
 import requests
 
@@ -72,37 +72,35 @@ def get_recommendations(request):
     })
 
 
+# -------------------------
+# Co-purchase rules -> Item titles
+# -------------------------
+def _rule_titles(ranked):
+    """Titles for [(product_id, support, confidence, lift), ...] in one query."""
+    titles = dict(Item.objects.filter(product_id__in=[r[0] for r in ranked]).values_list("product_id", "title"))
+    return [titles.get(pid, f"Product-{pid}") for pid, *_ in ranked]
+
+
+def _crosssell(purchased, top_n):
+    """Rules for the purchased products; most purchased products until rules are mined."""
+    index = get_rule_index()
+    if index is None:
+        return [(pid,) for pid in most_purchased(top_n, exclude=purchased)]
+    return index.crosssell(purchased, top_n=top_n)
+
+
 # -------------------------
 # Personalized / Collaborative recommendations (for customer)
 # Returns {"recommendations": ["Product A", "Product B", ...]}
 # -------------------------
 def user_recommendations(request, customer_id):
-    invoices = TaxInvoice.objects.filter(customer_id=customer_id)
-    if not invoices.exists():
+    purchased = customer_products(customer_id)
+    if not purchased:
         return JsonResponse({"recommendations": []})
 
-    # products this customer purchased
-    purchased_product_ids = TaxInvoiceItem.objects.filter(invoice__in=invoices).values_list("product_id", flat=True)
-
-    # Find other invoice items co-purchased by other customers (excluding customer's products)
-    co_purchased = (TaxInvoiceItem.objects
-                    .exclude(product_id__in=purchased_product_ids)
-                    .values("product_id")
-                    .annotate(cnt=Count("product_id"))
-                    .order_by("-cnt")[:8])
-
-    # Map product_id -> product title using Item model (best effort)
-    product_titles = []
-    for entry in co_purchased:
-        pid = entry["product_id"]
-        item = Item.objects.filter(id=pid).first()
-        if item:
-            product_titles.append(item.title)
-        else:
-            # fallback to product_id string if no Item row
-            product_titles.append(f"Product-{pid}")
-
-    return JsonResponse({"recommendations": product_titles})
+    # products co-purchased with this customer's products (mined association rules)
+    ranked = _crosssell(purchased, top_n=8)
+    return JsonResponse({"recommendations": _rule_titles(ranked)})
 
 
 # -------------------------
@@ -114,6 +112,13 @@ def upsell_recommendations_api(request, product_id):
     except Item.DoesNotExist:
         return JsonResponse({'error': 'Product not found.'}, status=404)
 
+    # Higher-priced products of the same category bought together with this one
+    index = get_rule_index()
+    if index is not None and base.product_id is not None:
+        rules = index.upsell(base.product_id, top_n=4)
+        if rules:
+            return JsonResponse({"product": base.title, "upsell_suggestions": _rule_titles(rules)})
+
     # Suggest higher-tier (recent) products in same category
     upsells = Item.objects.filter(category=base.category).exclude(id=base.id).order_by("-created_at")[:4]
     return JsonResponse({"product": base.title, "upsell_suggestions": [p.title for p in upsells]})
@@ -123,28 +128,12 @@ def upsell_recommendations_api(request, product_id):
 # Cross-sell suggestions (by customer)
 # -------------------------
 def cross_sell_recommendations_api(request, customer_id):
-    invoices = TaxInvoice.objects.filter(customer_id=customer_id)
-    if not invoices.exists():
+    purchased = customer_products(customer_id)
+    if not purchased:
         return JsonResponse({'cross_sell_suggestions': []})
 
-    purchased_product_ids = TaxInvoiceItem.objects.filter(invoice__in=invoices).values_list("product_id", flat=True)
-
-    co_purchased = (TaxInvoiceItem.objects
-                    .exclude(product_id__in=purchased_product_ids)
-                    .values("product_id")
-                    .annotate(cnt=Count("product_id"))
-                    .order_by("-cnt")[:6])
-
-    titles = []
-    for entry in co_purchased:
-        pid = entry["product_id"]
-        item = Item.objects.filter(id=pid).first()
-        if item:
-            titles.append(item.title)
-        else:
-            titles.append(f"Product-{pid}")
-
-    return JsonResponse({"cross_sell_suggestions": titles})
+    ranked = _crosssell(purchased, top_n=6)
+    return JsonResponse({"cross_sell_suggestions": _rule_titles(ranked)})
 
 
 # -------------------------
@@ -0,0 +1,15 @@
+# recommender/apps.py
+from django.apps import AppConfig
+
+
+class RecommenderConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'recommender'
+
+    def ready(self):
+        """Connect the result-cache invalidation signals."""
+        try:
+            import recommender.signals
+        except ImportError as e:
+            import logging
+            logging.warning(f"⚠️ Could not import recommender signals: {e}")
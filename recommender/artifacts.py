@@ -0,0 +1,144 @@
+# recommender/artifacts.py
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+
+# ------------------------
+# Artifact format
+# ------------------------
+# <base>.npy   raw matrix (np.save, opened with mmap_mode="r" so every worker
+#              shares the same pages through the OS cache)
+# <base>.json  sidecar with the row / column ids and shape/dtype
+FORMAT_NAME = "npy_matrix"
+FORMAT_VERSION = 1
+
+
+class MatrixArtifact:
+    """A matrix plus its row/column id maps, as read back from disk."""
+
+    def __init__(self, values, row_ids, col_ids, meta=None):
+        self.values = values
+        self.row_ids = row_ids
+        self.col_ids = col_ids
+        self.meta = meta or {}
+        self.row_index = {rid: i for i, rid in enumerate(row_ids)}
+        self.col_index = {cid: i for i, cid in enumerate(col_ids)}
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def row(self, row_id):
+        """Matrix row for `row_id` (None if unknown)."""
+        pos = self.row_index.get(row_id)
+        return None if pos is None else self.values[pos]
+
+    def to_frame(self):
+        """pandas view (copies; meant for tooling, not the request path)."""
+        return pd.DataFrame(np.asarray(self.values), index=self.row_ids, columns=self.col_ids)
+
+
+def paths(base):
+    """(<base>.npy, <base>.json) for an artifact base path (extension optional)."""
+    base = os.path.splitext(base)[0]
+    return base + ".npy", base + ".json"
+
+
+def exists(base):
+    return all(os.path.exists(p) for p in paths(base))
+
+
+def is_current(base):
+    """
+    exists(base) and the .npy is not older than `base` itself (the CSV it
+    was converted from), so a CSV rewritten without its artifact wins.
+    """
+    if not exists(base):
+        return False
+    try:
+        return os.path.getmtime(paths(base)[0]) >= os.path.getmtime(base)
+    except OSError:             # no source file next to the artifact
+        return True
+
+
+# ------------------------
+# Writing
+# ------------------------
+def save_matrix(base, values, row_ids, col_ids, dtype=np.float32, **meta):
+    """
+    Write `values` as <base>.npy plus the <base>.json sidecar. Both files are
+    written to temporary names and renamed, the .npy last, so readers keyed on
+    the .npy mtime never pick up a half-written pair.
+    """
+    npy_path, json_path = paths(base)
+    values = np.ascontiguousarray(values, dtype=dtype)
+    row_ids, col_ids = _plain_ids(row_ids), _plain_ids(col_ids)
+    if values.shape != (len(row_ids), len(col_ids)):
+        raise ValueError(f"Matrix shape {values.shape} does not match ids ({len(row_ids)}, {len(col_ids)})")
+
+    sidecar = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "file": os.path.basename(npy_path),
+        "shape": list(values.shape),
+        "dtype": values.dtype.str,
+        "row_ids": row_ids,
+        "col_ids": col_ids,
+        "created_at": time.time(),
+        "meta": meta,
+    }
+    with open(json_path + ".tmp", "w") as f:
+        json.dump(sidecar, f)
+    with open(npy_path + ".tmp", "wb") as f:
+        np.save(f, values)
+    os.replace(json_path + ".tmp", json_path)
+    os.replace(npy_path + ".tmp", npy_path)
+    return npy_path
+
+
+def save_frame(base, df, dtype=np.float32, fill=0, **meta):
+    """Write a DataFrame (index = row ids, columns = col ids)."""
+    values = df.fillna(fill).to_numpy(dtype=dtype)
+    return save_matrix(base, values, df.index, df.columns, dtype=dtype, **meta)
+
+
+def convert_csv(csv_path, dtype=np.float32, fill=0):
+    """Convert a matrix CSV (first column = row ids) into an artifact next to it."""
+    df = pd.read_csv(csv_path, index_col=0)
+    return save_frame(csv_path, df, dtype=dtype, fill=fill, source=os.path.basename(csv_path))
+
+
+# ------------------------
+# Reading
+# ------------------------
+def load_matrix(base, mmap_mode="r"):
+    """
+    Open an artifact. With the default mmap_mode="r" nothing is parsed or
+    copied: pages are read lazily and shared between processes.
+    """
+    npy_path, json_path = paths(base)
+    with open(json_path) as f:
+        sidecar = json.load(f)
+    if sidecar.get("format") != FORMAT_NAME or sidecar.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported matrix artifact {json_path}: {sidecar.get('format')} v{sidecar.get('version')}")
+
+    values = np.load(npy_path, mmap_mode=mmap_mode, allow_pickle=False)
+    if list(values.shape) != sidecar["shape"]:
+        raise ValueError(f"{npy_path} shape {values.shape} does not match its sidecar {sidecar['shape']}")
+    return MatrixArtifact(values, sidecar["row_ids"], sidecar["col_ids"], sidecar.get("meta"))
+
+
+def _plain_ids(ids):
+    """JSON-safe ids: ints where the labels are numeric, strings otherwise."""
+    ids = list(ids)
+    try:
+        as_int = [int(i) for i in ids]
+        if all(str(a) == str(i).split(".")[0] for a, i in zip(as_int, ids)):
+            return as_int
+    except (TypeError, ValueError):
+        pass
+    return [str(i) for i in ids]
@@ -0,0 +1,248 @@
+# recommender/association_rules.py
+import os
+from collections import defaultdict
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+from django.db.models import Count, Q
+
+from crmapp.models import Product, TaxInvoiceItem, ServiceProduct, CustomerPurchase
+from recommender.models import SavedModel
+from recommender.model_registry import model_registry
+
+
+# ------------------------
+# Settings
+# ------------------------
+RULES_MODEL = "association_rules"
+RULES_PATH = os.path.join(settings.BASE_DIR, "models", "association_rules.joblib")
+MIN_SUPPORT_COUNT = getattr(settings, "RECOMMENDER_RULES_MIN_SUPPORT_COUNT", 2)
+MIN_CONFIDENCE = getattr(settings, "RECOMMENDER_RULES_MIN_CONFIDENCE", 0.05)
+MIN_LIFT = getattr(settings, "RECOMMENDER_RULES_MIN_LIFT", 1.0)
+MAX_CONSEQUENTS = getattr(settings, "RECOMMENDER_RULES_MAX_CONSEQUENTS", 20)
+CHUNK_SIZE = 5000
+
+
+class RuleIndex:
+    """
+    Pairwise co-purchase rules A -> B mined from baskets, stored as
+    {antecedent product_id: [(consequent, support, confidence, lift), ...]}
+    sorted by lift, so a lookup is one dict access.
+
+    support    = baskets with A and B / all baskets
+    confidence = baskets with A and B / baskets with A
+    lift       = confidence / (baskets with B / all baskets)
+    """
+
+    def __init__(self, rules, product_info, popular, n_baskets):
+        self.rules = rules                # {pid: [(pid, support, confidence, lift), ...]}
+        self.product_info = product_info  # {pid: {"category": str, "price": float | None}}
+        self.popular = popular            # product ids by basket frequency
+        self.n_baskets = n_baskets
+
+    def __len__(self):
+        return sum(len(v) for v in self.rules.values())
+
+    def consequents(self, product_id, top_n=5):
+        return self.rules.get(product_id, [])[:top_n]
+
+    def crosssell(self, product_ids, exclude=(), top_n=5):
+        """
+        Products bought together with any of `product_ids`, best rule per
+        consequent (highest lift), excluding `exclude`; popular products fill up.
+        """
+        exclude = set(exclude) | set(product_ids)
+        best = {}
+        for pid in product_ids:
+            for rule in self.rules.get(pid, ()):
+                if rule[0] in exclude:
+                    continue
+                if rule[0] not in best or rule[3] > best[rule[0]][3]:
+                    best[rule[0]] = rule
+        ranked = sorted(best.values(), key=lambda r: (r[3], r[2]), reverse=True)[:top_n]
+        for pid in self.popular:
+            if len(ranked) >= top_n:
+                break
+            if pid not in exclude and pid not in best:
+                ranked.append((pid, None, None, None))
+        return ranked
+
+    def upsell(self, product_id, top_n=5):
+        """Co-purchased products of the same category with a higher average price."""
+        base = self.product_info.get(product_id) or {}
+        base_price = base.get("price")
+        result = []
+        for rule in self.rules.get(product_id, ()):
+            info = self.product_info.get(rule[0]) or {}
+            if info.get("category") != base.get("category"):
+                continue
+            if base_price is not None and (info.get("price") is None or info["price"] <= base_price):
+                continue
+            result.append(rule)
+            if len(result) >= top_n:
+                break
+        return result
+
+
+# ------------------------
+# Baskets
+# ------------------------
+def product_name_lookup():
+    """Normalized product_name -> product_id (TaxInvoiceItem only stores the name)."""
+    lookup = {}
+    for pid, name in Product.objects.values_list("product_id", "product_name").iterator(chunk_size=CHUNK_SIZE):
+        if name:
+            lookup.setdefault(name.strip().lower(), pid)
+    return lookup
+
+
+def product_ids_for_names(names):
+    """product_name_lookup() restricted to `names`: one query over the matching Products only."""
+    wanted = {(name or "").strip().lower() for name in names} - {""}
+    if not wanted:
+        return {}
+    q = Q()
+    for name in wanted:
+        q |= Q(product_name__iexact=name)
+    lookup = {}
+    for pid, name in Product.objects.filter(q).order_by("product_id").values_list("product_id", "product_name"):
+        lookup.setdefault(name.strip().lower(), pid)
+    return lookup
+
+
+def collect_baskets():
+    """
+    Baskets from the three purchase sources, plus per-product price samples:
+      - TaxInvoiceItem grouped by invoice (names mapped to Product)
+      - ServiceProduct grouped by service
+      - CustomerPurchase grouped by customer (no order id is recorded)
+    """
+    baskets = defaultdict(set)
+    prices = defaultdict(list)
+    names = product_name_lookup()
+
+    invoice_items = TaxInvoiceItem.objects.values_list("tax_invoice_id", "product_name", "price")
+    for invoice_id, name, price in invoice_items.iterator(chunk_size=CHUNK_SIZE):
+        pid = names.get((name or "").strip().lower())
+        if pid is not None:
+            baskets[("invoice", invoice_id)].add(pid)
+            if price is not None:
+                prices[pid].append(float(price))
+
+    service_items = ServiceProduct.objects.values_list("service_id", "product_id", "price")
+    for service_id, pid, price in service_items.iterator(chunk_size=CHUNK_SIZE):
+        baskets[("service", service_id)].add(pid)
+        if price is not None:
+            prices[pid].append(float(price))
+
+    purchases = CustomerPurchase.objects.values_list("customer_id", "product_id")
+    for customer_id, pid in purchases.iterator(chunk_size=CHUNK_SIZE):
+        baskets[("customer", customer_id)].add(pid)
+
+    return list(baskets.values()), prices
+
+
+# ------------------------
+# Mining
+# ------------------------
+def mine_rules(baskets, prices=None, min_support_count=MIN_SUPPORT_COUNT, min_confidence=MIN_CONFIDENCE,
+               min_lift=MIN_LIFT, max_consequents=MAX_CONSEQUENTS):
+    """Pairwise rules from a list of product-id sets, counted with one sparse B^T B."""
+    product_ids = sorted({pid for basket in baskets for pid in basket})
+    position = {pid: i for i, pid in enumerate(product_ids)}
+    rows = np.repeat(np.arange(len(baskets)), [len(b) for b in baskets])
+    cols = np.fromiter((position[pid] for b in baskets for pid in b), dtype=np.int64, count=len(rows))
+    B = sp.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(len(baskets), len(product_ids)))
+
+    n = len(baskets)
+    item_counts = np.asarray(B.sum(axis=0)).ravel()
+    pairs = (B.T @ B).tocoo()
+    keep = (pairs.row != pairs.col) & (pairs.data >= min_support_count)
+    a, b, both = pairs.row[keep], pairs.col[keep], pairs.data[keep].astype(np.float64)
+
+    support = both / max(n, 1)
+    confidence = both / item_counts[a]
+    lift = confidence / (item_counts[b] / n)
+    keep = (confidence >= min_confidence) & (lift >= min_lift)
+    a, b, support, confidence, lift = a[keep], b[keep], support[keep], confidence[keep], lift[keep]
+
+    rules = defaultdict(list)
+    order = np.lexsort((-confidence, -lift, a))     # by antecedent, then lift, confidence
+    for i in order:
+        antecedent = product_ids[a[i]]
+        if len(rules[antecedent]) < max_consequents:
+            rules[antecedent].append(
+                (product_ids[b[i]], float(support[i]), float(confidence[i]), float(lift[i]))
+            )
+
+    categories = dict(Product.objects.filter(product_id__in=product_ids).values_list("product_id", "category"))
+    prices = prices or {}
+    product_info = {
+        pid: {
+            "category": categories.get(pid),
+            "price": float(np.mean(prices[pid])) if prices.get(pid) else None,
+        }
+        for pid in product_ids
+    }
+    popular = [product_ids[i] for i in np.argsort(-item_counts, kind="stable")]
+    return RuleIndex(dict(rules), product_info, popular, n)
+
+
+def build_rule_index(**thresholds):
+    """Mine every basket source and publish the index as SavedModel "association_rules"."""
+    baskets, prices = collect_baskets()
+    index = mine_rules(baskets, prices, **thresholds)
+
+    os.makedirs(os.path.dirname(RULES_PATH), exist_ok=True)
+    joblib.dump(index, RULES_PATH + ".tmp")
+    os.replace(RULES_PATH + ".tmp", RULES_PATH)
+    SavedModel.objects.update_or_create(name=RULES_MODEL, defaults={"file_path": RULES_PATH})
+    model_registry.invalidate(RULES_MODEL)
+    return index
+
+
+def get_rule_index():
+    """Published RuleIndex (cached in the model registry), or None."""
+    try:
+        return model_registry.get(RULES_MODEL, joblib.load)
+    except Exception as e:
+        print("⚠️ Error loading association rules:", e)
+        return None
+
+
+def customer_products(customer_id):
+    """Product ids the customer bought (invoices, services, purchases)."""
+    products = set(CustomerPurchase.objects.filter(customer_id=customer_id).values_list("product_id", flat=True))
+    products |= set(
+        ServiceProduct.objects.filter(service__customer_id=customer_id).values_list("product_id", flat=True)
+    )
+    invoice_names = set(
+        TaxInvoiceItem.objects.filter(tax_invoice__customer_id=customer_id).values_list("product_name", flat=True)
+    )
+    if invoice_names:
+        names = product_ids_for_names(invoice_names)
+        products |= {names[n.strip().lower()] for n in invoice_names if n and n.strip().lower() in names}
+    return products
+
+
+def most_purchased(top_n=5, exclude=()):
+    """
+    Product ids by invoice line count, excluding `exclude`: the fallback of
+    the cross-sell endpoints while no rule index is published.
+    """
+    exclude = set(exclude)
+    counts = (
+        TaxInvoiceItem.objects.values("product_name")
+        .annotate(lines=Count("id"))
+        .order_by("-lines", "product_name")[:(top_n + len(exclude)) * 2]
+    )
+    counts = [(row["product_name"], row["lines"]) for row in counts]
+    names = product_ids_for_names(name for name, _ in counts)
+    ranked = []
+    for name, _ in counts:
+        pid = names.get((name or "").strip().lower())
+        if pid is not None and pid not in exclude and pid not in ranked:
+            ranked.append(pid)
+    return ranked[:top_n]
@@ -0,0 +1,199 @@
+# recommender/benchmark.py
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from recommender.models import Rating, Item, PestRecommendation
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# ------------------------
+# Entry points: (label, argument kind, callable)
+# ------------------------
+def _generate_recommendations(customer_id):
+    from recommender.recommender_engine import generate_recommendations_for_user
+    return list(generate_recommendations_for_user(customer_id, top_n=10))
+
+
+def _cf(customer_id):
+    from recommender.utils import recommended_items_cf
+    return recommended_items_cf(customer_id, top_k=10)
+
+
+def _content(item_id):
+    from recommender.utils import recommended_items_content
+    return recommended_items_content(item_id, top_k=10)
+
+
+def _crosssell(customer_id):
+    from recommender.recommender_engine import get_crosssell_recommendations
+    return list(get_crosssell_recommendations(customer_id, top_n=10))
+
+
+_factory = RequestFactory()
+
+
+def _dashboard(params):
+    from recommender.views import recommendation_dashboard
+    return recommendation_dashboard(_factory.get("/recommender/dashboard/", params))
+
+
+ENTRY_POINTS = {
+    "generate_recommendations_for_user": ("customer", _generate_recommendations),
+    "recommended_items_cf": ("customer", _cf),
+    "recommended_items_content": ("item", _content),
+    "get_crosssell_recommendations": ("customer", _crosssell),
+    "dashboard": ("dashboard", _dashboard),
+}
+
+
+# ------------------------
+# Inputs
+# ------------------------
+def _sample_inputs(kind, n, rng):
+    if kind == "customer":
+        ids = list(Rating.objects.filter(customer_id__isnull=False).values_list("customer_id", flat=True).distinct()[:10000])
+    elif kind == "item":
+        ids = list(Item.objects.values_list("id", flat=True)[:10000])
+    else:
+        types = [key for key, _ in PestRecommendation.RECOMMENDATION_TYPES_CHOICES]
+        pages = max(1, PestRecommendation.objects.count() // 10)
+        # plain listing, type filter, search, deep page
+        ids = [{}, {"type": types[0]}, {"search": "Synthetic"}, {"sort": "customer_name", "page": str(pages // 2)}]
+    if not ids:
+        return []
+    return [ids[i] for i in rng.integers(0, len(ids), size=n)]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _percentiles(values):
+    if not values:
+        return {}
+    values = np.asarray(values)
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "mean": round(float(values.mean()), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+# ------------------------
+# Runner
+# ------------------------
+def benchmark_entry_point(name, iterations=100, warmup=5, seed=0):
+    """
+    Call one entry point `iterations` times on sampled inputs. Latency in ms,
+    queries per call, peak Python allocation of one traced call, process peak
+    RSS after the run.
+    """
+    kind, func = ENTRY_POINTS[name]
+    rng = np.random.default_rng(seed)
+    inputs = _sample_inputs(kind, warmup + iterations, rng)
+    if not inputs:
+        return {"name": name, "error": f"no {kind} rows to benchmark"}
+
+    errors = 0
+    for arg in inputs[:warmup]:          # model loads / caches
+        try:
+            func(arg)
+        except Exception:
+            errors += 1
+
+    latencies, queries = [], []
+    for arg in inputs[warmup:]:
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            try:
+                func(arg)
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - started) * 1000.0)
+        queries.append(len(captured.captured_queries))
+
+    # separate traced call: tracemalloc would distort the timings above
+    tracemalloc.start()
+    try:
+        func(inputs[-1])
+    except Exception:
+        pass
+    _, peak_alloc = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "iterations": len(latencies),
+        "errors": errors,
+        "latency_ms": _percentiles(latencies),
+        "queries": {"mean": round(float(np.mean(queries)), 2), "max": int(max(queries))},
+        "peak_alloc_mb": round(peak_alloc / (1024 * 1024), 2),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def run_benchmark(entry_points=None, iterations=100, warmup=5, seed=0, output=None):
+    """Benchmark every entry point; returns the report (also written as JSON to `output`)."""
+    entry_points = entry_points or list(ENTRY_POINTS)
+    results = {}
+    for name in entry_points:
+        try:
+            results[name] = benchmark_entry_point(name, iterations, warmup, seed)
+        except Exception as e:
+            print(f"⚠️ Benchmark {name} failed:", e)
+            results[name] = {"name": name, "error": str(e)}
+
+    report = {
+        "generated_at": timezone.now().isoformat(),
+        "python": platform.python_version(),
+        "database": connection.vendor,
+        "dataset": {
+            "ratings": Rating.objects.count(),
+            "items": Item.objects.count(),
+            "recommendations": PestRecommendation.objects.count(),
+        },
+        "iterations": iterations,
+        "results": results,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def compare_reports(baseline, current):
+    """{entry point: {metric: (baseline, current, % change)}} for p50/p95/p99 and mean queries."""
+    diff = {}
+    for name, result in current.get("results", {}).items():
+        before = baseline.get("results", {}).get(name)
+        if not before or "error" in before or "error" in result:
+            continue
+        rows = {}
+        pairs = [(p, before["latency_ms"].get(p), result["latency_ms"].get(p)) for p in ("p50", "p95", "p99")]
+        pairs.append(("queries", before["queries"]["mean"], result["queries"]["mean"]))
+        for metric, old, new in pairs:
+            if old is None or new is None:
+                continue
+            change = (new - old) / old * 100.0 if old else 0.0
+            rows[metric] = (old, new, round(change, 1))
+        diff[name] = rows
+    return diff
@@ -0,0 +1,266 @@
+# recommender/content_index.py
+import os
+import threading
+import time
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+from django.db.models import Q
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from recommender.models import Item, SavedModel
+from recommender.model_registry import model_registry
+
+
+# ------------------------
+# Settings
+# ------------------------
+CONTENT_INDEX_MODEL = "content_index"
+CONTENT_INDEX_PATH = os.path.join(settings.BASE_DIR, "models", "content_index.joblib")
+# Seconds between two delta queries against the Item table (serving processes).
+REFRESH_INTERVAL = getattr(settings, "RECOMMENDER_CONTENT_INDEX_REFRESH_INTERVAL", 60.0)
+# Refit vocabulary + IDF once this share of rows was added/changed since the last fit.
+REFIT_FRACTION = getattr(settings, "RECOMMENDER_CONTENT_INDEX_REFIT_FRACTION", 0.2)
+TEXT_FIELDS = ("title", "description", "category", "tags")
+
+
+class ContentIndex:
+    """
+    TF-IDF index over Item text: fitted vectorizer (vocabulary + IDF), an
+    L2-normalized sparse matrix with one row per Item, and id -> row maps.
+
+    refresh() only transforms Items whose updated_at moved past the watermark
+    (new rows are appended, changed rows replaced, deleted rows dropped)
+    with the existing vocabulary; the vectorizer is refitted (by the task,
+    never on the serving path) once enough of the catalogue changed since
+    the last fit.
+    """
+
+    def __init__(self):
+        self.vectorizer = None
+        self.matrix = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.item_ids = []
+        self.product_ids = []
+        self.item_index = {}
+        self.product_index = {}
+        self.watermark = None       # (updated_at, id) of the newest row seen
+        self.fitted_rows = 0
+        self.changed_since_fit = 0
+        self.refreshed_at = None
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    # ------------------------
+    # Building
+    # ------------------------
+    def rebuild(self):
+        """Fit the vectorizer on every Item and index all of them."""
+        rows = list(self._queryset().order_by("updated_at", "id"))
+        self.__init__()
+        if not rows:
+            self.refreshed_at = time.monotonic()
+            return self
+
+        self.vectorizer = TfidfVectorizer(max_features=5000, stop_words="english", dtype=np.float32)
+        matrix = self.vectorizer.fit_transform([self._text(r) for r in rows])
+        self._set_rows(rows, matrix.tocsr())
+        self.fitted_rows = len(rows)
+        self.refreshed_at = time.monotonic()
+        return self
+
+    def refresh(self, refit=True):
+        """
+        Apply Item inserts/updates/deletes since the watermark. Returns rows changed.
+
+        Deletions are detected from the row count: the full id list is only
+        read when the table holds fewer rows than the index plus the new ones.
+        refit=False never refits the vocabulary (serving processes); the
+        changes are still counted so the next refitting refresh sees them.
+        """
+        if self.vectorizer is None:
+            if not refit:
+                return 0
+            self.rebuild()
+            return len(self)
+
+        # counted before reading the delta: rows inserted in between only cause a spurious id scan
+        live_rows = Item.objects.count()
+        qs = self._queryset().order_by("updated_at", "id")
+        if self.watermark is not None:
+            ts, last_id = self.watermark
+            qs = qs.filter(Q(updated_at__gt=ts) | Q(updated_at=ts, id__gt=last_id))
+        changed = list(qs)
+
+        added = sum(1 for r in changed if r["id"] not in self.item_index)
+        deleted = []
+        if live_rows < len(self) + added:
+            live_ids = set(Item.objects.values_list("id", flat=True))
+            deleted = [i for i in self.item_ids if i not in live_ids]
+        if not changed and not deleted:
+            self.refreshed_at = time.monotonic()
+            return 0
+
+        self.changed_since_fit += len(changed) + len(deleted)
+        if refit and self.changed_since_fit > REFIT_FRACTION * max(self.fitted_rows, 1):
+            self.rebuild()
+            return len(changed) + len(deleted)
+
+        # keep untouched rows, then append the (re)vectorized ones
+        replaced = {r["id"] for r in changed} | set(deleted)
+        keep = [pos for pos, item_id in enumerate(self.item_ids) if item_id not in replaced]
+        kept_rows = [{"id": self.item_ids[p], "product_id": self.product_ids[p]} for p in keep]
+        parts = [self.matrix[keep]]
+        if changed:
+            parts.append(self.vectorizer.transform([self._text(r) for r in changed]).tocsr())
+        self._set_rows(kept_rows + changed, sp.vstack(parts, format="csr"))
+        self.refreshed_at = time.monotonic()
+        return len(changed) + len(deleted)
+
+    @staticmethod
+    def _queryset():
+        return Item.objects.values("id", "product_id", "updated_at", *TEXT_FIELDS)
+
+    @staticmethod
+    def _text(row):
+        return " ".join(str(row.get(f) or "") for f in TEXT_FIELDS)
+
+    def _set_rows(self, rows, matrix):
+        self.matrix = matrix.astype(np.float32)
+        self.item_ids = [r["id"] for r in rows]
+        self.product_ids = [r["product_id"] for r in rows]
+        self.item_index = {item_id: pos for pos, item_id in enumerate(self.item_ids)}
+        self.product_index = {pid: pos for pos, pid in enumerate(self.product_ids) if pid is not None}
+        stamped = [r for r in rows if r.get("updated_at") is not None]
+        if stamped:
+            last = max(stamped, key=lambda r: (r["updated_at"], r["id"]))
+            if self.watermark is None or (last["updated_at"], last["id"]) > self.watermark:
+                self.watermark = (last["updated_at"], last["id"])
+
+    # ------------------------
+    # Persistence
+    # ------------------------
+    def save(self, path=CONTENT_INDEX_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        state = dict(self.__dict__, refreshed_at=None)
+        joblib.dump(state, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        index = cls.__new__(cls)
+        index.__dict__.update(joblib.load(path))
+        index.refreshed_at = time.monotonic()
+        return index
+
+    def copy(self):
+        other = ContentIndex.__new__(ContentIndex)
+        other.__dict__.update(self.__dict__)
+        return other
+
+    # ------------------------
+    # Scoring
+    # ------------------------
+    def score_rows(self, rows):
+        """Mean cosine similarity of every Item to the given rows (sparse dot product)."""
+        if not rows:
+            return np.zeros(len(self), dtype=np.float32)
+        profile = self.matrix[rows].mean(axis=0)          # rows are L2-normalized
+        return np.asarray(self.matrix @ np.asarray(profile).ravel(), dtype=np.float32).ravel()
+
+    def similar_to_products(self, liked_product_ids, exclude_product_ids=(), top_k=5):
+        """[(item_id, score), ...] most similar to the liked products, excluded ones removed."""
+        rows = [self.product_index[p] for p in liked_product_ids if p in self.product_index]
+        if not rows:
+            return []
+        scores = self.score_rows(rows)
+        for pid in exclude_product_ids:
+            pos = self.product_index.get(pid)
+            if pos is not None:
+                scores[pos] = -np.inf
+
+        n = min(top_k, len(scores))
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.item_ids[i], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+
+# ------------------------
+# Published + incrementally refreshed instance
+# ------------------------
+_lock = threading.Lock()           # guards _shared / _published, never held while querying
+_refresh_lock = threading.Lock()   # one build / delta refresh per process at a time
+_shared = None
+_published = None  # artifact _shared was copied from (None: built in-process)
+
+
+def build_content_index(full=False):
+    """
+    Refresh (or rebuild) the persisted index and publish it as SavedModel
+    "content_index". Meant for the Celery task / management command.
+    """
+    index = None
+    if not full:
+        index = model_registry.get(CONTENT_INDEX_MODEL, ContentIndex.load)
+    if index is None:
+        index = ContentIndex().rebuild()
+        changed = len(index)
+    else:
+        index = index.copy()
+        changed = index.refresh()
+
+    index.save(CONTENT_INDEX_PATH)
+    SavedModel.objects.update_or_create(name=CONTENT_INDEX_MODEL, defaults={"file_path": CONTENT_INDEX_PATH})
+    model_registry.invalidate(CONTENT_INDEX_MODEL)
+    return index, changed
+
+
+def get_content_index():
+    """
+    Process-wide ContentIndex: the published artifact (reloaded when a new one
+    is saved) plus an in-memory delta refresh at most every REFRESH_INTERVAL.
+    Until an index is published, one is fitted in-process on first use.
+
+    Builds and refreshes run on a copy outside _lock, then are swapped in:
+    readers keep the current index meanwhile, and a thread finding another
+    one refreshing serves the current index instead of waiting.
+    """
+    global _shared, _published
+    published = model_registry.get(CONTENT_INDEX_MODEL, ContentIndex.load)
+    with _lock:
+        current, current_published = _shared, _published
+    if current is not None and not _is_stale(current_published, published) and not _refresh_due(current):
+        return current
+
+    if not _refresh_lock.acquire(blocking=current is None):
+        return current
+    try:
+        with _lock:     # the thread we waited for may have swapped a new one in
+            current, current_published = _shared, _published
+        if current is None or _is_stale(current_published, published):
+            updated = published.copy() if published is not None else ContentIndex().rebuild()
+        elif _refresh_due(current):
+            updated = current.copy()
+            # the vocabulary is refitted by build_content_index(), except for an
+            # in-process index built over an empty catalogue
+            updated.refresh(refit=published is None and updated.vectorizer is None)
+        else:
+            return current
+        updated.refreshed_at = time.monotonic()
+        with _lock:
+            _shared, _published = updated, published
+        return updated
+    finally:
+        _refresh_lock.release()
+
+
+def _is_stale(index_published, published):
+    """A newer artifact was published than the one the index was copied from."""
+    return published is not None and published is not index_published
+
+
+def _refresh_due(index):
+    return time.monotonic() - index.refreshed_at >= REFRESH_INTERVAL
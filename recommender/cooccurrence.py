@@ -0,0 +1,299 @@
+# recommender/cooccurrence.py
+import os
+from collections import defaultdict
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+
+from crmapp.models import TaxInvoiceItem
+from recommender.models import Rating, Interaction, SavedModel
+from recommender.model_registry import model_registry
+from recommender.rating_matrix import get_rating_matrix
+from recommender.association_rules import product_name_lookup
+
+
+# ------------------------
+# Settings
+# ------------------------
+COOCCURRENCE_MODEL = "item_cooccurrence"
+COOCCURRENCE_PATH = os.path.join(settings.BASE_DIR, "models", "item_cooccurrence.joblib")
+# Implicit weight per interaction type / invoice line, capped at the rating scale.
+INTERACTION_WEIGHTS = getattr(settings, "RECOMMENDER_INTERACTION_WEIGHTS", {
+    "view": 1.0, "click": 2.0, "call": 2.0, "purchase": 4.0, "recommend": 0.0,
+})
+INVOICE_WEIGHT = getattr(settings, "RECOMMENDER_INVOICE_WEIGHT", 4.0)
+IMPLICIT_CAP = getattr(settings, "RECOMMENDER_IMPLICIT_CAP", 5.0)
+CHUNK_SIZE = 5000
+_EPS = 1e-9
+
+
+class CooccurrenceCounters:
+    """
+    Item co-occurrence and norm counters for cosine similarity:
+
+        cooc[i][j] = sum_u w(u, i) * w(u, j)      norms[i] = sum_u w(u, i)²
+        cosine(i, j) = cooc[i][j] / sqrt(norms[i] * norms[j])
+
+    w(u, i) is the customer's mean rating of the product, or (unrated) the
+    implicit weight of their interactions and invoice lines capped at
+    IMPLICIT_CAP. With ratings only, the cosine is exactly the one
+    ItemNeighborIndex.build computes from the RatingMatrix.
+
+    apply_delta() pulls rows past the per-source id watermarks and updates
+    only the changed customers' pairs (O(items per customer²)), then reports
+    the items whose similarities moved.
+    """
+
+    SOURCES = ("rating", "interaction", "invoice")
+
+    def __init__(self):
+        self.signals = {}         # customer_id -> {product_id: [rating_sum, rating_count, implicit]}
+        self.weights = {}         # customer_id -> {product_id: w(u, i)}
+        self.cooc = defaultdict(dict)
+        self.norms = defaultdict(float)
+        self.watermarks = dict.fromkeys(self.SOURCES, 0)
+
+    def __len__(self):
+        return len(self.norms)
+
+    @staticmethod
+    def _weight(signal):
+        rating_sum, rating_count, implicit = signal
+        if rating_count:
+            return rating_sum / rating_count
+        return min(implicit, IMPLICIT_CAP)
+
+    # ------------------------
+    # Building
+    # ------------------------
+    def rebuild(self):
+        """Count every customer at once: C = WᵀW on the sparse weight matrix."""
+        self.__init__()
+        touched = self._ingest(full=True)
+        for customer_id in touched:
+            self.weights[customer_id] = self._customer_weights(customer_id)
+
+        customers = [c for c in self.weights if self.weights[c]]
+        product_ids = sorted({p for c in customers for p in self.weights[c]})
+        position = {p: i for i, p in enumerate(product_ids)}
+        rows, cols, vals = [], [], []
+        for r, c in enumerate(customers):
+            for p, w in self.weights[c].items():
+                rows.append(r)
+                cols.append(position[p])
+                vals.append(w)
+        W = sp.csr_matrix((vals, (rows, cols)), shape=(len(customers), len(product_ids)), dtype=np.float64)
+
+        norms = np.asarray(W.multiply(W).sum(axis=0)).ravel()
+        C = (W.T @ W).tocsr()
+        for i, pid in enumerate(product_ids):
+            self.norms[pid] = float(norms[i])
+            start, stop = C.indptr[i], C.indptr[i + 1]
+            row = {product_ids[j]: float(v) for j, v in zip(C.indices[start:stop], C.data[start:stop]) if j != i and v}
+            if row:
+                self.cooc[pid] = row
+        return self
+
+    def apply_delta(self):
+        """Apply new rows past the watermarks. Returns the set of products whose counters changed."""
+        touched = self._ingest(full=False)
+        changed = set()
+        for customer_id in touched:
+            old = self.weights.get(customer_id, {})
+            new = self._customer_weights(customer_id)
+            changed |= self._update_customer(old, new)
+            self.weights[customer_id] = new
+        return changed
+
+    def _update_customer(self, old, new):
+        moved = {p for p in set(old) | set(new) if old.get(p, 0.0) != new.get(p, 0.0)}
+        if not moved:
+            return moved
+        items = list(set(old) | set(new))
+        for i in moved:
+            self.norms[i] += new.get(i, 0.0) ** 2 - old.get(i, 0.0) ** 2
+        # only pairs with at least one moved item change
+        for i in moved:
+            for j in items:
+                if i == j or (j in moved and j < i):
+                    continue            # symmetric pair handled once
+                delta = new.get(i, 0.0) * new.get(j, 0.0) - old.get(i, 0.0) * old.get(j, 0.0)
+                if delta:
+                    self._add_pair(i, j, delta)
+        return moved
+
+    def _add_pair(self, i, j, delta):
+        for a, b in ((i, j), (j, i)):
+            value = self.cooc[a].get(b, 0.0) + delta
+            if abs(value) > _EPS:
+                self.cooc[a][b] = value
+            else:
+                self.cooc[a].pop(b, None)
+
+    def _customer_weights(self, customer_id):
+        return {p: self._weight(s) for p, s in self.signals.get(customer_id, {}).items() if self._weight(s) > 0}
+
+    def _ingest(self, full):
+        """Fold new Rating / Interaction / TaxInvoiceItem rows into the signals. Returns touched customers."""
+        touched = set()
+        names = None
+        for source, qs in self._source_querysets().items():
+            since = 0 if full else self.watermarks.get(source, 0)
+            last = qs.filter(id__gt=since).aggregate(last=Max("id"))["last"]
+            if last is None:
+                continue
+            if source == "invoice" and names is None:
+                names = product_name_lookup()
+            for row_id, customer_id, product, value in qs.filter(id__gt=since, id__lte=last).iterator(chunk_size=CHUNK_SIZE):
+                if source == "invoice":
+                    product = names.get((product or "").strip().lower())
+                if customer_id is None or product is None:
+                    continue
+                signal = self.signals.setdefault(customer_id, {}).setdefault(product, [0.0, 0, 0.0])
+                if source == "rating":
+                    signal[0] += value
+                    signal[1] += 1
+                elif source == "interaction":
+                    signal[2] += INTERACTION_WEIGHTS.get(value, 0.0)
+                else:
+                    signal[2] += INVOICE_WEIGHT
+                touched.add(customer_id)
+            self.watermarks[source] = last
+        return touched
+
+    @staticmethod
+    def _source_querysets():
+        return {
+            "rating": Rating.objects.values_list("id", "customer_id", "product_id", "rating"),
+            "interaction": Interaction.objects.values_list("id", "customer_id", "product_id", "interaction_type"),
+            "invoice": TaxInvoiceItem.objects.values_list("id", "tax_invoice__customer_id", "product_name", "quantity"),
+        }
+
+    # ------------------------
+    # Similarities
+    # ------------------------
+    def cosine(self, i, j):
+        value = self.cooc.get(i, {}).get(j)
+        if not value:
+            return 0.0
+        denom = np.sqrt(self.norms[i] * self.norms[j])
+        return float(value / denom) if denom > 0 else 0.0
+
+    def affected_pairs(self, changed):
+        """{(i, j): cosine} for every pair touching a changed product (norms moved, so all of them)."""
+        scores = {}
+        for i in changed:
+            for j in self.cooc.get(i, {}):
+                key = (i, j) if i < j else (j, i)
+                if key not in scores:
+                    scores[key] = self.cosine(i, j)
+        return scores
+
+    def top_neighbors(self, product_id, k):
+        """[(product_id, cosine), ...] best first, positive scores only."""
+        row = self.cooc.get(product_id, {})
+        if not row:
+            return []
+        partners = np.fromiter(row, dtype=np.int64, count=len(row))
+        values = np.fromiter(row.values(), dtype=np.float64, count=len(row))
+        norms = np.array([self.norms[p] for p in partners])
+        denom = np.sqrt(self.norms[product_id] * norms)
+        sims = np.divide(values, denom, out=np.zeros_like(values), where=denom > 0)
+        keep = sims > 0
+        partners, sims = partners[keep], sims[keep]
+        order = np.argsort(-sims, kind="stable")[:k]
+        return list(zip(partners[order].tolist(), sims[order].tolist()))
+
+    def affected_products(self, changed):
+        """The changed products and every product co-occurring with one (their cosines moved)."""
+        affected = set(changed)
+        for i in changed:
+            affected |= set(self.cooc.get(i, {}))
+        return affected
+
+    # ------------------------
+    # Persistence
+    # ------------------------
+    def save(self, path=COOCCURRENCE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(self, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        return path
+
+
+# ------------------------
+# Delta job
+# ------------------------
+def update_item_similarities(full=False, patch_neighbors=True):
+    """
+    Apply new ratings, interactions and invoice lines to the persisted
+    counters (full=True recounts everything) and publish the item neighbour
+    index with the affected products' rows recomputed as "item_neighbors_patch".
+    Returns (counters, changed products, {(i, j): cosine} of affected pairs).
+
+    The patched rows are recomputed from the rating matrix exactly like
+    train_and_save_model(), so the served index keeps one similarity
+    definition; the counters only decide which rows moved. Runs are
+    serialized across processes by locking the counters' SavedModel row.
+    """
+    with transaction.atomic():
+        list(SavedModel.objects.select_for_update().filter(name=COOCCURRENCE_MODEL))
+        counters = None if full else model_registry.get(COOCCURRENCE_MODEL, joblib.load)
+        if counters is None:
+            counters = CooccurrenceCounters().rebuild()
+            changed = set(counters.norms)
+        else:
+            counters = _copy(counters)
+            changed = counters.apply_delta()
+
+        counters.save(COOCCURRENCE_PATH)
+        SavedModel.objects.update_or_create(name=COOCCURRENCE_MODEL, defaults={"file_path": COOCCURRENCE_PATH})
+        model_registry.invalidate(COOCCURRENCE_MODEL)
+
+        if patch_neighbors and changed:
+            publish_neighbor_patch(counters.affected_products(changed))
+        return counters, changed, counters.affected_pairs(changed)
+
+
+def publish_neighbor_patch(products):
+    """
+    Recompute the rows of `products` in the served item neighbour index and
+    save the result as "item_neighbors_patch", tagged with the version of the
+    trained index it applies to (load_item_neighbors ignores it once that
+    index is retrained). Returns the patched index, or None without a v2 index.
+    """
+    from recommender.recommender_engine import (
+        load_item_neighbors, ITEM_NEIGHBORS_MODEL, ITEM_NEIGHBORS_PATCH_MODEL, TRAINED_MODELS_DIR,
+    )
+
+    if not SavedModel.objects.filter(name=ITEM_NEIGHBORS_MODEL).exists():
+        return None
+    model_registry.invalidate(ITEM_NEIGHBORS_PATCH_MODEL)  # build on the latest patch, not a cached one
+    index = load_item_neighbors()
+    if index is None or not index.model_version:
+        return None
+
+    ratings = get_rating_matrix(force_refresh=True)
+    patched = index.with_rows(ratings.matrix, ratings.product_ids, products)
+    patched.base_version = index.model_version
+    path = os.path.join(TRAINED_MODELS_DIR, "item_neighbors_patch.npz")
+    patched.save(path + ".tmp")
+    os.replace(path + ".tmp", path)
+    SavedModel.objects.update_or_create(name=ITEM_NEIGHBORS_PATCH_MODEL, defaults={"file_path": path})
+    model_registry.invalidate(ITEM_NEIGHBORS_PATCH_MODEL)
+    return patched
+
+
+def _copy(counters):
+    """Deep enough copy to mutate while other readers hold the cached instance."""
+    other = CooccurrenceCounters.__new__(CooccurrenceCounters)
+    other.signals = {c: {p: list(s) for p, s in row.items()} for c, row in counters.signals.items()}
+    other.weights = {c: dict(row) for c, row in counters.weights.items()}
+    other.cooc = defaultdict(dict, {i: dict(row) for i, row in counters.cooc.items()})
+    other.norms = defaultdict(float, counters.norms)
+    other.watermarks = dict(counters.watermarks)
+    return other
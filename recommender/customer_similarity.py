@@ -0,0 +1,264 @@
+# recommender/customer_similarity.py
+import os
+import threading
+from collections import defaultdict
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.db.models import Max
+
+from crmapp.models import CustomerPurchase
+from recommender.models import Rating, PestRecommendation, SavedModel
+from recommender.model_registry import model_registry
+
+
+# ------------------------
+# Settings
+# ------------------------
+CUSTOMER_MINHASH_MODEL = "customer_minhash"
+CUSTOMER_MINHASH_PATH = os.path.join(settings.BASE_DIR, "models", "customer_minhash.joblib")
+NUM_PERM = getattr(settings, "RECOMMENDER_MINHASH_PERMUTATIONS", 64)
+BANDS = getattr(settings, "RECOMMENDER_MINHASH_BANDS", 16)   # NUM_PERM / BANDS rows per band
+CHUNK_SIZE = 5000
+
+_PRIME = (1 << 31) - 1   # a * x + b stays below 2**63 for ids < 2**31
+
+
+class CustomerMinHashIndex:
+    """
+    MinHash signature per customer over the set of products they purchased,
+    rated or were recommended, with LSH banding: customers that agree on all
+    rows of at least one band share a bucket and become candidates.
+
+    Jaccard similarity is estimated from the share of equal signature slots;
+    the exact overlap is counted from the stored product sets of the (few)
+    candidates. Sources are tracked by id watermarks, so refresh() only
+    re-signs customers with new rows. Deleted rows are picked up by the next
+    full rebuild.
+    """
+
+    SOURCES = ("purchase", "rating", "recommendation")
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, random_state=0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(random_state)
+        self.a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+        self.bands = bands
+        self.signatures = {}              # customer_id -> uint32 (num_perm,)
+        self.products = {}                # customer_id -> frozenset of product ids
+        self.buckets = [defaultdict(set) for _ in range(bands)]
+        self.watermarks = dict.fromkeys(self.SOURCES, 0)
+
+    def __len__(self):
+        return len(self.signatures)
+
+    @property
+    def num_perm(self):
+        return len(self.a)
+
+    # ------------------------
+    # Hashing
+    # ------------------------
+    def _hash_products(self, product_ids):
+        """(num_perm, n) hash values of the product ids."""
+        x = np.asarray(product_ids, dtype=np.int64) % _PRIME
+        return ((self.a[:, None] * x[None, :] + self.b[:, None]) % _PRIME).astype(np.uint32)
+
+    def signature(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return None
+        return self._hash_products(product_ids).min(axis=1)
+
+    def _band_keys(self, signature):
+        return [row.tobytes() for row in signature.reshape(self.bands, -1)]
+
+    # ------------------------
+    # Building
+    # ------------------------
+    def rebuild(self):
+        """Sign every customer from all sources."""
+        self.__init__(self.num_perm, self.bands)
+        sets, self.watermarks = _customer_products()
+        self._sign_all(sets)
+        return self
+
+    def refresh(self):
+        """Re-sign customers with rows past the watermarks. Returns customers updated."""
+        changed, watermarks = _changed_customers(self.watermarks)
+        if changed:
+            sets, _ = _customer_products(changed)
+            for customer_id in changed:
+                self._remove(customer_id)
+            self._sign_all(sets)
+        self.watermarks = watermarks
+        return len(changed)
+
+    def _sign_all(self, sets):
+        """Vectorized signatures: hash every product once, min-reduce per customer (CSR rows)."""
+        sets = {c: s for c, s in sets.items() if s}
+        if not sets:
+            return
+        customer_ids = list(sets)
+        product_ids = sorted({p for s in sets.values() for p in s})
+        position = {p: i for i, p in enumerate(product_ids)}
+        indptr = np.cumsum([0] + [len(sets[c]) for c in customer_ids])
+        indices = np.fromiter((position[p] for c in customer_ids for p in sets[c]), dtype=np.int64, count=indptr[-1])
+
+        hashed = self._hash_products(product_ids)                      # (num_perm, n_products)
+        signatures = np.minimum.reduceat(hashed[:, indices], indptr[:-1], axis=1).T
+        for customer_id, signature in zip(customer_ids, signatures):
+            self._add(customer_id, np.ascontiguousarray(signature), frozenset(sets[customer_id]))
+
+    def _add(self, customer_id, signature, products):
+        self.signatures[customer_id] = signature
+        self.products[customer_id] = products
+        for band, key in enumerate(self._band_keys(signature)):
+            self.buckets[band][key].add(customer_id)
+
+    def _remove(self, customer_id):
+        signature = self.signatures.pop(customer_id, None)
+        self.products.pop(customer_id, None)
+        if signature is None:
+            return
+        for band, key in enumerate(self._band_keys(signature)):
+            bucket = self.buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(customer_id)
+                if not bucket:
+                    del self.buckets[band][key]
+
+    # ------------------------
+    # Querying
+    # ------------------------
+    def similar_customers(self, customer_id, top_k=5, products=None):
+        """
+        [{customer_id, common_count, jaccard}, ...] for the customers sharing an
+        LSH bucket, best estimated Jaccard first. Customers missing from the
+        index are signed on the fly from `products` (or their live product set).
+        """
+        signature = self.signatures.get(customer_id)
+        if signature is None:
+            if products is None:
+                products = _customer_products([customer_id])[0].get(customer_id, set())
+            signature = self.signature(products)
+            if signature is None:
+                return []
+        else:
+            products = self.products[customer_id]
+
+        candidates = set()
+        for band, key in enumerate(self._band_keys(signature)):
+            candidates |= self.buckets[band].get(key, set())
+        candidates.discard(customer_id)
+        if not candidates:
+            return []
+
+        candidates = list(candidates)
+        estimates = (np.stack([self.signatures[c] for c in candidates]) == signature).mean(axis=1)
+        products = set(products)
+        results = [
+            {"customer_id": c, "common_count": len(products & self.products[c]), "jaccard": float(j)}
+            for c, j in zip(candidates, estimates)
+        ]
+        results.sort(key=lambda r: (r["jaccard"], r["common_count"]), reverse=True)
+        return results[:top_k]
+
+    # ------------------------
+    # Persistence
+    # ------------------------
+    def save(self, path=CUSTOMER_MINHASH_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        joblib.dump(self, path + ".tmp")
+        os.replace(path + ".tmp", path)
+        return path
+
+    def copy(self):
+        other = CustomerMinHashIndex.__new__(CustomerMinHashIndex)
+        other.__dict__.update(self.__dict__)
+        other.signatures = dict(self.signatures)
+        other.products = dict(self.products)
+        other.buckets = [defaultdict(set, {k: set(v) for k, v in band.items()}) for band in self.buckets]
+        other.watermarks = dict(self.watermarks)
+        return other
+
+
+# ------------------------
+# Sources
+# ------------------------
+def _source_querysets():
+    return {
+        "purchase": CustomerPurchase.objects.values_list("id", "customer_id", "product_id"),
+        "rating": Rating.objects.filter(customer__isnull=False, product__isnull=False)
+                               .values_list("id", "customer_id", "product_id"),
+        "recommendation": PestRecommendation.objects.filter(customer__isnull=False, recommended_product__isnull=False)
+                                                    .values_list("id", "customer_id", "recommended_product_id"),
+    }
+
+
+def _customer_products(customer_ids=None):
+    """({customer_id: set(product ids)}, {source: max id seen})."""
+    sets = defaultdict(set)
+    watermarks = {}
+    for source, qs in _source_querysets().items():
+        if customer_ids is not None:
+            qs = qs.filter(customer_id__in=list(customer_ids))
+        last = 0
+        for row_id, customer_id, product_id in qs.iterator(chunk_size=CHUNK_SIZE):
+            sets[customer_id].add(product_id)
+            last = max(last, row_id)
+        watermarks[source] = last
+    return sets, watermarks
+
+
+def _changed_customers(watermarks):
+    """Customers with rows past the per-source id watermarks, and the new watermarks."""
+    changed = set()
+    updated = dict(watermarks)
+    for source, qs in _source_querysets().items():
+        since = watermarks.get(source, 0)
+        last = qs.filter(id__gt=since).aggregate(last=Max("id"))["last"]
+        if last is None:
+            continue
+        delta = qs.filter(id__gt=since, id__lte=last)
+        changed |= set(delta.values_list("customer_id", flat=True).distinct())
+        updated[source] = last
+    return changed, updated
+
+
+# ------------------------
+# Published instance
+# ------------------------
+_lock = threading.Lock()
+
+
+def build_customer_similarity_index(full=False):
+    """
+    Refresh (or rebuild) the persisted MinHash index and publish it as
+    SavedModel "customer_minhash". Meant for the Celery task / management command.
+    """
+    index = None if full else model_registry.get(CUSTOMER_MINHASH_MODEL, joblib.load)
+    with _lock:
+        if index is None:
+            index = CustomerMinHashIndex().rebuild()
+            changed = len(index)
+        else:
+            index = index.copy()
+            changed = index.refresh()
+
+        index.save(CUSTOMER_MINHASH_PATH)
+        SavedModel.objects.update_or_create(name=CUSTOMER_MINHASH_MODEL, defaults={"file_path": CUSTOMER_MINHASH_PATH})
+        model_registry.invalidate(CUSTOMER_MINHASH_MODEL)
+    return index, changed
+
+
+def get_customer_similarity_index():
+    """Published CustomerMinHashIndex (cached in the model registry), or None."""
+    try:
+        return model_registry.get(CUSTOMER_MINHASH_MODEL, joblib.load)
+    except Exception as e:
+        print("⚠️ Error loading customer MinHash index:", e)
+        return None
@@ -1,37 +1,37 @@
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from recommender.models import Item, Rating
-import numpy as np
+from recommender.content_index import get_content_index
+
 
 def get_content_recommendations(user, top_k=5):
     """
     Simple content-based recommender using TF-IDF similarity.
+
+    `user` is a customer (or customer id). Items similar to the products the
+    customer rated >= 4 are ranked with one sparse dot product against the
+    persisted content index (see recommender/content_index.py).
     """
-    items = list(Item.objects.all())
-    if not items:
+    customer_id = getattr(user, "id", user)
+    rated = list(
+        Rating.objects.filter(customer_id=customer_id, product_id__isnull=False)
+        .values_list("product_id", "rating")
+    )
+    if not rated:
         return []
 
-    item_texts = [i.content_blob() for i in items]
-    vectorizer = TfidfVectorizer(stop_words='english')
-    tfidf_matrix = vectorizer.fit_transform(item_texts)
-
-    rated_items = Rating.objects.filter(user=user).select_related('item')
-    if not rated_items.exists():
+    liked = [pid for pid, rating in rated if rating >= 4]  # repeats weigh more, as before
+    if not liked:
         return []
 
-    liked_indices = [items.index(r.item) for r in rated_items if r.rating >= 4]
-    if not liked_indices:
+    index = get_content_index()
+    ranked = index.similar_to_products(liked, exclude_product_ids={pid for pid, _ in rated}, top_k=top_k)
+    if not ranked:
         return []
 
-    liked_vectors = tfidf_matrix[liked_indices]
-    scores = cosine_similarity(liked_vectors, tfidf_matrix).mean(axis=0)
-
-    ranked_indices = np.argsort(scores)[::-1]
+    items = Item.objects.in_bulk([item_id for item_id, _ in ranked])
     recommended = []
-    for idx in ranked_indices:
-        if items[idx].id not in [r.item.id for r in rated_items]:
-            recommended.append(items[idx])
-        if len(recommended) >= top_k:
-            break
-
+    for item_id, score in ranked:
+        item = items.get(item_id)
+        if item is not None:
+            item.score = score
+            recommended.append(item)
     return recommended
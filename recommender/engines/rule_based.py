@@ -1,32 +1,244 @@
 # recommender/engines/rule_based.py
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+
+# ------------------------
+# Rule table
+# ------------------------
+# One row per rule: every non-empty condition must hold (values are
+# lower-case; past_purchases matches when the name of any bought product
+# contains a listed value, e.g. "amc" matches "AMC Renewal").
+RULES = [
+    {"kind": "upsell", "product": "Premium AMC Service", "lead_type": {"hot", "warm"}},
+    {"kind": "upsell", "product": "Intensive Treatment Upgrade", "pest_issue": {"termites", "bed bugs"}},
+    {"kind": "upsell", "product": "Annual Maintenance Plan", "customer_category": {"repeat"}},
+    {"kind": "cross_sell", "product": "Pest Control Addon Spray", "service_type": {"service"}},
+    {"kind": "cross_sell", "product": "Kitchen Deep Clean", "pest_issue": {"cockroaches"}},
+    {"kind": "upsell", "product": "AMC Renewal Discount", "past_purchases": {"amc"}},
+]
+CONDITION_FIELDS = ["lead_type", "service_type", "pest_issue", "customer_category"]
+UPSELL_FIRST_LEAD_TYPES = {"hot"}
+
+LEAD_SUGGESTIONS_MODEL = "lead_rule_suggestions"
+LEAD_SUGGESTIONS_PATH = os.path.join(settings.BASE_DIR, "models", "lead_rule_suggestions.joblib")
+CLOSED_LEAD_TYPES = ["Not Interested", "Loss of Order"]
+
+
+def _normalize(value):
+    return "" if value is None or value != value else str(value).strip().lower()
+
+
+def _purchase_parts(value):
+    """Normalized product names of one past_purchases entry (a name, or comma separated names)."""
+    parts = value.split(",") if isinstance(value, str) else [value]
+    return [_normalize(part) for part in parts]
+
+
+class CompiledRules:
+    """
+    RULES compiled to per-field lookup tables: for each condition field a
+    {value: bool rule-mask} dict, so a column of leads maps to an
+    (n_leads x n_rules) mask in one pass; rules without a condition on the
+    field are always true there. Strings are normalized per distinct value,
+    not per lead.
+    """
+
+    def __init__(self, rules=RULES):
+        self.rules = list(rules)
+        self.products = np.array([r["product"] for r in self.rules], dtype=object)
+        self.kinds = np.array([r["kind"] for r in self.rules], dtype=object)
+        n = len(self.rules)
+        for kind in set(self.kinds):
+            if len(set(self.products[self.kinds == kind])) > 63:
+                raise ValueError(f"At most 63 {kind} products per rule table")
+        self.unconditional = {}
+        self.lookup = {}
+        for field in CONDITION_FIELDS + ["past_purchases"]:
+            free = np.array([not r.get(field) for r in self.rules], dtype=bool)
+            table = {}
+            for pos, rule in enumerate(self.rules):
+                for value in rule.get(field) or ():
+                    table.setdefault(value, np.zeros(n, dtype=bool))[pos] = True
+            self.unconditional[field] = free
+            self.lookup[field] = table
+        # per rule: (kind, product, [(field, values), ...], purchase needles) for recommend_one()
+        self.checks = [
+            (r["kind"], r["product"], [(f, r[f]) for f in CONDITION_FIELDS if r.get(f)], r.get("past_purchases"))
+            for r in self.rules
+        ]
+
+    def _value_masks(self, field, values):
+        """(codes, per-distinct-value rule mask) for a column of scalar values."""
+        codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+        table = self.lookup[field]
+        empty = np.zeros(len(self.rules), dtype=bool)
+        per_value = np.zeros((len(uniques), len(self.rules)), dtype=bool)
+        for pos, value in enumerate(uniques):
+            per_value[pos] = table.get(_normalize(value), empty)
+        return codes, per_value
+
+    def _field_mask(self, field, values):
+        """(n_leads x n_rules) mask for one scalar field."""
+        codes, per_value = self._value_masks(field, values)
+        return per_value[codes] | self.unconditional[field]
+
+    def _purchase_masks(self, names):
+        """(codes, per-distinct-entry rule mask): the rules whose value one of the entry's names contains."""
+        codes, uniques = pd.factorize(pd.Series(names, dtype=object), use_na_sentinel=False)
+        per_value = np.zeros((len(uniques), len(self.rules)), dtype=bool)
+        for pos, value in enumerate(uniques):
+            for part in _purchase_parts(value):
+                for needle, rules in self.lookup["past_purchases"].items():
+                    if needle in part:
+                        per_value[pos] |= rules
+        return codes, per_value
+
+    def _purchase_mask(self, past_purchases):
+        """past_purchases: one list (or comma separated string) of product names per lead."""
+        exploded = pd.Series(list(past_purchases), dtype=object).explode()
+        codes, per_value = self._purchase_masks(exploded.to_numpy())
+        bought = np.zeros((len(past_purchases), len(self.rules)), dtype=bool)
+        np.logical_or.at(bought, exploded.index.to_numpy(), per_value[codes])
+        return bought | self.unconditional["past_purchases"]
+
+    def evaluate(self, leads):
+        """
+        Boolean (n_leads x n_rules) mask of the rules that fire for a
+        DataFrame with the CONDITION_FIELDS and past_purchases columns.
+        """
+        mask = np.ones((len(leads), len(self.rules)), dtype=bool)
+        for field in CONDITION_FIELDS:
+            mask &= self._field_mask(field, leads[field].to_numpy())
+        return mask & self._purchase_mask(leads["past_purchases"].to_numpy())
+
+    def recommend(self, leads):
+        """
+        Per-lead suggestions for a whole DataFrame at once: columns upsell,
+        cross_sell (product name lists, table order, no repeats) and priority,
+        on the same index as `leads`.
+        """
+        mask = self.evaluate(leads)
+        out = pd.DataFrame(index=leads.index)
+        for kind in ("upsell", "cross_sell"):
+            products = list(dict.fromkeys(self.products[self.kinds == kind]))
+            # (n_rules x n_products): which rule suggests which product
+            membership = (self.products[:, None] == np.array(products, dtype=object)[None, :]) \
+                & (self.kinds == kind)[:, None]
+            fired = (mask.astype(np.int32) @ membership.astype(np.int32)) > 0
+            # fired products packed into one integer per lead: build each
+            # distinct list once and share it between the leads that have it
+            codes = fired.astype(np.int64) @ (1 << np.arange(len(products), dtype=np.int64))
+            combos, inverse = np.unique(codes, return_inverse=True)
+            lists = np.empty(len(combos), dtype=object)
+            lists[:] = [[p for bit, p in enumerate(products) if code >> bit & 1] for code in combos]
+            out[kind] = lists[inverse.ravel()]
+        lead_types = pd.Series(leads["lead_type"].to_numpy(), dtype=object)
+        codes, uniques = pd.factorize(lead_types, use_na_sentinel=False)
+        upsell_first = np.array([_normalize(u) in UPSELL_FIRST_LEAD_TYPES for u in uniques], dtype=bool)
+        out["priority"] = np.where(upsell_first[codes], "upsell_first", "crosssell_first") if len(uniques) else []
+        return out
+
+
+    def recommend_one(self, lead):
+        """recommend() for a single lead given as a dict, without the DataFrame overhead."""
+        values = {field: _normalize(lead.get(field)) for field in CONDITION_FIELDS}
+        past = lead.get("past_purchases")
+        past = past if isinstance(past, (str, list, tuple)) else []     # None / NaN: nothing bought
+        bought = [part for entry in ([past] if isinstance(past, str) else past) for part in _purchase_parts(entry)]
+        out = {"upsell": [], "cross_sell": []}
+        for kind, product, conditions, needles in self.checks:
+            if not all(values[field] in allowed for field, allowed in conditions):
+                continue
+            if needles and not any(needle in part for needle in needles for part in bought):
+                continue
+            if product not in out[kind]:
+                out[kind].append(product)
+        out["priority"] = "upsell_first" if values["lead_type"] in UPSELL_FIRST_LEAD_TYPES else "crosssell_first"
+        return out
+
+
+_compiled = CompiledRules()
+
 
 def rule_based_recommendation(lead_type, service_type, pest_issue, past_purchases, customer_category):
-    upsell = []
-    cross_sell = []
-
-    # UPSSELL LOGIC
-    if lead_type in ["hot", "warm"]:
-        upsell.append("Premium AMC Service")
-    if pest_issue in ["termites", "bed bugs"]:
-        upsell.append("Intensive Treatment Upgrade")
-
-    if customer_category == "repeat":
-        upsell.append("Annual Maintenance Plan")
-
-    # CROSS SELL LOGIC
-    if service_type == "service":
-        cross_sell.append("Pest Control Addon Spray")
-    if pest_issue == "cockroaches":
-        cross_sell.append("Kitchen Deep Clean")
-
-    if "AMC" in past_purchases:
-        upsell.append("AMC Renewal Discount")
-
-    # PRIORITY
-    priority = "upsell_first" if lead_type == "hot" else "crosssell_first"
-
-    return {
-        "upsell": list(set(upsell)),
-        "cross_sell": list(set(cross_sell)),
-        "priority": priority
-    }
+    """Single-lead wrapper over the compiled rule table."""
+    return _compiled.recommend_one({
+        "lead_type": lead_type,
+        "service_type": service_type,
+        "pest_issue": pest_issue,
+        "customer_category": customer_category,
+        "past_purchases": past_purchases,
+    })
+
+
+# ------------------------
+# Nightly pass over open leads
+# ------------------------
+def open_leads_frame():
+    """
+    Open leads as a rule-engine DataFrame (index = lead id):
+    typeoflead -> lead_type, maincategory -> service_type, subcategory ->
+    pest_issue; a lead whose phone matches a customer is "repeat" and gets
+    that customer's invoiced product names as past_purchases.
+    """
+    from crmapp.models import lead_management, customer_details, TaxInvoiceItem
+
+    leads = pd.DataFrame(
+        lead_management.objects.exclude(typeoflead__in=CLOSED_LEAD_TYPES)
+        .values_list("id", "typeoflead", "maincategory", "subcategory", "primarycontact"),
+        columns=["lead_id", "lead_type", "service_type", "pest_issue", "primarycontact"],
+    )
+    if leads.empty:
+        return pd.DataFrame(columns=CONDITION_FIELDS + ["past_purchases"])
+
+    phones = leads["primarycontact"].dropna().astype(np.int64).unique().tolist()
+    customers = pd.DataFrame(
+        customer_details.objects.filter(primarycontact__in=phones).values_list("id", "primarycontact"),
+        columns=["customer_id", "primarycontact"],
+    ).drop_duplicates("primarycontact")
+    purchases = pd.DataFrame(
+        TaxInvoiceItem.objects.filter(tax_invoice__customer_id__in=customers["customer_id"].tolist())
+        .values_list("tax_invoice__customer_id", "product_name"),
+        columns=["customer_id", "product_name"],
+    )
+    bought = purchases.dropna().groupby("customer_id")["product_name"].agg(lambda names: sorted(set(names)))
+
+    leads = leads.merge(customers, on="primarycontact", how="left")
+    leads["customer_category"] = np.where(leads["customer_id"].notna(), "repeat", "new")
+    leads["past_purchases"] = leads["customer_id"].map(bought)
+    leads["past_purchases"] = leads["past_purchases"].map(lambda p: p if isinstance(p, list) else [])
+    return leads.set_index("lead_id")[CONDITION_FIELDS + ["past_purchases"]]
+
+
+def build_lead_suggestions():
+    """Evaluate the rule table over every open lead and publish {lead_id: suggestion}."""
+    from recommender.models import SavedModel
+    from recommender.model_registry import model_registry
+
+    leads = open_leads_frame()
+    suggestions = _compiled.recommend(leads) if len(leads) else pd.DataFrame(columns=["upsell", "cross_sell", "priority"])
+    os.makedirs(os.path.dirname(LEAD_SUGGESTIONS_PATH), exist_ok=True)
+    joblib.dump(suggestions, LEAD_SUGGESTIONS_PATH + ".tmp")
+    os.replace(LEAD_SUGGESTIONS_PATH + ".tmp", LEAD_SUGGESTIONS_PATH)
+    SavedModel.objects.update_or_create(name=LEAD_SUGGESTIONS_MODEL, defaults={"file_path": LEAD_SUGGESTIONS_PATH})
+    model_registry.invalidate(LEAD_SUGGESTIONS_MODEL)
+    return suggestions
+
+
+def get_lead_suggestions(lead_id):
+    """Published suggestion for one lead ({upsell, cross_sell, priority}) or None."""
+    from recommender.model_registry import model_registry
+
+    try:
+        suggestions = model_registry.get(LEAD_SUGGESTIONS_MODEL, joblib.load)
+    except Exception as e:
+        print("⚠️ Error loading lead suggestions:", e)
+        return None
+    if suggestions is None or lead_id not in suggestions.index:
+        return None
+    return suggestions.loc[lead_id].to_dict()
@@ -51,16 +51,11 @@ def evaluate_model(model_name, test_data, recommender_func, top_k=5):
             if hasattr(recs, "values_list"):
                 recs = list(recs.values_list("product_name", flat=True))
 
-            # Case 2: List of dicts → extract name/id
+            # Case 2: List of dicts → extract name/id (one query for the missing names)
             elif isinstance(recs, list) and recs and isinstance(recs[0], dict):
-                recs = [
-                    r.get("product_name")
-                    or Item.objects.filter(product_id=r.get("id"))
-                    .values_list("product_name", flat=True)
-                    .first()
-                    for r in recs
-                    if r
-                ]
+                missing = [r.get("id") for r in recs if r and not r.get("product_name")]
+                names = dict(Item.objects.filter(product_id__in=missing).values_list("product_id", "product_name"))
+                recs = [r.get("product_name") or names.get(r.get("id")) for r in recs if r]
 
             # Case 3: List of IDs → convert to product names
             elif isinstance(recs, list) and all(isinstance(x, (int, np.integer)) for x in recs):
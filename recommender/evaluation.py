@@ -0,0 +1,336 @@
+# recommender/evaluation.py
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+import scipy.sparse as sp
+from django.db import connections
+from django.utils import timezone
+
+from crmapp.models import TaxInvoiceItem
+from recommender.models import Rating
+from recommender.quantization import quantize_factors, nbytes, MODES
+
+
+# ------------------------
+# Settings
+# ------------------------
+SCORE_BLOCK = 1024            # users scored per matrix product
+RELEVANT_RATING = 3.0         # test ratings below this are not relevant
+CHUNK_SIZE = 5000
+
+DEFAULT_VARIANTS = [
+    {"name": "popularity", "model": "popularity"},
+    {"name": "item_knn", "model": "item_knn", "params": {"k": 50}},
+    {"name": "user_knn", "model": "user_knn", "params": {"k": 50}},
+    {"name": "svd", "model": "svd", "params": {"n_components": 50}},
+    {"name": "als", "model": "als", "params": {"factors": 64, "iterations": 10}},
+]
+
+# the stored-similarity / factor models at every quantization (accuracy vs memory)
+QUANTIZATION_VARIANTS = [
+    {"name": f"{model}_{mode}", "model": model, "params": {**params, "quantization": mode}}
+    for model, params in (("item_knn", {"k": 50}), ("svd", {"n_components": 50}),
+                          ("als", {"factors": 64, "iterations": 10}))
+    for mode in MODES
+]
+
+
+# ------------------------
+# Data + temporal split
+# ------------------------
+def load_interactions(sources=("rating", "invoice")):
+    """
+    (customer_ids, product_ids, values, timestamps) as NumPy arrays from the
+    Rating table and invoice lines (mapped to products by name, value = a
+    purchase weight on the rating scale).
+    """
+    customers, products, values, stamps = [], [], [], []
+    if "rating" in sources:
+        qs = Rating.objects.filter(customer_id__isnull=False, product_id__isnull=False) \
+                           .values_list("customer_id", "product_id", "rating", "timestamp")
+        for customer_id, product_id, rating, ts in qs.iterator(chunk_size=CHUNK_SIZE):
+            customers.append(customer_id)
+            products.append(product_id)
+            values.append(rating)
+            stamps.append(ts.timestamp())
+    if "invoice" in sources:
+        from recommender.association_rules import product_name_lookup
+        from recommender.cooccurrence import INVOICE_WEIGHT
+
+        names = product_name_lookup()
+        qs = TaxInvoiceItem.objects.values_list("tax_invoice__customer_id", "product_name", "tax_invoice__created_at")
+        for customer_id, name, ts in qs.iterator(chunk_size=CHUNK_SIZE):
+            product_id = names.get((name or "").strip().lower())
+            if customer_id is None or product_id is None or ts is None:
+                continue
+            customers.append(customer_id)
+            products.append(product_id)
+            values.append(INVOICE_WEIGHT)
+            stamps.append(ts.timestamp())
+    return (
+        np.asarray(customers, dtype=np.int64),
+        np.asarray(products, dtype=np.int64),
+        np.asarray(values, dtype=np.float32),
+        np.asarray(stamps, dtype=np.float64),
+    )
+
+
+class TemporalSplit:
+    """
+    Train = interactions before the cutoff, test = relevant interactions after
+    it for customers and products seen in training (new pairs only). Both are
+    CSR matrices over the same customer x product index.
+    """
+
+    def __init__(self, train, test, customer_ids, product_ids, cutoff):
+        self.train = train
+        self.test = test
+        self.customer_ids = customer_ids
+        self.product_ids = product_ids
+        self.cutoff = cutoff
+
+    @classmethod
+    def build(cls, customers, products, values, stamps, test_fraction=0.2, cutoff=None,
+              relevant=RELEVANT_RATING):
+        if cutoff is None:
+            cutoff = float(np.quantile(stamps, 1.0 - test_fraction)) if len(stamps) else 0.0
+        in_train = stamps < cutoff
+
+        customer_ids, c_pos = np.unique(customers[in_train], return_inverse=True)
+        product_ids, p_pos = np.unique(products[in_train], return_inverse=True)
+        shape = (len(customer_ids), len(product_ids))
+        # mean value per cell, as in RatingMatrix
+        sums = sp.csr_matrix((values[in_train].astype(np.float64), (c_pos, p_pos)), shape=shape)
+        counts = sp.csr_matrix((np.ones(in_train.sum()), (c_pos, p_pos)), shape=shape)
+        train = sums.multiply(counts.power(-1)).tocsr().astype(np.float32)
+
+        # test: later relevant rows of known customers/products
+        later = ~in_train & (values >= relevant)
+        c_test = np.searchsorted(customer_ids, customers[later])
+        p_test = np.searchsorted(product_ids, products[later])
+        known = (c_test < len(customer_ids)) & (p_test < len(product_ids))
+        known[known] &= (customer_ids[c_test[known]] == customers[later][known]) & \
+                        (product_ids[p_test[known]] == products[later][known])
+        test = sp.csr_matrix((np.ones(known.sum(), dtype=np.float32), (c_test[known], p_test[known])), shape=shape)
+        test.data[:] = 1.0                                  # duplicates summed -> binary
+        test = test - test.multiply(train > 0)             # already seen in training
+        test.eliminate_zeros()
+        return cls(train, test.tocsr(), customer_ids, product_ids, cutoff)
+
+    def summary(self):
+        return {
+            "cutoff": datetime.fromtimestamp(self.cutoff, tz=dt_timezone.utc).isoformat() if self.cutoff else None,
+            "customers": int(self.train.shape[0]),
+            "products": int(self.train.shape[1]),
+            "train_cells": int(self.train.nnz),
+            "test_cells": int(self.test.nnz),
+            "test_customers": int((np.diff(self.test.indptr) > 0).sum()),
+        }
+
+
+# ------------------------
+# Model variants: fit on the train matrix, return (score a block of users, model bytes)
+# ------------------------
+def _fit_popularity(train, **params):
+    counts = np.asarray((train > 0).sum(axis=0), dtype=np.float32).ravel()
+    return lambda rows: np.broadcast_to(counts, (len(rows), len(counts))).copy(), nbytes(counts)
+
+
+def _fit_item_knn(train, k=50, quantization="float32", **params):
+    from recommender.item_neighbors import ItemNeighborIndex
+
+    index = ItemNeighborIndex.build(train, np.arange(train.shape[1]), k=k).quantize(quantization)
+    return lambda rows: np.asarray(index.score_matrix(train[rows]).toarray(), dtype=np.float32), nbytes(index)
+
+
+def _fit_user_knn(train, k=50, **params):
+    norms = np.sqrt(np.asarray(train.multiply(train).sum(axis=1)).ravel())
+    inv = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    normalized = sp.diags(inv.astype(np.float32)) @ train
+    normalized_t = normalized.T.tocsc()
+
+    def score(rows):
+        sims = (normalized[rows] @ normalized_t).toarray()
+        sims[np.arange(len(rows)), rows] = 0.0          # not their own neighbour
+        if k and k < sims.shape[1]:
+            drop = np.argpartition(-sims, k, axis=1)[:, k:]
+            np.put_along_axis(sims, drop, 0.0, axis=1)
+        return np.asarray((train.T @ sims.T).T, dtype=np.float32)
+    return score, nbytes(normalized) + nbytes(normalized_t)
+
+
+def _factor_scorer(user_factors, item_factors, quantization):
+    user_factors = quantize_factors(user_factors, quantization)
+    item_factors = quantize_factors(item_factors, quantization)
+    # item side first: works for plain arrays and QuantizedMatrix alike
+    return lambda rows: (item_factors @ user_factors[rows].T).T, nbytes(user_factors) + nbytes(item_factors)
+
+
+def _fit_svd(train, n_components=50, quantization="float32", **params):
+    from sklearn.decomposition import TruncatedSVD
+
+    svd = TruncatedSVD(n_components=max(1, min(n_components, min(train.shape) - 1)), random_state=0)
+    return _factor_scorer(svd.fit_transform(train), svd.components_.T, quantization)
+
+
+def _fit_als(train, factors=64, iterations=10, regularization=0.1, alpha=40.0, quantization="float32", **params):
+    from recommender.als import ImplicitALS
+
+    model = ImplicitALS(factors=max(1, min(factors, min(train.shape) - 1)), iterations=iterations,
+                        regularization=regularization, alpha=alpha, n_jobs=1).fit(train)
+    return _factor_scorer(model.user_factors, model.item_factors, quantization)
+
+
+MODELS = {
+    "popularity": _fit_popularity,
+    "item_knn": _fit_item_knn,
+    "user_knn": _fit_user_knn,
+    "svd": _fit_svd,
+    "als": _fit_als,
+}
+
+
+# ------------------------
+# Metrics (whole user blocks at once)
+# ------------------------
+def ranking_metrics(scores, seen, relevant, k=10):
+    """
+    Per-user precision/recall/NDCG/AP@k for a block.
+    scores: dense (n_users x n_items); seen / relevant: sparse, same shape.
+    """
+    scores = np.array(scores, dtype=np.float32)
+    seen = seen.tocoo()
+    scores[seen.row, seen.col] = -np.inf
+
+    k = min(k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+
+    hits = np.take_along_axis(relevant.toarray() > 0, top, axis=1).astype(np.float32)   # n x k
+    n_relevant = np.diff(relevant.indptr).astype(np.float32)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2, dtype=np.float32))
+    ideal = np.concatenate([[0.0], np.cumsum(discounts)]).astype(np.float32)[np.minimum(n_relevant, k).astype(np.int64)]
+    cum_hits = np.cumsum(hits, axis=1)
+
+    def ratio(a, b):
+        return np.divide(a, b, out=np.zeros_like(a), where=b > 0)
+
+    return {
+        "precision": hits.sum(axis=1) / k,
+        "recall": ratio(hits.sum(axis=1), n_relevant),
+        "ndcg": ratio((hits * discounts).sum(axis=1), ideal),
+        "map": ratio((hits * cum_hits / np.arange(1, k + 1)).sum(axis=1), np.minimum(n_relevant, k)),
+    }
+
+
+def evaluate_variant(variant, split, k=10):
+    """Fit one variant on split.train and score every test customer in blocks."""
+    started = time.perf_counter()
+    fit = MODELS[variant["model"]]
+    score, model_bytes = fit(split.train, **variant.get("params", {}))
+    fit_seconds = time.perf_counter() - started
+
+    users = np.flatnonzero(np.diff(split.test.indptr) > 0)
+    totals = {"precision": 0.0, "recall": 0.0, "ndcg": 0.0, "map": 0.0}
+    started = time.perf_counter()
+    for start in range(0, len(users), SCORE_BLOCK):
+        rows = users[start:start + SCORE_BLOCK]
+        metrics = ranking_metrics(score(rows), split.train[rows], split.test[rows], k)
+        for name, values in metrics.items():
+            totals[name] += float(values.sum())
+
+    n = max(len(users), 1)
+    return {
+        "name": variant["name"],
+        "model": variant["model"],
+        "params": variant.get("params", {}),
+        **{f"{name}@{k}": totals[name] / n for name in totals},
+        "quantization": variant.get("params", {}).get("quantization", "float32"),
+        "model_bytes": int(model_bytes),
+        "users": int(len(users)),
+        "fit_seconds": fit_seconds,
+        "score_seconds": time.perf_counter() - started,
+    }
+
+
+def _evaluate_job(args):
+    variant, split, k = args
+    try:
+        return evaluate_variant(variant, split, k)
+    except Exception as e:
+        return {"name": variant["name"], "model": variant["model"], "error": str(e)}
+
+
+# ------------------------
+# Harness
+# ------------------------
+def run_evaluation(variants=None, k=10, test_fraction=0.2, sources=("rating", "invoice"), n_jobs=None, output=None):
+    """
+    Temporal split of Rating / invoice history, every variant fitted and
+    scored in its own worker process, metrics averaged over test customers.
+    Returns the report dict (also written as JSON to `output`).
+    """
+    variants = variants or DEFAULT_VARIANTS
+    split = TemporalSplit.build(*load_interactions(sources), test_fraction=test_fraction)
+
+    jobs = [(variant, split, k) for variant in variants]
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(jobs))
+    started = time.perf_counter()
+    if n_jobs > 1 and split.test.nnz:
+        # workers only do NumPy work; don't hand them our DB sockets
+        connections.close_all()
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context) as pool:
+            results = list(pool.map(_evaluate_job, jobs))
+    else:
+        results = [_evaluate_job(job) for job in jobs]
+
+    report = {
+        "generated_at": timezone.now().isoformat(),
+        "k": k,
+        "test_fraction": test_fraction,
+        "sources": list(sources),
+        "split": split.summary(),
+        "results": results,
+        "quantization": quantization_report(results, k),
+        "seconds": time.perf_counter() - started,
+    }
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+def quantization_report(results, k=10):
+    """
+    Accuracy vs memory of each quantized variant against the float32 variant
+    of the same model and params: memory ratio and metric deltas.
+    """
+    def family(r):
+        return r["model"], json.dumps({p: v for p, v in r.get("params", {}).items() if p != "quantization"},
+                                      sort_keys=True)
+
+    ok = [r for r in results if "error" not in r]
+    baselines = {family(r): r for r in ok if r["quantization"] == "float32"}
+    rows = []
+    for r in ok:
+        base = baselines.get(family(r))
+        if base is None or r is base:
+            continue
+        rows.append({
+            "name": r["name"],
+            "baseline": base["name"],
+            "quantization": r["quantization"],
+            "model_bytes": r["model_bytes"],
+            "baseline_bytes": base["model_bytes"],
+            "memory_ratio": base["model_bytes"] / r["model_bytes"] if r["model_bytes"] else None,
+            **{f"delta_{metric}@{k}": r[f"{metric}@{k}"] - base[f"{metric}@{k}"]
+               for metric in ("precision", "recall", "ndcg", "map")},
+        })
+    return rows
@@ -3,118 +3,65 @@ import pandas as pd
 import pickle
 from recommender.models import Rating, Item, SavedModel, PestRecommendation
 from crmapp.models import customer_details, Product
+from recommender.recommender_engine import load_item_neighbors
+from recommender.rating_matrix import get_rating_matrix
+from recommender.recommendation_writer import RecommendationWriter
+from recommender.popularity import popular_items_for_customer
 
-def generate_recommendations_for_user(customer_id, top_n=5, return_scores=False):
-    ratings_qs = Rating.objects.all().values("customer_id", "product_id", "rating")
-    df = pd.DataFrame(list(ratings_qs))
 
-    # Fallback: no ratings
-    if df.empty:
-        popular_items = Item.objects.all()[:top_n]
-        rec_list = []
-        for i in popular_items:
-            if i.product:
-                PestRecommendation.objects.create(
-                    customer_id=customer_id,
-                    base_product_id=None,
-                    recommended_product_id=i.product.product_id,
-                    recommendation_type="collaborative",
-                    confidence_score=0
-                )
+def _store(customer_id, items, scores=None, model_version="popularity", return_scores=False):
+    """Upsert one batch of collaborative PestRecommendations; the scored list if asked for."""
+    scores = scores or {}
+    rec_list = []
+    with RecommendationWriter(model_version=model_version) as writer:
+        for i in items:
+            score = float(scores.get(i.product_id, 0)) if i.product_id else 0
+            if i.product_id:
+                writer.add(customer_id, i.product_id, "collaborative", score=score)
             if return_scores:
                 rec_list.append({
-                    "product_id": i.product.product_id if i.product else None,
+                    "product_id": i.product_id,
                     "title": i.title,
                     "category": i.category,
-                    "score": 0
+                    "score": score
                 })
-        return rec_list if return_scores else popular_items
+    return rec_list
 
-    pivot_table = df.pivot_table(index="customer_id", columns="product_id", values="rating").fillna(0)
+def generate_recommendations_for_user(customer_id, top_n=5, return_scores=False):
+    ratings = get_rating_matrix()
 
-    if customer_id not in pivot_table.index:
-        top_products = df.groupby("product_id")["rating"].mean().sort_values(ascending=False).head(top_n).index.tolist()
-        items = Item.objects.filter(product_id__in=top_products)
-        rec_list = []
-        for i in items:
-            if i.product:
-                PestRecommendation.objects.create(
-                    customer_id=customer_id,
-                    base_product_id=None,
-                    recommended_product_id=i.product.product_id,
-                    recommendation_type="collaborative",
-                    confidence_score=0
-                )
-            if return_scores:
-                rec_list.append({
-                    "product_id": i.product.product_id if i.product else None,
-                    "title": i.title,
-                    "category": i.category,
-                    "score": 0
-                })
+    # Fallback: no ratings
+    if ratings.nnz == 0:
+        popular_items = popular_items_for_customer(customer_id, top_n)
+        rec_list = _store(customer_id, popular_items, return_scores=return_scores)
+        return rec_list if return_scores else popular_items
+
+    if customer_id not in ratings:
+        items = popular_items_for_customer(customer_id, top_n)
+        rec_list = _store(customer_id, items, return_scores=return_scores)
         return rec_list if return_scores else items
 
-    # Load similarity matrix
-    try:
-        saved_model = SavedModel.objects.filter(name="recommender_similarity").latest("created_at")
-        with open(saved_model.file_path, "rb") as f:
-            similarity_matrix = pickle.load(f)
-    except Exception:
-        similarity_matrix = None
+    # Load top-K item neighbours (cached in the process-wide model registry)
+    neighbors = load_item_neighbors()
 
-    if similarity_matrix is None:
-        top_products = df.groupby("product_id")["rating"].mean().sort_values(ascending=False).head(top_n).index.tolist()
-        items = Item.objects.filter(product_id__in=top_products)
-        rec_list = []
-        for i in items:
-            if i.product:
-                PestRecommendation.objects.create(
-                    customer_id=customer_id,
-                    base_product_id=None,
-                    recommended_product_id=i.product.product_id,
-                    recommendation_type="collaborative",
-                    confidence_score=0
-                )
-            if return_scores:
-                rec_list.append({
-                    "product_id": i.product.product_id if i.product else None,
-                    "title": i.title,
-                    "category": i.category,
-                    "score": 0
-                })
+    if neighbors is None:
+        items = popular_items_for_customer(customer_id, top_n)
+        rec_list = _store(customer_id, items, return_scores=return_scores)
         return rec_list if return_scores else items
 
     # Predict scores
-    user_vector = pivot_table.loc[customer_id].values.reshape(1, -1)
-    scores = np.dot(similarity_matrix, user_vector.T).flatten()
+    all_items = neighbors.product_ids.tolist()
+    user_vector = ratings.user_vector(customer_id, all_items)
+    scores = neighbors.score(user_vector)
 
-    rated_items = pivot_table.loc[customer_id][pivot_table.loc[customer_id] > 0].index
-    all_items = pivot_table.columns
+    rated_items = set(ratings.rated_products(customer_id))
     unrated_items = [i for i in all_items if i not in rated_items]
 
     predictions = pd.DataFrame({"product_id": all_items, "predicted_score": scores})
     recommendations = predictions[predictions["product_id"].isin(unrated_items)].sort_values("predicted_score", ascending=False).head(top_n)
+    top_scores = dict(zip(recommendations["product_id"].tolist(), recommendations["predicted_score"].tolist()))
 
-    items_qs = Item.objects.filter(product_id__in=recommendations["product_id"].tolist())
-    rec_list = []
-
-    for i in items_qs:
-        score = 0
-        if i.product:
-            score = predictions.loc[predictions["product_id"] == i.product.product_id, "predicted_score"].values[0]
-            PestRecommendation.objects.create(
-                customer_id=customer_id,
-                base_product_id=None,
-                recommended_product_id=i.product.product_id,
-                recommendation_type="collaborative",
-                confidence_score=score
-            )
-        if return_scores:
-            rec_list.append({
-                "product_id": i.product.product_id if i.product else None,
-                "title": i.title,
-                "category": i.category,
-                "score": float(score)
-            })
+    items_qs = Item.objects.filter(product_id__in=list(top_scores))
+    rec_list = _store(customer_id, items_qs, top_scores, neighbors.model_version or "", return_scores)
 
     return rec_list if return_scores else items_qs
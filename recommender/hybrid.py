@@ -0,0 +1,279 @@
+# recommender/hybrid.py
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections
+
+from recommender.models import Item
+
+
+# ------------------------
+# Settings
+# ------------------------
+DEFAULT_WEIGHTS = {
+    "item_cf": 1.0,
+    "svd": 1.0,
+    "user_based": 0.8,
+    "content": 0.6,
+    "rules": 0.6,
+    "fabricated": 0.3,
+    "popularity": 0.1,
+}
+WEIGHTS = getattr(settings, "RECOMMENDER_HYBRID_WEIGHTS", DEFAULT_WEIGHTS)
+# Seconds an engine may take before the ranker goes on without it.
+DEFAULT_TIMEOUT = getattr(settings, "RECOMMENDER_HYBRID_TIMEOUT", 0.3)
+TIMEOUTS = getattr(settings, "RECOMMENDER_HYBRID_TIMEOUTS", {})
+WORKERS = getattr(settings, "RECOMMENDER_HYBRID_WORKERS", 8)
+CANDIDATES_PER_ENGINE = getattr(settings, "RECOMMENDER_HYBRID_CANDIDATES", 50)
+# Share of rankings written to HybridRankingDebug (through Celery).
+DEBUG_SAMPLE_RATE = getattr(settings, "RECOMMENDER_HYBRID_DEBUG_SAMPLE_RATE", 0.01)
+
+
+# ------------------------
+# Candidate generators: customer_id, n -> [(product_id, score), ...]
+# ------------------------
+def _ranked(product_ids):
+    """Rank-only engines: 1, 1/2, 1/3, ..."""
+    return [(pid, 1.0 / (rank + 1)) for rank, pid in enumerate(product_ids)]
+
+
+def _top(product_ids, scores, n):
+    n = min(n, int(np.isfinite(scores).sum()))
+    if n <= 0:
+        return []
+    top = np.argpartition(-scores, n - 1)[:n]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [(int(product_ids[i]), float(scores[i])) for i in top]
+
+
+def item_cf_candidates(customer_id, n):
+    from recommender.rating_matrix import get_rating_matrix
+    from recommender.recommender_engine import load_item_neighbors
+
+    ratings = get_rating_matrix()
+    neighbors = load_item_neighbors()
+    if neighbors is None or customer_id not in ratings:
+        return []
+    user_vector = ratings.user_vector(customer_id, neighbors.product_ids)
+    scores = neighbors.score(user_vector)
+    scores[user_vector > 0] = -np.inf
+    scores[scores <= 0] = -np.inf
+    return _top(neighbors.product_ids, scores, n)
+
+
+def svd_candidates(customer_id, n):
+    from recommender.rating_matrix import get_rating_matrix
+    from recommender.utils import load_cf_svd
+
+    data = load_cf_svd()
+    if not data or customer_id not in data["user_map"]:
+        return []
+    scores = np.asarray(data["item_factors"] @ data["user_factors"][data["user_map"][customer_id]], dtype=np.float64)
+    item_map = data["item_map"]
+    rated = [item_map[pid] for pid in get_rating_matrix().rated_products(customer_id) if pid in item_map]
+    scores[rated] = -np.inf
+    return _top(np.asarray(data["item_ids"]), scores, n)
+
+
+def user_based_candidates(customer_id, n):
+    from recommender.recommender_engine import load_user_based_scorer
+
+    scorer = load_user_based_scorer()
+    if scorer is None or customer_id not in scorer:
+        return []
+    return [(int(pid), float(score)) for pid, score in scorer.recommend(customer_id, n)]
+
+
+def content_candidates(customer_id, n):
+    from recommender.engines.content_based import get_content_recommendations
+
+    return [(item.product_id, float(item.score)) for item in get_content_recommendations(customer_id, top_k=n)
+            if item.product_id is not None]
+
+
+def rules_candidates(customer_id, n):
+    from recommender.association_rules import get_rule_index, customer_products
+
+    index = get_rule_index()
+    bought = customer_products(customer_id)
+    if index is None or not bought:
+        return []
+    # rule hits only (lift), not the popularity fill
+    return [(pid, float(lift)) for pid, _, _, lift in index.crosssell(list(bought), top_n=n) if lift is not None]
+
+
+def fabricated_candidates(customer_id, n):
+    from recommender.recommender_engine import get_fabricated_recommendations
+
+    return _ranked([int(x) for x in get_fabricated_recommendations(customer_id, n) if str(x).isdigit()])
+
+
+def popularity_candidates(customer_id, n):
+    from recommender.popularity import popular_for_customer
+
+    return _ranked(popular_for_customer(customer_id, n))
+
+
+ENGINES = {
+    "item_cf": item_cf_candidates,
+    "svd": svd_candidates,
+    "user_based": user_based_candidates,
+    "content": content_candidates,
+    "rules": rules_candidates,
+    "fabricated": fabricated_candidates,
+    "popularity": popularity_candidates,
+}
+
+
+# ------------------------
+# Concurrent gathering
+# ------------------------
+_pool = None
+_pool_lock = threading.Lock()
+_stalled = {}                 # engine -> timed-out runs still holding a pool worker
+_stalled_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="hybrid-ranker")
+        return _pool
+
+
+def _run_engine(func, customer_id, n):
+    # pool threads keep their own DB connection: drop it when stale
+    close_old_connections()
+    try:
+        started = time.perf_counter()
+        return func(customer_id, n), time.perf_counter() - started
+    finally:
+        close_old_connections()
+
+
+def _stall(name, future):
+    """Skip `name` until its timed-out run leaves the pool."""
+    with _stalled_lock:
+        _stalled[name] = _stalled.get(name, 0) + 1
+    future.add_done_callback(lambda _: _unstall(name))
+
+
+def _unstall(name):
+    with _stalled_lock:
+        _stalled[name] -= 1
+        if not _stalled[name]:
+            del _stalled[name]
+
+
+def gather_candidates(customer_id, engines=None, n=CANDIDATES_PER_ENGINE, timeouts=None):
+    """
+    Run the engines concurrently. Returns ({engine: [(product_id, score)]},
+    {engine: status}); an engine that fails or misses its timeout is left
+    out. A timed-out run keeps going in the pool (so a cold model load still
+    warms up), and the engine is skipped until it finishes, so a stuck
+    engine can't pile runs onto the shared workers.
+    """
+    engines = engines or [name for name, weight in WEIGHTS.items() if weight and name in ENGINES]
+    timeouts = {**TIMEOUTS, **(timeouts or {})}
+    pool = _get_pool()
+    started = time.perf_counter()
+    candidates, status = {}, {}
+    with _stalled_lock:
+        skipped = [name for name in engines if name in _stalled]
+    for name in skipped:
+        status[name] = {"status": "skipped"}
+    futures = {name: pool.submit(_run_engine, ENGINES[name], customer_id, n)
+               for name in engines if name not in skipped}
+
+    for name, future in futures.items():
+        # every engine's budget runs from the common start
+        remaining = started + timeouts.get(name, DEFAULT_TIMEOUT) - time.perf_counter()
+        try:
+            result, seconds = future.result(timeout=max(remaining, 0.0))
+            candidates[name] = result
+            status[name] = {"status": "ok", "ms": round(seconds * 1000.0, 2), "candidates": len(result)}
+        except TimeoutError:
+            if not future.cancel():
+                _stall(name, future)
+            status[name] = {"status": "timeout"}
+        except Exception as e:
+            status[name] = {"status": "error", "error": str(e)}
+    return candidates, status
+
+
+# ------------------------
+# Fusion
+# ------------------------
+def fuse(candidates, weights=None):
+    """
+    Weighted sum of per-engine scores, each engine scaled to [0, 1] by its
+    best candidate. Returns [(product_id, score, {engine: contribution})]
+    best first.
+    """
+    weights = weights or WEIGHTS
+    fused = {}
+    for name, ranked in candidates.items():
+        weight = weights.get(name, 0.0)
+        if not weight or not ranked:
+            continue
+        scale = max(abs(score) for _, score in ranked) or 1.0
+        for pid, score in ranked:
+            entry = fused.setdefault(pid, [0.0, {}])
+            contribution = weight * score / scale
+            entry[0] += contribution
+            entry[1][name] = round(contribution, 4)
+    return sorted(((pid, total, parts) for pid, (total, parts) in fused.items()), key=lambda r: (-r[1], r[0]))
+
+
+def hybrid_recommendations(customer_id, top_n=5, weights=None, engines=None, timeouts=None):
+    """
+    Top-N Items (with .score and .engines) fused from every engine that
+    answered in time. Falls back to segment popularity when none did.
+    """
+    started = time.perf_counter()
+    weights = weights or WEIGHTS
+    engines = engines or [name for name, weight in weights.items() if weight and name in ENGINES]
+    candidates, status = gather_candidates(customer_id, engines, timeouts=timeouts)
+    ranked = fuse(candidates, weights)[:top_n]
+    if not ranked:
+        from recommender.popularity import popular_for_customer
+        ranked = [(pid, score, {"popularity": score}) for pid, score in _ranked(popular_for_customer(customer_id, top_n))]
+
+    items = Item.objects.in_bulk([pid for pid, _, _ in ranked], field_name="product_id")
+    results = []
+    for pid, score, parts in ranked:
+        item = items.get(pid)
+        if item is not None:
+            item.score = score
+            item.engines = parts
+            results.append(item)
+
+    if DEBUG_SAMPLE_RATE and random.random() < DEBUG_SAMPLE_RATE:
+        log_ranking_debug(customer_id, candidates, status, ranked, weights, time.perf_counter() - started)
+    return results
+
+
+# ------------------------
+# Sampled, asynchronous debug logging
+# ------------------------
+def log_ranking_debug(customer_id, candidates, status, ranked, weights, seconds):
+    """Queue a HybridRankingDebug row; never blocks or fails the ranking."""
+    from recommender.tasks import log_hybrid_ranking_debug
+
+    debug_log = {
+        "engines": status,
+        "weights": weights,
+        "ranked": [{"product_id": pid, "score": round(score, 4), "engines": parts} for pid, score, parts in ranked],
+        "ms": round(seconds * 1000.0, 2),
+    }
+    num_candidates = len({pid for ranked_ in candidates.values() for pid, _ in ranked_})
+    try:
+        # no publish retries: a down broker drops the sample instead of stalling the request
+        log_hybrid_ranking_debug.apply_async((customer_id, num_candidates, debug_log), retry=False)
+    except Exception as e:
+        print("⚠️ Could not queue hybrid ranking debug:", e)
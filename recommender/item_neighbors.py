@@ -0,0 +1,237 @@
+# recommender/item_neighbors.py
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+
+from recommender.quantization import quantize_csr, compact_indices, check_mode, QUANTIZATION
+
+
+# ------------------------
+# Artifact format
+# ------------------------
+# v1 = dense pickled DataFrame (recommender_similarity.pkl, SavedModel "recommender_similarity")
+# v2 = this module: top-K neighbours per product, float32 CSR in an .npz file
+# v3 = v2 + quantization: float16 data, or int8 data with a per-row scale
+FORMAT_NAME = "item_topk"
+FORMAT_VERSION = 3
+READABLE_VERSIONS = (2, 3)
+DEFAULT_K = getattr(settings, "RECOMMENDER_ITEM_NEIGHBORS_K", 50)
+BLOCK_SIZE = 1024  # products per similarity block while building
+
+
+class ItemNeighborIndex:
+    """
+    Item-item cosine similarity pruned to the top-K neighbours of each product.
+
+    Row i of `matrix` holds the K most similar products of product_ids[i]
+    (self excluded) with float32 scores, so memory and load time grow with
+    n_products * K instead of n_products². The scores may be stored
+    quantized (see recommender.quantization): float16, or int8 with
+    row_scale[i] per row; they are dequantized while scoring. Quantized
+    indexes also keep their column indices as uint16 below 65536 products.
+    """
+
+    def __init__(self, product_ids, matrix, k=None, row_scale=None, quantization="float32"):
+        self.product_ids = np.asarray(product_ids, dtype=np.int64)
+        self.product_index = {int(pid): i for i, pid in enumerate(self.product_ids)}
+        matrix = matrix.tocsr()
+        self.shape = matrix.shape
+        self.data, self.indptr = matrix.data, matrix.indptr
+        self.indices = matrix.indices
+        if quantization != "float32":
+            self.indices = compact_indices(matrix.indices, self.shape[1])
+        self.k = k
+        self.row_scale = row_scale
+        self.quantization = quantization
+        self.model_version = None
+        self.base_version = None  # patches: model_version of the index they were applied to
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    @property
+    def matrix(self):
+        """The stored scores as a scipy CSR (a copy with int32 indices when they are stored as uint16)."""
+        return sp.csr_matrix((self.data, self.indices, self.indptr), shape=self.shape)
+
+    # ------------------------
+    # Building
+    # ------------------------
+    @classmethod
+    def build(cls, ratings, product_ids, k=DEFAULT_K, block_size=BLOCK_SIZE):
+        """
+        Build from a sparse customers x products rating matrix, computing the
+        cosine similarity block by block so the dense NxN matrix never exists.
+        """
+        Xn, XnT = _normalized_columns(ratings)
+        n_items = Xn.shape[1]
+        matrix = _top_k_rows(Xn, XnT, np.arange(n_items), k, block_size)
+        return cls(product_ids, matrix, k=k)
+
+    def with_rows(self, ratings, product_ids, products, block_size=BLOCK_SIZE):
+        """
+        Copy with the rows of `products` recomputed from `ratings` (customers x
+        product_ids) exactly as build() computes them; rated products missing
+        from the index are appended. Every other row is kept as it is.
+        """
+        ids = self.product_ids.tolist()
+        positions = dict(self.product_index)
+        for pid in np.asarray(product_ids, dtype=np.int64).tolist():
+            if pid not in positions:
+                positions[pid] = len(ids)
+                ids.append(pid)
+        n = len(ids)
+
+        rating_ids = np.asarray(product_ids, dtype=np.int64).tolist()
+        rating_col = {pid: c for c, pid in enumerate(rating_ids)}
+        to_index = np.array([positions[pid] for pid in rating_ids], dtype=np.int64)
+        columns = np.array(sorted({rating_col[p] for p in products if p in rating_col}), dtype=np.int64)
+
+        Xn, XnT = _normalized_columns(ratings)
+        new = _top_k_rows(Xn, XnT, columns, n if self.k is None else self.k, block_size).tocoo()
+        old = self.similarities().tocoo()
+        keep = ~np.isin(old.row, to_index[columns])
+        matrix = sp.csr_matrix(
+            (
+                np.concatenate([old.data[keep], new.data]).astype(np.float32),
+                (np.concatenate([old.row[keep], to_index[columns][new.row]]),
+                 np.concatenate([old.col[keep], to_index[new.col]])),
+            ),
+            shape=(n, n),
+        )
+        return ItemNeighborIndex(ids, matrix, k=self.k).quantize(self.quantization)
+
+    @classmethod
+    def from_dataframe(cls, similarity_df, k=None):
+        """Convert a legacy (v1) dense similarity DataFrame."""
+        product_ids = [int(pid) for pid in similarity_df.index]
+        dense = similarity_df.reindex(columns=similarity_df.index).fillna(0).to_numpy(dtype=np.float32, copy=True)
+        np.fill_diagonal(dense, 0.0)
+        if k is not None and k < dense.shape[1]:
+            drop = np.argpartition(-dense, k, axis=1)[:, k:]
+            np.put_along_axis(dense, drop, 0.0, axis=1)
+        return cls(product_ids, sp.csr_matrix(dense), k=k)
+
+    # ------------------------
+    # Quantization
+    # ------------------------
+    def quantize(self, mode=QUANTIZATION):
+        """Copy with the scores stored as `mode` (float32 / float16 / int8)."""
+        matrix, row_scale = quantize_csr(self.similarities(), check_mode(mode))
+        return ItemNeighborIndex(self.product_ids, matrix, k=self.k, row_scale=row_scale, quantization=mode)
+
+    def similarities(self):
+        """The float32 similarity CSR (dequantized copy when quantized)."""
+        if self.quantization == "float32":
+            return self.matrix
+        data = self.data.astype(np.float32)
+        if self.row_scale is not None:
+            data *= np.repeat(self.row_scale, np.diff(self.indptr))
+        return sp.csr_matrix((data, self.indices, self.indptr), shape=self.shape)
+
+    def memory_bytes(self):
+        scale = self.row_scale.nbytes if self.row_scale is not None else 0
+        return self.data.nbytes + self.indices.nbytes + self.indptr.nbytes + scale
+
+    # ------------------------
+    # Persistence
+    # ------------------------
+    def save(self, path):
+        extra = {"row_scale": self.row_scale} if self.row_scale is not None else {}
+        if self.base_version is not None:
+            extra["base_version"] = np.array(self.base_version)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                format=np.array(FORMAT_NAME),
+                version=np.array(FORMAT_VERSION),
+                k=np.array(-1 if self.k is None else self.k),
+                quantization=np.array(self.quantization),
+                product_ids=self.product_ids,
+                indptr=self.indptr,
+                indices=self.indices,
+                data=self.data,
+                **extra,
+            )
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            if str(f["format"]) != FORMAT_NAME or int(f["version"]) not in READABLE_VERSIONS:
+                raise ValueError(f"Unsupported similarity artifact {path}: {f['format']} v{f['version']}")
+            n = len(f["product_ids"])
+            matrix = sp.csr_matrix((f["data"], f["indices"], f["indptr"]), shape=(n, n))
+            k = int(f["k"])
+            index = cls(
+                f["product_ids"], matrix, k=None if k < 0 else k,
+                row_scale=f["row_scale"] if "row_scale" in f.files else None,
+                quantization=str(f["quantization"]) if "quantization" in f.files else "float32",
+            )
+            if "base_version" in f.files:
+                index.base_version = str(f["base_version"])
+            return index
+
+    # ------------------------
+    # Scoring
+    # ------------------------
+    def score(self, user_vector):
+        """Scores for every product from a rating vector aligned to product_ids."""
+        scores = np.asarray(self.matrix @ user_vector, dtype=np.float32).ravel()
+        if self.row_scale is not None:
+            scores *= self.row_scale
+        return scores
+
+    def score_matrix(self, user_matrix):
+        """Scores for a block of users (sparse n_users x n_products, aligned)."""
+        scores = user_matrix @ self.matrix.T
+        if self.row_scale is not None:
+            scores = scores @ sp.diags(self.row_scale)
+        return scores
+
+    def neighbors(self, product_id, top_n=10):
+        """[(product_id, score), ...] most similar to `product_id`."""
+        pos = self.product_index.get(int(product_id))
+        if pos is None:
+            return []
+        # raw CSR slices: scipy can't index float16 matrices
+        start, stop = self.indptr[pos], self.indptr[pos + 1]
+        values = self.data[start:stop].astype(np.float32)
+        if self.row_scale is not None:
+            values *= self.row_scale[pos]
+        indices = self.indices[start:stop]
+        order = np.argsort(-values, kind="stable")[:top_n]
+        return [(int(self.product_ids[indices[i]]), float(values[i])) for i in order]
+
+
+def _normalized_columns(ratings):
+    """(CSC, CSR of its transpose) of the rating matrix with unit-norm product columns."""
+    X = sp.csr_matrix(ratings, dtype=np.float32)
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=0)).ravel())
+    inv = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+    Xn = (X @ sp.diags(inv.astype(np.float32))).tocsc()
+    return Xn, Xn.T.tocsr()
+
+
+def _top_k_rows(Xn, XnT, columns, k, block_size=BLOCK_SIZE):
+    """(len(columns) x n_items) CSR: the top-k positive cosines of each column, self excluded."""
+    n_items = Xn.shape[1]
+    k_eff = max(0, min(k, n_items - 1))
+    rows, cols, vals = [], [], []
+    for start in range(0, len(columns) if k_eff else 0, block_size):
+        block = columns[start:start + block_size]
+        sims = (XnT[block] @ Xn).toarray()
+        local = np.arange(len(block))
+        sims[local, block] = 0.0  # drop self-similarity
+        top = np.argpartition(-sims, k_eff - 1, axis=1)[:, :k_eff]
+        top_vals = np.take_along_axis(sims, top, axis=1)
+        keep = top_vals > 0
+        rows.append((start + np.repeat(local[:, None], k_eff, axis=1))[keep])
+        cols.append(top[keep])
+        vals.append(top_vals[keep])
+
+    if rows:
+        rows, cols, vals = np.concatenate(rows), np.concatenate(cols), np.concatenate(vals)
+    return sp.csr_matrix(
+        (np.asarray(vals, dtype=np.float32), (rows, cols)), shape=(len(columns), n_items)
+    )
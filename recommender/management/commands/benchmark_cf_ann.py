@@ -0,0 +1,93 @@
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from recommender.ann import ItemFactorLSH, ANN_TABLES, ANN_BITS, ANN_RERANK, exact_top_k
+from recommender.utils import load_cf_svd
+
+
+class Command(BaseCommand):
+    help = "Compare recall@K and latency of the LSH item-factor index against the exact scan"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-k", type=int, default=10)
+        parser.add_argument("--queries", type=int, default=500, help="Users sampled as queries")
+        parser.add_argument("--tables", type=int, nargs="+", default=[ANN_TABLES])
+        parser.add_argument("--bits", type=int, nargs="+", default=[ANN_BITS])
+        parser.add_argument("--rerank", type=int, nargs="+", default=[ANN_RERANK])
+        parser.add_argument("--synthetic", type=int, default=0,
+                            help="Benchmark clustered synthetic factors for this many items instead of the saved cf_svd model")
+        parser.add_argument("--factors", type=int, default=64, help="Factor size for --synthetic")
+        parser.add_argument("--clusters", type=int, default=200, help="Taste clusters for --synthetic")
+        parser.add_argument("--output", help="Write the results as JSON to this path")
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(0)
+        if options["synthetic"]:
+            # CF factors are clustered (taste groups), unlike i.i.d. Gaussian noise
+            centers = rng.standard_normal((options["clusters"], options["factors"]))
+            n_items = options["synthetic"]
+            item_factors = centers[rng.integers(0, len(centers), n_items)] + 0.3 * rng.standard_normal((n_items, options["factors"]))
+            item_factors = (item_factors * rng.lognormal(0, 0.3, (n_items, 1))).astype(np.float32)
+            user_factors = centers[rng.integers(0, len(centers), options["queries"])]
+            user_factors = (user_factors + 0.3 * rng.standard_normal(user_factors.shape)).astype(np.float32)
+            source = f"synthetic {options['synthetic']} items"
+        else:
+            data = load_cf_svd()
+            if not data:
+                self.stdout.write(self.style.WARNING("⚠️ No cf_svd model saved. Train one or use --synthetic."))
+                return
+            item_factors = np.asarray(data["item_factors"], dtype=np.float32)
+            user_factors = np.asarray(data["user_factors"], dtype=np.float32)
+            source = f"cf_svd ({len(item_factors)} items)"
+
+        top_k = options["top_k"]
+        picks = rng.choice(len(user_factors), size=min(options["queries"], len(user_factors)), replace=False)
+        queries = user_factors[picks]
+
+        exact, exact_times = [], []
+        for q in queries:
+            started = time.perf_counter()
+            exact.append(set(exact_top_k(item_factors, q, top_k).tolist()))
+            exact_times.append(time.perf_counter() - started)
+
+        results = [{"config": "exact", **self._latency(exact_times), "recall": 1.0}]
+        for n_tables in options["tables"]:
+            for n_bits in options["bits"]:
+                started = time.perf_counter()
+                index = ItemFactorLSH.build(item_factors, n_tables=n_tables, n_bits=n_bits)
+                build_seconds = time.perf_counter() - started
+                for rerank in options["rerank"]:
+                    times, hits, candidates = [], 0, 0
+                    for q, truth in zip(queries, exact):
+                        started = time.perf_counter()
+                        found = index.search(q, item_factors, top_k, rerank=rerank)
+                        times.append(time.perf_counter() - started)
+                        hits += len(truth & set(found.tolist()))
+                        candidates += len(index.candidates(q)[0])
+                    results.append({
+                        "config": f"lsh tables={n_tables} bits={n_bits} rerank={rerank}",
+                        **self._latency(times),
+                        "recall": hits / (len(queries) * top_k),
+                        "mean_candidates": candidates / len(queries),
+                        "build_seconds": build_seconds,
+                    })
+
+        self.stdout.write(f"{source}, {len(queries)} queries, recall@{top_k}")
+        for r in results:
+            self.stdout.write(
+                f"{r['config']:<40} recall={r['recall']:.3f}  p50={r['p50_ms']:.3f}ms  "
+                f"p95={r['p95_ms']:.3f}ms  candidates={r.get('mean_candidates', len(item_factors)):.0f}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump({"source": source, "top_k": top_k, "queries": len(queries), "results": results}, f, indent=2)
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark finished"))
+
+    @staticmethod
+    def _latency(times):
+        ms = np.asarray(times) * 1000
+        return {"p50_ms": float(np.percentile(ms, 50)), "p95_ms": float(np.percentile(ms, 95)), "mean_ms": float(ms.mean())}
@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from recommender.benchmark import run_benchmark, compare_reports, ENTRY_POINTS
+
+
+class Command(BaseCommand):
+    help = "Latency / query-count / memory benchmark of the recommender entry points"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entry-points", nargs="+", choices=sorted(ENTRY_POINTS))
+        parser.add_argument("--iterations", type=int, default=100)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the JSON report to this path")
+        parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+
+    def handle(self, *args, **options):
+        report = run_benchmark(
+            entry_points=options["entry_points"],
+            iterations=options["iterations"],
+            warmup=options["warmup"],
+            seed=options["seed"],
+            output=options["output"],
+        )
+        dataset = report["dataset"]
+        self.stdout.write(
+            f"{report['database']}: {dataset['ratings']} ratings, {dataset['items']} items, "
+            f"{dataset['recommendations']} recommendations"
+        )
+        for name, r in report["results"].items():
+            if "error" in r:
+                self.stdout.write(self.style.WARNING(f"⚠️ {name}: {r['error']}"))
+                continue
+            ms = r["latency_ms"]
+            self.stdout.write(
+                f"{name:<36} p50={ms['p50']:.2f}ms  p95={ms['p95']:.2f}ms  p99={ms['p99']:.2f}ms  "
+                f"queries={r['queries']['mean']:.1f}  alloc={r['peak_alloc_mb']}MB  rss={r['peak_rss_mb']}MB"
+                + (f"  errors={r['errors']}" if r["errors"] else "")
+            )
+
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            self.stdout.write(f"\nvs {options['baseline']}:")
+            for name, rows in compare_reports(baseline, report).items():
+                changes = "  ".join(f"{metric} {old}→{new} ({change:+.1f}%)" for metric, (old, new, change) in rows.items())
+                self.stdout.write(f"{name:<36} {changes}")
+
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark finished"))
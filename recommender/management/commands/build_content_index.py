@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recommender.content_index import build_content_index
+
+
+class Command(BaseCommand):
+    help = "Refresh the persisted TF-IDF content index with changed Items (or rebuild it)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Refit the vectorizer on every Item")
+
+    def handle(self, *args, **options):
+        index, changed = build_content_index(full=options["full"])
+        if not len(index):
+            self.stdout.write(self.style.WARNING("⚠️ No items found. The content index is empty."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Content index saved: {len(index)} items, {changed} changed, "
+            f"{len(index.vectorizer.vocabulary_)} terms"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recommender.customer_similarity import build_customer_similarity_index
+
+
+class Command(BaseCommand):
+    help = "Refresh the persisted customer MinHash/LSH index with new purchases (or rebuild it)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Re-sign every customer")
+
+    def handle(self, *args, **options):
+        index, changed = build_customer_similarity_index(full=options["full"])
+        if not len(index):
+            self.stdout.write(self.style.WARNING("⚠️ No customer products found. The index is empty."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Customer MinHash index saved: {len(index)} customers, {changed} updated, "
+            f"{index.num_perm} permutations in {index.bands} bands"
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recommender.engines.rule_based import build_lead_suggestions
+
+
+class Command(BaseCommand):
+    help = "Evaluate the upsell / cross-sell rule table over every open lead and save the suggestions"
+
+    def handle(self, *args, **options):
+        suggestions = build_lead_suggestions()
+        if suggestions.empty:
+            self.stdout.write(self.style.WARNING("⚠️ No open leads found. The suggestion table is empty."))
+            return
+        upsell = int(suggestions["upsell"].map(bool).sum())
+        cross_sell = int(suggestions["cross_sell"].map(bool).sum())
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Lead rule suggestions saved: {len(suggestions)} open leads "
+            f"({upsell} with upsell, {cross_sell} with cross-sell)"
+        ))
@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from recommender import artifacts
+from recommender.recommender_engine import TRAINED_MODELS_DIR
+
+
+# CSV matrices in trained_models/ read through their artifact (the user-based
+# scorer) -> (dtype, fill value for empty cells)
+MATRICES = {
+    "user_item_matrix.csv": (np.float32, 0),
+    "user_similarity_matrix.csv": (np.float32, 0),
+}
+
+
+class Command(BaseCommand):
+    help = "Convert trained_models/ CSV matrices into memory-mapped .npy artifacts (+ .json id sidecar)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=TRAINED_MODELS_DIR, help="Directory holding the CSVs")
+
+    def handle(self, *args, **options):
+        directory = options["dir"]
+        converted = 0
+        for name, (dtype, fill) in MATRICES.items():
+            csv_path = os.path.join(directory, name)
+            if not os.path.exists(csv_path):
+                continue
+            try:
+                npy_path = artifacts.convert_csv(csv_path, dtype=dtype, fill=fill)
+            except Exception as e:
+                self.stdout.write(self.style.WARNING(f"⚠️ Skipped {name}: {e}"))
+                continue
+            self.stdout.write(f"{name} → {os.path.basename(npy_path)}")
+            converted += 1
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Converted {converted} matrices in {directory}"))
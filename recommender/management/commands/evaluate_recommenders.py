@@ -0,0 +1,65 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from recommender.evaluation import run_evaluation, DEFAULT_VARIANTS, QUANTIZATION_VARIANTS, MODELS
+
+
+class Command(BaseCommand):
+    help = "Offline evaluation of recommender variants on a temporal split (P/R/NDCG/MAP@K)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--k", type=int, default=10)
+        parser.add_argument("--test-fraction", type=float, default=0.2,
+                            help="Share of the most recent interactions held out")
+        parser.add_argument("--sources", nargs="+", choices=["rating", "invoice"], default=["rating", "invoice"])
+        parser.add_argument("--models", nargs="+", choices=sorted(MODELS),
+                            help="Default variants of these models only")
+        parser.add_argument("--variants", help="JSON file with [{name, model, params}, ...]")
+        parser.add_argument("--quantization", action="store_true",
+                            help="Compare float32 / float16 / int8 storage (accuracy vs memory)")
+        parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+        parser.add_argument("--output", help="Write the JSON report to this path")
+
+    def handle(self, *args, **options):
+        variants = QUANTIZATION_VARIANTS if options["quantization"] else DEFAULT_VARIANTS
+        if options["variants"]:
+            with open(options["variants"]) as f:
+                variants = json.load(f)
+        if options["models"]:
+            variants = [v for v in variants if v["model"] in options["models"]]
+
+        report = run_evaluation(
+            variants=variants,
+            k=options["k"],
+            test_fraction=options["test_fraction"],
+            sources=options["sources"],
+            n_jobs=options["jobs"],
+            output=options["output"],
+        )
+        split = report["split"]
+        if not split["test_cells"]:
+            self.stdout.write(self.style.WARNING("⚠️ No test interactions after the cutoff. Nothing to evaluate."))
+            return
+
+        k = report["k"]
+        self.stdout.write(
+            f"cutoff {split['cutoff']}: {split['train_cells']} train / {split['test_cells']} test cells, "
+            f"{split['test_customers']} test customers"
+        )
+        for r in report["results"]:
+            if "error" in r:
+                self.stdout.write(self.style.WARNING(f"⚠️ {r['name']}: {r['error']}"))
+                continue
+            self.stdout.write(
+                f"{r['name']:<16} P@{k}={r[f'precision@{k}']:.4f}  R@{k}={r[f'recall@{k}']:.4f}  "
+                f"NDCG@{k}={r[f'ndcg@{k}']:.4f}  MAP@{k}={r[f'map@{k}']:.4f}  "
+                f"mem={r['model_bytes'] / 1e6:.2f}MB  fit={r['fit_seconds']:.2f}s  score={r['score_seconds']:.2f}s"
+            )
+        for q in report["quantization"]:
+            ratio = f"{q['memory_ratio']:.1f}x smaller" if q["memory_ratio"] else "n/a"
+            self.stdout.write(
+                f"{q['name']:<16} vs {q['baseline']}: {ratio}, "
+                f"ΔNDCG@{k}={q[f'delta_ndcg@{k}']:+.4f}  ΔR@{k}={q[f'delta_recall@{k}']:+.4f}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"✅ Evaluation finished in {report['seconds']:.2f}s"))
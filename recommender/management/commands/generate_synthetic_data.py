@@ -0,0 +1,236 @@
+import datetime
+from contextlib import contextmanager
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from crmapp.models import customer_details, Product, Branch, BankAccounts, TaxInvoice, TaxInvoiceItem
+from recommender.models import Item, Rating, PestRecommendation
+
+
+CUSTOMER_PREFIX = "Synthetic Customer"
+PRODUCT_PREFIX = "Synthetic Product"
+INVOICE_MARKER = "Synthetic invoice"
+CATEGORIES = ["Pest Control", "Fumigation", "Product Sale"]
+WORDS = (
+    "cockroach termite rodent mosquito bed bug ant fly lizard spray gel bait fogging fumigation "
+    "treatment control annual maintenance herbal odourless residential commercial warehouse "
+    "kitchen garden wood sanitisation disinfection premium basic monthly quarterly"
+).split()
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic customers, products, ratings, invoices and recommendations for benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ratings", type=int, default=10_000, help="e.g. 10000 / 100000 / 1000000")
+        parser.add_argument("--customers", type=int, help="Default: ratings / 20")
+        parser.add_argument("--products", type=int, help="Default: max(200, ratings / 500)")
+        parser.add_argument("--invoices", type=int, help="Default: customers")
+        parser.add_argument("--recommendations", type=int, help="PestRecommendation rows (default: ratings / 10)")
+        parser.add_argument("--days", type=int, default=180,
+                            help="Spread rating and invoice timestamps over this many days")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--purge", action="store_true", help="Delete previously generated synthetic rows and exit")
+
+    def handle(self, *args, **options):
+        if options["purge"]:
+            self._purge()
+            return
+
+        n_ratings = options["ratings"]
+        n_customers = options["customers"] or max(10, n_ratings // 20)
+        n_products = options["products"] or max(200, n_ratings // 500)
+        n_invoices = options["invoices"] if options["invoices"] is not None else n_customers
+        n_recs = options["recommendations"] if options["recommendations"] is not None else n_ratings // 10
+        self.batch = options["batch_size"]
+        rng = np.random.default_rng(options["seed"])
+
+        customers = self._customers(n_customers)
+        products = self._products(n_products, rng)
+        # heavy-tailed activity / popularity like real order data
+        customer_p = self._zipf(len(customers), 1.1, rng)
+        product_p = self._zipf(len(products), 1.2, rng)
+
+        self._ratings(n_ratings, customers, products, customer_p, product_p, options["days"], rng)
+        self._invoices(n_invoices, customers, products, customer_p, product_p, options["days"], rng)
+        self._recommendations(n_recs, customers, products, customer_p, product_p, rng)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Generated {len(customers)} customers, {len(products)} products, {n_ratings} ratings, "
+            f"{n_invoices} invoices, {n_recs} recommendations"
+        ))
+
+    # ------------------------
+    # Generators
+    # ------------------------
+    @staticmethod
+    def _zipf(n, exponent, rng):
+        weights = 1.0 / np.arange(1, n + 1) ** exponent
+        return rng.permutation(weights / weights.sum())
+
+    def _customers(self, n):
+        start = (customer_details.objects.aggregate(m=Max("primarycontact"))["m"] or 7_000_000_000) + 1
+        offset = customer_details.objects.filter(fullname__startswith=CUSTOMER_PREFIX).count()
+        address = dict.fromkeys(
+            ["shifttopartyaddress", "shifttopartycity", "shifttopartystate", "shifttopartypostal",
+             "soldtopartyaddress", "soldtopartycity", "soldtopartystate", "soldtopartypostal"], "synthetic"
+        )
+        rows = [
+            customer_details(
+                fullname=f"{CUSTOMER_PREFIX} {offset + i}",
+                primaryemail=f"synthetic{offset + i}@example.com",
+                primarycontact=start + i,
+                contactperson="synthetic",
+                designation="synthetic",
+                **address,
+            )
+            for i in range(n)
+        ]
+        self._bulk(customer_details, rows)
+        ids = list(
+            customer_details.objects.filter(primarycontact__gte=start).order_by("primarycontact")
+            .values_list("id", flat=True)[:n]
+        )
+        self.stdout.write(f"customers: {len(ids)}")
+        return np.asarray(ids, dtype=np.int64)
+
+    def _products(self, n, rng):
+        offset = Product.objects.filter(product_name__startswith=PRODUCT_PREFIX).count()
+        names = [f"{PRODUCT_PREFIX} {offset + i}" for i in range(n)]
+        categories = rng.choice(CATEGORIES, size=n)
+        self._bulk(Product, [Product(product_name=name, category=cat) for name, cat in zip(names, categories)])
+        products = list(
+            Product.objects.filter(product_name__in=names).order_by("product_id").values_list("product_id", "category")
+        )
+        items = [
+            Item(
+                product_id=pid,
+                title=f"{PRODUCT_PREFIX} {offset + i}",
+                description=" ".join(rng.choice(WORDS, size=12)),
+                category=category,
+                tags=" ".join(rng.choice(WORDS, size=3)),
+            )
+            for i, (pid, category) in enumerate(products)
+        ]
+        self._bulk(Item, items)
+        self.stdout.write(f"products: {len(products)}")
+        return np.asarray([pid for pid, _ in products], dtype=np.int64)
+
+    @staticmethod
+    def _timestamps(offset, size, n, days, rng):
+        """
+        Per-row timestamps for rows offset..offset+size of n: uniform over the
+        last `days` days and increasing with the insert order (ids), like
+        real traffic, so watermark / delta reads see a realistic history.
+        """
+        start = timezone.now() - datetime.timedelta(days=days)
+        fractions = np.sort(rng.uniform(offset, offset + size, size=size)) / max(n, 1)
+        return [start + datetime.timedelta(days=days * float(f)) for f in fractions]
+
+    def _ratings(self, n, customers, products, customer_p, product_p, days, rng):
+        for offset in range(0, n, self.batch):
+            size = min(self.batch, n - offset)
+            c = rng.choice(customers, size=size, p=customer_p)
+            p = rng.choice(products, size=size, p=product_p)
+            r = rng.integers(1, 6, size=size)
+            ts = self._timestamps(offset, size, n, days, rng)
+            with _explicit(Rating, "timestamp"):
+                Rating.objects.bulk_create([
+                    Rating(customer_id=int(a), product_id=int(b), rating=float(v), timestamp=t)
+                    for a, b, v, t in zip(c, p, r, ts)
+                ])
+            self.stdout.write(f"ratings: {offset + size}/{n}", ending="\r")
+        self.stdout.write("")
+
+    def _invoices(self, n, customers, products, customer_p, product_p, days, rng):
+        if not n:
+            return
+        branch, _ = Branch.objects.get_or_create(
+            branch_name="Synthetic Branch",
+            defaults=dict(contact_1="0", email_1="synthetic@example.com", gst_number="-", pan_number="-",
+                          full_address="synthetic", state="synthetic", code=0, shortcut="SYN"),
+        )
+        bank, _ = BankAccounts.objects.get_or_create(
+            bank_name="Synthetic Bank", defaults=dict(account_number="0", ifs_code="-", branch="synthetic")
+        )
+        names = dict(Product.objects.filter(product_id__in=products.tolist()).values_list("product_id", "product_name"))
+        for offset in range(0, n, self.batch):
+            size = min(self.batch, n - offset)
+            buyers = rng.choice(customers, size=size, p=customer_p)
+            invoices = [
+                TaxInvoice(customer_id=int(c), branch=branch, bank=bank, service_titel=INVOICE_MARKER,
+                           shifttopartystate="synthetic", shifttopartystatecode="00",
+                           soldtopartystate="synthetic", soldtopartystatecode="00", created_at=t)
+                for c, t in zip(buyers, self._timestamps(offset, size, n, days, rng))
+            ]
+            with transaction.atomic(), _explicit(TaxInvoice, "created_at"):
+                # MySQL doesn't return bulk_create pks: select the batch by id instead
+                last_id = TaxInvoice.objects.aggregate(m=Max("id"))["m"] or 0
+                self._bulk(TaxInvoice, invoices)
+                ids = list(TaxInvoice.objects.filter(id__gt=last_id).values_list("id", flat=True))
+                lines = []
+                for invoice_id in ids:
+                    for pid in rng.choice(products, size=rng.integers(1, 5), p=product_p):
+                        price = Decimal(int(rng.integers(500, 20000)))
+                        quantity = Decimal(int(rng.integers(1, 4)))
+                        lines.append(TaxInvoiceItem(tax_invoice_id=invoice_id, product_name=names[int(pid)],
+                                                    quantity=quantity, price=price, total=price * quantity))
+                self._bulk(TaxInvoiceItem, lines)
+            self.stdout.write(f"invoices: {offset + size}/{n}", ending="\r")
+        self.stdout.write("")
+
+    def _recommendations(self, n, customers, products, customer_p, product_p, rng):
+        types = [key for key, _ in PestRecommendation.RECOMMENDATION_TYPES_CHOICES]
+        for offset in range(0, n, self.batch):
+            size = min(self.batch, n - offset)
+            rows = [
+                PestRecommendation(
+                    customer_id=int(c), base_product_id=int(b), recommended_product_id=int(r),
+                    recommendation_type=t, confidence_score=Decimal(f"{s:.2f}"),
+                )
+                for c, b, r, t, s in zip(
+                    rng.choice(customers, size=size, p=customer_p),
+                    rng.choice(products, size=size, p=product_p),
+                    rng.choice(products, size=size, p=product_p),
+                    rng.choice(types, size=size),
+                    rng.uniform(0.1, 0.99, size=size),
+                )
+            ]
+            self._bulk(PestRecommendation, rows)
+            self.stdout.write(f"recommendations: {offset + size}/{n}", ending="\r")
+        self.stdout.write("")
+
+    def _bulk(self, model, rows):
+        for start in range(0, len(rows), self.batch):
+            model.objects.bulk_create(rows[start:start + self.batch])
+
+    # ------------------------
+    # Cleanup
+    # ------------------------
+    def _purge(self):
+        counts = {
+            "customers": customer_details.objects.filter(fullname__startswith=CUSTOMER_PREFIX).delete()[0],
+            "products": Product.objects.filter(product_name__startswith=PRODUCT_PREFIX).delete()[0],
+            "branches": Branch.objects.filter(branch_name="Synthetic Branch").delete()[0],
+            "banks": BankAccounts.objects.filter(bank_name="Synthetic Bank").delete()[0],
+        }
+        self.stdout.write(self.style.SUCCESS(
+            "✅ Deleted synthetic rows (incl. cascades): " + ", ".join(f"{k}={v}" for k, v in counts.items())
+        ))
+
+
+@contextmanager
+def _explicit(model, field_name):
+    """Let bulk_create() keep the given value of an auto_now_add field."""
+    field = model._meta.get_field(field_name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
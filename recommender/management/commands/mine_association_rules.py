@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from recommender.association_rules import (
+    build_rule_index, MIN_SUPPORT_COUNT, MIN_CONFIDENCE, MIN_LIFT, MAX_CONSEQUENTS,
+)
+
+
+class Command(BaseCommand):
+    help = "Mine co-purchase association rules (support/confidence/lift) for cross-sell and upsell"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-support-count", type=int, default=MIN_SUPPORT_COUNT,
+                            help="Baskets a product pair must share")
+        parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+        parser.add_argument("--min-lift", type=float, default=MIN_LIFT)
+        parser.add_argument("--max-consequents", type=int, default=MAX_CONSEQUENTS,
+                            help="Rules kept per antecedent product")
+
+    def handle(self, *args, **options):
+        index = build_rule_index(
+            min_support_count=options["min_support_count"],
+            min_confidence=options["min_confidence"],
+            min_lift=options["min_lift"],
+            max_consequents=options["max_consequents"],
+        )
+        if not index.n_baskets:
+            self.stdout.write(self.style.WARNING("⚠️ No baskets found. The rule index is empty."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Association rules saved: {len(index)} rules for {len(index.rules)} products "
+            f"from {index.n_baskets} baskets"
+        ))
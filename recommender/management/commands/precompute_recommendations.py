@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recommender.precompute import precompute_recommendations
+
+
+class Command(BaseCommand):
+    help = "Score customers in one vectorized pass and store their top-N recommendations"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-n", type=int, default=10, help="Recommendations stored per customer")
+        parser.add_argument("--full", action="store_true", help="Rescore every customer, not only changed ones")
+
+    def handle(self, *args, **options):
+        result = precompute_recommendations(top_n=options["top_n"], full=options["full"])
+
+        if result["model_version"] is None:
+            self.stdout.write(self.style.WARNING("⚠️ No trained similarity model found. Run train_and_save_model() first."))
+            return
+
+        mode = "full" if result["full"] else "incremental"
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {mode} run: {result['written']} customers written (model {result['model_version']})"
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from recommender.popularity import refresh_popularity, HALF_LIFE_DAYS, TOP_K
+
+
+class Command(BaseCommand):
+    help = "Recompute time-decayed product popularity per branch / customer segment / category"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--half-life-days", type=float, default=HALF_LIFE_DAYS,
+                            help="Age at which an event counts half")
+        parser.add_argument("--top-k", type=int, default=TOP_K, help="Products kept per segment")
+
+    def handle(self, *args, **options):
+        rows = refresh_popularity(half_life_days=options["half_life_days"], top_k=options["top_k"])
+        if not rows:
+            self.stdout.write(self.style.WARNING("⚠️ No ratings or invoice lines found. The popularity table is empty."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"✅ Product popularity saved: {rows} rows"))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recommender.training import run_training, STEPS
+
+
+class Command(BaseCommand):
+    help = "Delta-train the recommender models from rows added since their watermarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Force a full rebuild of every step")
+        parser.add_argument("--steps", nargs="+", choices=STEPS, default=list(STEPS))
+
+    def handle(self, *args, **options):
+        report = run_training(full=options["full"], steps=options["steps"])
+        for step, result in report.items():
+            details = ", ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                                for k, v in result.items() if k != "mode" and v is not None)
+            line = f"{step}: {result['mode']}" + (f" ({details})" if details else "")
+            if result["mode"] == "failed":
+                self.stdout.write(self.style.WARNING(f"⚠️ {line}"))
+            else:
+                self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS("✅ Training run finished"))
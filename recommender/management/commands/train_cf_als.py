@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from recommender.utils import train_cf_als
+
+
+class Command(BaseCommand):
+    help = "Train implicit-feedback ALS factors and publish them as the cf_svd model"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--factors", type=int, default=64)
+        parser.add_argument("--regularization", type=float, default=0.1)
+        parser.add_argument("--alpha", type=float, default=40.0, help="Confidence weight per rating unit")
+        parser.add_argument("--iterations", type=int, default=15, help="Maximum ALS iterations")
+        parser.add_argument("--jobs", type=int, default=None, help="Worker threads (default: all cores)")
+        parser.add_argument("--validation", type=float, default=0.1, help="Held-out fraction for early stopping (0 = off)")
+        parser.add_argument("--patience", type=int, default=2)
+
+    def handle(self, *args, **options):
+        payload = train_cf_als(
+            factors=options["factors"],
+            regularization=options["regularization"],
+            alpha=options["alpha"],
+            iterations=options["iterations"],
+            n_jobs=options["jobs"],
+            validation_fraction=options["validation"],
+            patience=options["patience"],
+        )
+        if payload is None:
+            self.stdout.write(self.style.WARNING("⚠️ No ratings data found. Please import interactions first."))
+            return
+
+        for entry in payload["history"]:
+            recall = entry.get("recall")
+            recall = f", recall@10={recall:.4f}" if recall is not None else ""
+            self.stdout.write(f"iteration {entry['iteration']}: {entry['seconds']:.2f}s{recall}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ ALS trained ({len(payload['user_ids'])} customers x {len(payload['item_ids'])} products, "
+            f"{payload['params']['iterations']} iterations) and published as cf_svd"
+        ))
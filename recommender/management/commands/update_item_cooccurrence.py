@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from recommender.cooccurrence import update_item_similarities
+
+
+class Command(BaseCommand):
+    help = "Apply new ratings, interactions and invoice lines to the item co-occurrence counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Recount every customer")
+        parser.add_argument("--no-patch", action="store_true",
+                            help="Only update the counters, leave the item neighbour index alone")
+
+    def handle(self, *args, **options):
+        counters, changed, pairs = update_item_similarities(
+            full=options["full"], patch_neighbors=not options["no_patch"]
+        )
+        if not len(counters):
+            self.stdout.write(self.style.WARNING("⚠️ No ratings or interactions found. Counters are empty."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Co-occurrence counters saved: {len(counters)} products, "
+            f"{len(changed)} changed, {len(pairs)} pair scores updated"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0007_delete_sentmessagelog'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='rating',
+            name='timestamp',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
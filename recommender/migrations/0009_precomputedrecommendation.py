@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-16 22:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crmapp', '0006_sentmessagelog'),
+        ('recommender', '0008_rating_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecomputedRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_ids', models.JSONField(default=list)),
+                ('scores', models.JSONField(default=list)),
+                ('model_version', models.CharField(blank=True, default='', max_length=128)),
+                ('generated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='precomputed_recommendations', to='crmapp.customer_details')),
+            ],
+            options={
+                'db_table': 'recommender_precomputed_recommendation',
+            },
+        ),
+    ]
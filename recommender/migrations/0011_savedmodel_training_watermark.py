@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0010_item_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='savedmodel',
+            name='full_trained_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='savedmodel',
+            name='trained_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='savedmodel',
+            name='training_stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='savedmodel',
+            name='watermark',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0011_savedmodel_training_watermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pestrecommendation',
+            name='model_version',
+            field=models.CharField(blank=True, default='', max_length=128),
+        ),
+    ]
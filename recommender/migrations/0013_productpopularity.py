@@ -0,0 +1,33 @@
+# Generated by Django 5.2.8 on 2026-10-16 23:18
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crmapp', '0008_rename_sent_at_sentmessagelog_created_at'),
+        ('recommender', '0012_pestrecommendation_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPopularity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment', models.CharField(blank=True, default='', max_length=100)),
+                ('category', models.CharField(blank=True, default='', max_length=50)),
+                ('score', models.FloatField()),
+                ('rank', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='crmapp.branch')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='popularity', to='crmapp.product')),
+            ],
+            options={
+                'db_table': 'recommender_product_popularity',
+                'indexes': [models.Index(fields=['branch', 'segment', 'category', 'rank'], name='recommender_branch__5e5ec0_idx')],
+            },
+        ),
+    ]
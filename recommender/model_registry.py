@@ -0,0 +1,169 @@
+# recommender/model_registry.py
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from recommender.models import SavedModel
+
+
+# ------------------------
+# Settings
+# ------------------------
+# Seconds between two freshness checks (SavedModel row + file mtime) of the
+# same artifact. Inside this window a cached object is served without any I/O.
+CHECK_INTERVAL = getattr(settings, "RECOMMENDER_MODEL_CHECK_INTERVAL", 5.0)
+
+
+class _Entry:
+    __slots__ = ("version", "obj", "checked_at")
+
+    def __init__(self, version, obj, checked_at):
+        self.version = version
+        self.obj = obj
+        self.checked_at = checked_at
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded recommender artifacts.
+
+    Artifacts are keyed by SavedModel.name (or by file path for artifacts that
+    are not registered in SavedModel). The loaded object stays in memory and is
+    only re-loaded when the SavedModel row or the file's mtime changes; the new
+    version is swapped in atomically, so readers never see a half-loaded model.
+    """
+
+    def __init__(self, check_interval=CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._entries = {}
+        self._stats = {}
+
+    # ------------------------
+    # Public API
+    # ------------------------
+    def get(self, name, loader, key=None):
+        """
+        Return the object for SavedModel `name`, loading it with `loader(path)`
+        on first use or when a new version has been published.
+        Returns None when no SavedModel row exists. Pass `key` to cache a
+        differently-loaded view of the same artifact under its own entry.
+        """
+        return self._get(key or name, lambda: self._resolve_saved_model(name), loader)
+
+    def get_file(self, path, loader):
+        """Same as get() for a plain file that has no SavedModel row."""
+        path = os.path.abspath(path)
+        return self._get(path, lambda: self._resolve_file(path), loader)
+
+    def version(self, key):
+        """Version token of the currently loaded object (None if not loaded)."""
+        entry = self._entries.get(key)
+        if entry is None or entry.version is None:
+            return None
+        path, created_at, mtime = entry.version
+        stamp = int(mtime) if mtime is not None else (created_at.timestamp() if created_at else 0)
+        return f"{os.path.basename(path)}@{int(stamp)}"
+
+    def invalidate(self, key=None):
+        """Drop one cached entry (or all of them) so the next get() reloads."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+                self._entries.pop(os.path.abspath(key), None)
+
+    def stats(self):
+        """Snapshot of hit/miss counters and load times per artifact."""
+        with self._lock:
+            return {key: dict(values) for key, values in self._stats.items()}
+
+    # ------------------------
+    # Internals
+    # ------------------------
+    def _get(self, key, resolve, loader):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        # Fast path: checked recently, serve from memory without any I/O.
+        if entry is not None and now - entry.checked_at < self.check_interval:
+            self._count(key, "hits" if entry.version is not None else "misses")
+            return entry.obj
+
+        version = resolve()
+        if version is None:
+            # remember "not published" too, so callers probing for optional
+            # artifacts don't hit the database on every request
+            with self._lock:
+                self._entries[key] = _Entry(None, None, now)
+            self._count(key, "misses")
+            return None
+
+        if entry is not None and entry.version == version:
+            entry.checked_at = now
+            self._count(key, "hits")
+            return entry.obj
+
+        # Only one thread loads a given artifact; the others wait and reuse it.
+        with self._lock:
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+        with load_lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.version == version:
+                self._count(key, "hits")
+                return entry.obj
+
+            started = time.perf_counter()
+            obj = loader(version[0])
+            elapsed = time.perf_counter() - started
+
+            with self._lock:
+                self._entries[key] = _Entry(version, obj, time.monotonic())
+                stats = self._stats.setdefault(key, self._empty_stats())
+                stats["misses"] += 1
+                stats["loads"] += 1
+                stats["last_load_seconds"] = elapsed
+                stats["total_load_seconds"] += elapsed
+            return obj
+
+    def _resolve_saved_model(self, name):
+        row = (
+            SavedModel.objects
+            .filter(name=name)
+            .order_by("-created_at")
+            .values_list("file_path", "created_at")
+            .first()
+        )
+        if row is None:
+            return None
+        path, created_at = row
+        return path, created_at, self._mtime(path)
+
+    def _resolve_file(self, path):
+        mtime = self._mtime(path)
+        if mtime is None:
+            return None
+        return path, None, mtime
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _empty_stats():
+        return {"hits": 0, "misses": 0, "loads": 0, "last_load_seconds": 0.0, "total_load_seconds": 0.0}
+
+    def _count(self, key, field):
+        with self._lock:
+            self._stats.setdefault(key, self._empty_stats())[field] += 1
+
+
+# Shared instance used by recommender_engine / utils.
+model_registry = ModelRegistry()
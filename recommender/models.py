@@ -1,5 +1,6 @@
 from django.db import models
-from crmapp.models import Product, customer_details, MessageTemplates
+from django.utils import timezone
+from crmapp.models import Product, customer_details, MessageTemplates, Branch
 
 # ---------------------------------------------------
 # ITEM TABLE → connected to Product
@@ -11,6 +12,7 @@ class Item(models.Model):
     category = models.CharField(max_length=128)
     tags = models.CharField(max_length=512)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # content index watermark
 
     product = models.OneToOneField(
         Product,
@@ -34,7 +36,7 @@ class Item(models.Model):
 class Rating(models.Model):
     id = models.BigAutoField(primary_key=True)
     rating = models.FloatField()
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)  # delta refresh watermark
 
     product = models.ForeignKey(
         Product,
@@ -69,6 +71,12 @@ class SavedModel(models.Model):
     file_path = models.CharField(max_length=512)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # delta training (see recommender/training.py)
+    watermark = models.JSONField(null=True, blank=True)           # newest source row the artifact includes
+    trained_at = models.DateTimeField(null=True, blank=True)      # last full or delta run
+    full_trained_at = models.DateTimeField(null=True, blank=True) # last full rebuild
+    training_stats = models.JSONField(default=dict, blank=True)   # drift baselines, rows since full, ...
+
     def __str__(self):
         return self.name
 
@@ -172,6 +180,7 @@ class PestRecommendation(models.Model):
         blank=True
     )
     confidence_score = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    model_version = models.CharField(max_length=128, blank=True, default='')  # model that last wrote the row
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -233,3 +242,45 @@ class HybridRankingDebug(models.Model):
 
     def __str__(self):
         return f"Hybrid Debug - {self.customer_id} ({self.generated_at})"
+
+
+# =========================================================
+# MATERIALIZED TOP-N RECOMMENDATIONS (batch precompute)
+# =========================================================
+class PrecomputedRecommendation(models.Model):
+    customer = models.OneToOneField(
+        customer_details,
+        on_delete=models.CASCADE,
+        related_name='precomputed_recommendations',
+    )
+    product_ids = models.JSONField(default=list)   # ranked product ids
+    scores = models.JSONField(default=list)        # score per product id (same order)
+    model_version = models.CharField(max_length=128, blank=True, default='')
+    generated_at = models.DateTimeField(default=timezone.now, db_index=True)  # start of the run that wrote it
+
+    class Meta:
+        db_table = 'recommender_precomputed_recommendation'
+
+    def __str__(self):
+        return f"Top-{len(self.product_ids)} for {self.customer_id} ({self.model_version})"
+
+
+# =========================================================
+# SEGMENTED POPULARITY (cold-start fallback, periodic refresh)
+# =========================================================
+class ProductPopularity(models.Model):
+    # null branch / blank segment / blank category = rollup over all of them
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, null=True, blank=True)
+    segment = models.CharField(max_length=100, blank=True, default='')    # customer_type
+    category = models.CharField(max_length=50, blank=True, default='')    # Product.category
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='popularity')
+    score = models.FloatField()                                            # time-decayed event count
+    rank = models.PositiveIntegerField()
+    computed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'recommender_product_popularity'
+        indexes = [models.Index(fields=['branch', 'segment', 'category', 'rank'])]
+
+    def __str__(self):
+        return f"#{self.rank} {self.product_id} ({self.branch_id}/{self.segment}/{self.category})"
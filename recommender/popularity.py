@@ -0,0 +1,266 @@
+# recommender/popularity.py
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from crmapp.models import customer_details, Product, TaxInvoice, TaxInvoiceItem
+from recommender.models import Rating, Item, ProductPopularity
+
+
+# ------------------------
+# Settings
+# ------------------------
+HALF_LIFE_DAYS = getattr(settings, "RECOMMENDER_POPULARITY_HALF_LIFE_DAYS", 30)
+TOP_K = getattr(settings, "RECOMMENDER_POPULARITY_TOP_K", 50)           # products kept per segment
+MIN_RATING = getattr(settings, "RECOMMENDER_POPULARITY_MIN_RATING", 3.0)  # lower ratings don't count
+CACHE_KEY = "recommender:popularity"
+CACHE_TIMEOUT = getattr(settings, "RECOMMENDER_POPULARITY_CACHE_TIMEOUT", 24 * 3600)
+# Seconds between two checks of the table's computed_at: the cache may be
+# local to each process, so workers can't rely on refresh_popularity() to
+# republish it.
+CHECK_INTERVAL = getattr(settings, "RECOMMENDER_POPULARITY_CHECK_INTERVAL", 60)
+CHUNK_SIZE = 5000
+ALL = ""       # segment / category value of the "all" rollups (branch: None)
+
+
+def _segment(value):
+    return (value or "").strip().lower()
+
+
+# ------------------------
+# Customer context
+# ------------------------
+def _latest_branch():
+    return Subquery(
+        TaxInvoice.objects.filter(customer_id=OuterRef("pk")).order_by("-created_at", "-id").values("branch_id")[:1]
+    )
+
+
+def customer_context(customer_id):
+    """(branch_id, segment) of a customer: branch of their latest invoice, customer_type. One query."""
+    row = (
+        customer_details.objects.filter(pk=customer_id)
+        .annotate(branch_id=_latest_branch())
+        .values_list("branch_id", "customer_type")
+        .first()
+    )
+    if row is None:
+        return None, ALL
+    return row[0], _segment(row[1])
+
+
+def customer_contexts(customer_ids):
+    """{customer_id: (branch_id, segment)} for many customers in one query (unknown ones omitted)."""
+    rows = (
+        customer_details.objects.filter(pk__in=list(customer_ids))
+        .annotate(branch_id=_latest_branch())
+        .values_list("id", "branch_id", "customer_type")
+    )
+    return {customer_id: (branch_id, _segment(segment)) for customer_id, branch_id, segment in rows}
+
+
+# ------------------------
+# Refresh (periodic)
+# ------------------------
+def _event_rows():
+    """(customer, product, branch (-1 = unknown), timestamp) of every positive event, streamed."""
+    from recommender.association_rules import product_name_lookup
+
+    ratings = Rating.objects.filter(customer_id__isnull=False, product_id__isnull=False, rating__gte=MIN_RATING) \
+                            .values_list("customer_id", "product_id", "timestamp")
+    for customer_id, product_id, ts in ratings.iterator(chunk_size=CHUNK_SIZE):
+        yield customer_id, product_id, -1, ts.timestamp()
+
+    names = product_name_lookup()
+    lines = TaxInvoiceItem.objects.values_list(
+        "tax_invoice__customer_id", "product_name", "tax_invoice__branch_id", "tax_invoice__created_at"
+    )
+    for customer_id, name, branch_id, ts in lines.iterator(chunk_size=CHUNK_SIZE):
+        product_id = names.get((name or "").strip().lower())
+        if customer_id is None or product_id is None or ts is None:
+            continue
+        yield customer_id, product_id, branch_id if branch_id is not None else -1, ts.timestamp()
+
+
+def _sum_weights(frames):
+    return pd.concat(frames, ignore_index=True).groupby(["customer", "product", "branch"], as_index=False)["weight"].sum()
+
+
+def _events(now, half_life_days=HALF_LIFE_DAYS):
+    """
+    DataFrame of decayed event weights per customer, product and branch:
+    each event weighs 0.5 ** (age / half life). Aggregated chunk by chunk,
+    so memory follows the distinct (customer, product, branch) keys, not
+    the number of events.
+    """
+    rows = _event_rows()
+    frames = []
+    while True:
+        chunk = list(itertools.islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+        df = pd.DataFrame(chunk, columns=["customer", "product", "branch", "ts"])
+        df["weight"] = np.power(0.5, (now - df["ts"].to_numpy(dtype=np.float64)) / (half_life_days * 86400.0))
+        frames.append(_sum_weights([df]))
+        if len(frames) >= 20:
+            frames = [_sum_weights(frames)]
+    if not frames:
+        return pd.DataFrame(columns=["customer", "product", "branch", "weight"])
+    return _sum_weights(frames)
+
+
+def compute_popularity(events, top_k=TOP_K):
+    """
+    Time-decayed event counts per (branch, segment, category) rollup from
+    the decayed weights of _events(). Every combination of the three
+    dimensions is also aggregated over "all" (branch -1, segment / category
+    ALL). Returns a DataFrame of the top_k products per rollup with rank.
+    """
+    if events.empty:
+        return pd.DataFrame(columns=["branch", "segment", "category", "product", "score", "rank"])
+
+    customers = pd.DataFrame(
+        customer_details.objects.filter(pk__in=events["customer"].unique().tolist())
+        .annotate(branch_id=_latest_branch())
+        .values_list("id", "branch_id", "customer_type"),
+        columns=["customer", "customer_branch", "segment"],
+    )
+    categories = pd.DataFrame(
+        Product.objects.filter(product_id__in=events["product"].unique().tolist()).values_list("product_id", "category"),
+        columns=["product", "category"],
+    )
+    df = events.merge(customers, on="customer", how="left").merge(categories, on="product", how="left")
+    # ratings have no branch of their own: use the customer's
+    df["branch"] = df["branch"].where(df["branch"] >= 0, df["customer_branch"]).fillna(-1).astype(np.int64)
+    df["segment"] = df["segment"].map(_segment, na_action="ignore").fillna(ALL)
+    df["category"] = df["category"].fillna(ALL)
+
+    frames = []
+    for keep_branch, keep_segment, keep_category in itertools.product((True, False), repeat=3):
+        part = df
+        # unknown values only count towards the "all" rollups of their dimension
+        if keep_branch:
+            part = part[part["branch"] >= 0]
+        if keep_segment:
+            part = part[part["segment"] != ALL]
+        if keep_category:
+            part = part[part["category"] != ALL]
+        part = part.assign(
+            branch=part["branch"] if keep_branch else -1,
+            segment=part["segment"] if keep_segment else ALL,
+            category=part["category"] if keep_category else ALL,
+        )
+        frames.append(part.groupby(["branch", "segment", "category", "product"], as_index=False)["weight"].sum())
+
+    table = pd.concat(frames, ignore_index=True).rename(columns={"weight": "score"})
+    table = table.sort_values(["branch", "segment", "category", "score", "product"],
+                              ascending=[True, True, True, False, True], kind="stable")
+    table["rank"] = table.groupby(["branch", "segment", "category"]).cumcount()
+    return table[table["rank"] < top_k].reset_index(drop=True)
+
+
+def refresh_popularity(half_life_days=HALF_LIFE_DAYS, top_k=TOP_K):
+    """Recompute the ProductPopularity table and republish it to the cache. Returns the row count."""
+    computed_at = timezone.now()
+    table = compute_popularity(_events(computed_at.timestamp(), half_life_days), top_k)
+    objs = [
+        ProductPopularity(
+            branch_id=int(branch) if branch >= 0 else None,
+            segment=segment,
+            category=category,
+            product_id=int(product),
+            score=float(score),
+            rank=int(rank),
+            computed_at=computed_at,
+        )
+        for branch, segment, category, product, score, rank in table[
+            ["branch", "segment", "category", "product", "score", "rank"]
+        ].itertuples(index=False)
+    ]
+    with transaction.atomic():
+        ProductPopularity.objects.all().delete()
+        ProductPopularity.objects.bulk_create(objs, batch_size=CHUNK_SIZE)
+    cache.set(CACHE_KEY, (computed_at, _as_lookup(objs)), CACHE_TIMEOUT)
+    _checked.update(at=time.monotonic(), computed_at=computed_at)
+    return len(objs)
+
+
+# ------------------------
+# Lookup (request path)
+# ------------------------
+def _as_lookup(rows):
+    """{(branch_id, segment, category): [product ids by rank]}."""
+    lookup = {}
+    for row in sorted(rows, key=lambda r: r.rank):
+        lookup.setdefault((row.branch_id, row.segment, row.category), []).append(row.product_id)
+    return lookup
+
+
+_checked = {"at": 0.0, "computed_at": None}   # last computed_at seen by this process
+
+
+def get_popularity_lookup():
+    """
+    The cached lookup, rebuilt from ProductPopularity when the table was
+    recomputed since it was cached (checked at most every CHECK_INTERVAL).
+    """
+    cached = cache.get(CACHE_KEY)
+    now = time.monotonic()
+    if cached is not None and cached[0] == _checked["computed_at"] and now - _checked["at"] < CHECK_INTERVAL:
+        return cached[1]
+
+    computed_at = ProductPopularity.objects.aggregate(last=Max("computed_at"))["last"]
+    _checked.update(at=now, computed_at=computed_at)
+    if cached is None or cached[0] != computed_at:
+        lookup = _as_lookup(ProductPopularity.objects.only("branch_id", "segment", "category", "product_id", "rank"))
+        cached = (computed_at, lookup)
+        cache.set(CACHE_KEY, cached, CACHE_TIMEOUT)
+    return cached[1]
+
+
+def popular_products(top_n=5, branch_id=None, segment=ALL, category=ALL, exclude=()):
+    """
+    Product ids of the most popular products for the most specific rollup
+    that has data: (branch, segment, category), then without category,
+    segment and branch in turn, down to the global list. Falls back to the
+    rating matrix's top rated products until the first refresh.
+    """
+    lookup = get_popularity_lookup()
+    segment = _segment(segment)
+    exclude = set(exclude)
+    for key in (
+        (branch_id, segment, category),
+        (branch_id, segment, ALL),
+        (branch_id, ALL, category),
+        (branch_id, ALL, ALL),
+        (None, segment, category),
+        (None, segment, ALL),
+        (None, ALL, category),
+        (None, ALL, ALL),
+    ):
+        ranked = [pid for pid in lookup.get(key, ()) if pid not in exclude]
+        if ranked:
+            return ranked[:top_n]
+
+    from recommender.rating_matrix import get_rating_matrix
+    return [pid for pid in get_rating_matrix().top_rated(top_n + len(exclude)) if pid not in exclude][:top_n]
+
+
+def popular_for_customer(customer_id, top_n=5, category=ALL, exclude=()):
+    """popular_products() in the customer's branch and segment."""
+    branch_id, segment = customer_context(customer_id) if customer_id is not None else (None, ALL)
+    return popular_products(top_n, branch_id, segment, category, exclude)
+
+
+def popular_items_for_customer(customer_id, top_n=5, category=ALL, exclude=()):
+    """popular_for_customer() as Items, in rank order."""
+    ranked = popular_for_customer(customer_id, top_n, category, exclude)
+    by_product = Item.objects.in_bulk(ranked, field_name="product_id")
+    return [by_product[pid] for pid in ranked if pid in by_product]
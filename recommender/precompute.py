@@ -0,0 +1,162 @@
+# recommender/precompute.py
+import numpy as np
+import scipy.sparse as sp
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from recommender.models import Rating, Interaction, PrecomputedRecommendation
+from recommender.rating_matrix import get_rating_matrix
+from recommender.recommender_engine import load_item_neighbors
+from recommender.result_cache import result_cache
+
+
+SCORE_CHUNK = 1000   # customers scored per matrix product
+WRITE_CHUNK = 500    # rows per bulk_create / bulk_update
+
+
+# ------------------------
+# Vectorized scoring
+# ------------------------
+def align_columns(ratings, product_ids):
+    """
+    Sparse projection (n_rating_products x len(product_ids)) that reorders the
+    rating matrix columns to `product_ids`; unknown products become zero columns.
+    """
+    rows, cols = [], []
+    for pos, pid in enumerate(product_ids):
+        col = ratings.product_index.get(pid)
+        if col is not None:
+            rows.append(col)
+            cols.append(pos)
+    data = np.ones(len(rows), dtype=np.float32)
+    return sp.csr_matrix((data, (rows, cols)), shape=(len(ratings.product_ids), len(product_ids)))
+
+
+def top_n_scores(user_matrix, similarity, top_n=5):
+    """
+    Score a block of users against an item-item similarity and return the
+    top-N (column positions, scores) per user, excluding already-rated items.
+
+    user_matrix: sparse (n_users x n_items), columns aligned with `similarity`.
+    similarity:  (n_items x n_items) ndarray or sparse matrix (row = scored item).
+    """
+    scores = user_matrix @ similarity.T
+    scores = scores.toarray() if sp.issparse(scores) else np.asarray(scores)
+    scores = scores.astype(np.float32, copy=False)
+
+    # mask already-rated items
+    rated = user_matrix.tocoo()
+    mask = rated.data > 0
+    scores[rated.row[mask], rated.col[mask]] = -np.inf
+
+    n = min(top_n, scores.shape[1])
+    if n == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0), dtype=np.float32)
+    part = np.argpartition(-scores, n - 1, axis=1)[:, :n]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def score_customers(ratings, neighbors, customer_ids=None, top_n=5):
+    """
+    Yield (customer_id, [product_id, ...], [score, ...]) for the given
+    customers (default: every customer in the rating matrix).
+    """
+    product_ids = neighbors.product_ids
+    projection = align_columns(ratings, product_ids.tolist())
+    similarity = neighbors.similarities()
+
+    if customer_ids is None:
+        customer_ids = ratings.customer_ids
+    rows = [ratings.customer_index[c] for c in customer_ids if c in ratings.customer_index]
+    matrix = ratings.matrix
+
+    for start in range(0, len(rows), SCORE_CHUNK):
+        block = rows[start:start + SCORE_CHUNK]
+        user_matrix = matrix[block] @ projection
+        top_idx, top_scores = top_n_scores(user_matrix, similarity, top_n)
+        for row, idx, vals in zip(block, top_idx, top_scores):
+            keep = np.isfinite(vals)
+            yield ratings.customer_ids[row], product_ids[idx[keep]].tolist(), vals[keep].astype(float).tolist()
+
+
+# ------------------------
+# Materialization
+# ------------------------
+def changed_customers(since):
+    """Customers with Rating or Interaction rows newer than `since`."""
+    rated = Rating.objects.filter(timestamp__gt=since, customer_id__isnull=False).values_list("customer_id", flat=True)
+    interacted = Interaction.objects.filter(timestamp__gt=since, customer_id__isnull=False).values_list("customer_id", flat=True)
+    return set(rated.distinct()) | set(interacted.distinct())
+
+
+def precompute_recommendations(top_n=10, full=False):
+    """
+    Score customers in one vectorized pass (ratings x item similarity, rated
+    items masked) and materialize their top-N in PrecomputedRecommendation.
+
+    Incremental by default: only customers whose Rating/Interaction rows
+    changed since the last run are rescored. A new similarity model version
+    (or full=True) rescores everybody.
+    """
+    neighbors = load_item_neighbors()
+    if neighbors is None:
+        return {"scored": 0, "written": 0, "full": full, "model_version": None}
+    model_version = neighbors.model_version or ""
+
+    started = timezone.now()
+    ratings = get_rating_matrix(force_refresh=True)
+    last_run = PrecomputedRecommendation.objects.aggregate(last=Max("generated_at"))["last"]
+    stale_version = PrecomputedRecommendation.objects.exclude(model_version=model_version).exists()
+
+    if full or last_run is None or stale_version:
+        full = True
+        customer_ids = None
+    else:
+        customer_ids = sorted(changed_customers(last_run))
+
+    rows = list(score_customers(ratings, neighbors, customer_ids, top_n))
+    written = _write(rows, model_version, started)
+    return {"scored": len(rows), "written": written, "full": full, "model_version": model_version}
+
+
+def _write(rows, model_version, generated_at):
+    written = 0
+    for start in range(0, len(rows), WRITE_CHUNK):
+        chunk = rows[start:start + WRITE_CHUNK]
+        existing = dict(
+            PrecomputedRecommendation.objects
+            .filter(customer_id__in=[r[0] for r in chunk])
+            .values_list("customer_id", "id")
+        )
+        to_update, to_create = [], []
+        for customer_id, product_ids, scores in chunk:
+            obj = PrecomputedRecommendation(
+                id=existing.get(customer_id),
+                customer_id=customer_id,
+                product_ids=product_ids,
+                scores=scores,
+                model_version=model_version,
+                generated_at=generated_at,
+            )
+            (to_update if obj.id else to_create).append(obj)
+
+        with transaction.atomic():
+            if to_create:
+                PrecomputedRecommendation.objects.bulk_create(to_create)
+            if to_update:
+                PrecomputedRecommendation.objects.bulk_update(
+                    to_update, ["product_ids", "scores", "model_version", "generated_at"]
+                )
+            # served results may embed the old row: drop them once this chunk is visible
+            customer_ids = [obj.customer_id for obj in to_create + to_update]
+            transaction.on_commit(lambda ids=customer_ids: _invalidate(ids))
+        written += len(chunk)
+    return written
+
+
+def _invalidate(customer_ids):
+    for customer_id in customer_ids:
+        result_cache.invalidate(customer_id)
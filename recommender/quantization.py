@@ -0,0 +1,132 @@
+# recommender/quantization.py
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+
+
+# ------------------------
+# Settings
+# ------------------------
+# float32 = stored as trained; float16 = half precision; int8 = symmetric
+# per-row scale (row ≈ int8 values * scale, scale = max |row| / 127)
+MODES = ("float32", "float16", "int8")
+QUANTIZATION = getattr(settings, "RECOMMENDER_QUANTIZATION", "float32")
+SCORE_BLOCK = 65536  # rows dequantized at a time while scoring
+
+
+def check_mode(mode):
+    mode = mode or "float32"
+    if mode not in MODES:
+        raise ValueError(f"Unknown quantization {mode!r} (expected one of {', '.join(MODES)})")
+    return mode
+
+
+def quantize_values(values, mode):
+    """(stored values, float32 per-row scales or None) for a dense 2-D array."""
+    mode = check_mode(mode)
+    values = np.asarray(values, dtype=np.float32)
+    if mode == "float32":
+        return np.ascontiguousarray(values), None
+    if mode == "float16":
+        return values.astype(np.float16), None
+    peak = np.abs(values).max(axis=1) if values.size else np.zeros(len(values), dtype=np.float32)
+    scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+    return np.clip(np.rint(values / scales[:, None]), -127, 127).astype(np.int8), scales
+
+
+def quantize_csr(matrix, mode):
+    """(CSR with quantized data, float32 per-row scales or None); the sparsity pattern is unchanged."""
+    mode = check_mode(mode)
+    matrix = sp.csr_matrix(matrix)
+    data = matrix.data.astype(np.float32)
+    scales = None
+    if mode == "float16":
+        data = data.astype(np.float16)
+    elif mode == "int8":
+        rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+        peak = np.zeros(matrix.shape[0], dtype=np.float32)
+        np.maximum.at(peak, rows, np.abs(data))
+        scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        data = np.clip(np.rint(data / scales[rows]), -127, 127).astype(np.int8)
+    return sp.csr_matrix((data, matrix.indices, matrix.indptr), shape=matrix.shape), scales
+
+
+def compact_indices(indices, n_columns):
+    """CSR column indices as uint16 when every column fits, else unchanged (int32)."""
+    if n_columns <= np.iinfo(np.uint16).max + 1:
+        return np.asarray(indices, dtype=np.uint16)
+    return indices
+
+
+class QuantizedMatrix:
+    """
+    Dense factor matrix kept as float16 or int8 (+ per-row scale). Rows are
+    dequantized to float32 only when read, so it stands in for the float32
+    array in the serving code: m[rows], m @ vector, np.asarray(m).
+    """
+
+    def __init__(self, values, scales=None, mode="float32"):
+        self.values = values
+        self.scales = scales
+        self.mode = mode
+
+    @classmethod
+    def from_array(cls, values, mode):
+        stored, scales = quantize_values(values, mode)
+        return cls(stored, scales, check_mode(mode))
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, rows):
+        out = self.values[rows].astype(np.float32)
+        if self.scales is not None:
+            scales = self.scales[rows]
+            out *= scales[..., None] if np.ndim(scales) else scales
+        return out
+
+    def __matmul__(self, other):
+        """(n x k) @ (k,) or (k x m), dequantized SCORE_BLOCK rows at a time."""
+        other = np.asarray(other, dtype=np.float32)
+        out = np.empty((len(self),) + other.shape[1:], dtype=np.float32)
+        for start in range(0, len(self), SCORE_BLOCK):
+            stop = min(start + SCORE_BLOCK, len(self))
+            out[start:stop] = self.values[start:stop].astype(np.float32) @ other
+            if self.scales is not None:
+                out[start:stop] *= self.scales[start:stop].reshape((-1,) + (1,) * (other.ndim - 1))
+        return out
+
+    def __array__(self, dtype=None, copy=None):
+        out = self[slice(None)]
+        return out if dtype is None else out.astype(dtype, copy=False)
+
+    def dequantize(self):
+        return self[slice(None)]
+
+
+def quantize_factors(values, mode):
+    """Dense factors as stored in a payload: the plain float32 array, or a QuantizedMatrix."""
+    mode = check_mode(mode)
+    if mode == "float32":
+        return np.ascontiguousarray(np.asarray(values, dtype=np.float32))
+    return QuantizedMatrix.from_array(values, mode)
+
+
+def nbytes(obj):
+    """Memory held by an array, sparse matrix, QuantizedMatrix or ItemNeighborIndex."""
+    if obj is None:
+        return 0
+    if hasattr(obj, "memory_bytes"):
+        return obj.memory_bytes()
+    if sp.issparse(obj):
+        obj = obj.tocsr()
+        return obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes
+    return int(obj.nbytes)
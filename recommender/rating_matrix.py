@@ -0,0 +1,196 @@
+# recommender/rating_matrix.py
+import threading
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from django.conf import settings
+from django.db.models import Q
+
+from recommender.models import Rating
+
+
+# ------------------------
+# Settings
+# ------------------------
+# Seconds between two delta queries against the Rating table.
+REFRESH_INTERVAL = getattr(settings, "RECOMMENDER_RATING_MATRIX_REFRESH_INTERVAL", 30.0)
+# Seconds after which the matrix is rebuilt from scratch (picks up edits/deletes).
+REBUILD_INTERVAL = getattr(settings, "RECOMMENDER_RATING_MATRIX_REBUILD_INTERVAL", 3600.0)
+CHUNK_SIZE = 5000
+
+
+class RatingMatrix:
+    """
+    Customer x product rating matrix built from the Rating table.
+
+    Ratings are streamed with values_list().iterator() into scipy CSR
+    matrices (sum and count per cell, so repeated ratings average exactly
+    like pivot_table(aggfunc="mean")). Row/column positions are stable:
+    new customers and products are appended, never re-ordered.
+    """
+
+    def __init__(self):
+        self.customer_ids = []
+        self.product_ids = []
+        self.customer_index = {}
+        self.product_index = {}
+        self._sums = sp.csr_matrix((0, 0), dtype=np.float64)
+        self._counts = sp.csr_matrix((0, 0), dtype=np.float64)
+        self._matrix = None
+        self.watermark = None  # (timestamp, id) of the newest row seen
+        self.built_at = None
+        self.refreshed_at = None
+
+    # ------------------------
+    # Loading
+    # ------------------------
+    def rebuild(self):
+        """Drop everything and stream the whole Rating table."""
+        self.__init__()
+        self._ingest(self._queryset())
+        self.built_at = self.refreshed_at = time.monotonic()
+        return self
+
+    def refresh(self):
+        """Pull only Rating rows newer than the watermark. Returns rows added."""
+        qs = self._queryset()
+        if self.watermark is not None:
+            ts, last_id = self.watermark
+            qs = qs.filter(Q(timestamp__gt=ts) | Q(timestamp=ts, id__gt=last_id))
+        added = self._ingest(qs)
+        self.refreshed_at = time.monotonic()
+        return added
+
+    def clone(self):
+        """Copy that can be refreshed while readers keep using this instance."""
+        other = RatingMatrix.__new__(RatingMatrix)
+        other.__dict__.update(self.__dict__)
+        other.customer_ids = list(self.customer_ids)
+        other.product_ids = list(self.product_ids)
+        other.customer_index = dict(self.customer_index)
+        other.product_index = dict(self.product_index)
+        return other
+
+    @staticmethod
+    def _queryset():
+        return (
+            Rating.objects
+            .filter(customer_id__isnull=False, product_id__isnull=False)
+            .order_by("timestamp", "id")
+            .values_list("id", "customer_id", "product_id", "rating", "timestamp")
+        )
+
+    def _ingest(self, qs):
+        rows, cols, vals = [], [], []
+        for rid, customer_id, product_id, rating, ts in qs.iterator(chunk_size=CHUNK_SIZE):
+            rows.append(self._position(customer_id, self.customer_index, self.customer_ids))
+            cols.append(self._position(product_id, self.product_index, self.product_ids))
+            vals.append(rating)
+            self.watermark = (ts, rid)
+
+        shape = (len(self.customer_ids), len(self.product_ids))
+        if self._sums.shape != shape:
+            # resize copies, never the matrices a clone() may still share
+            self._sums = self._sums.copy()
+            self._sums.resize(shape)
+            self._counts = self._counts.copy()
+            self._counts.resize(shape)
+        if rows:
+            rows = np.asarray(rows, dtype=np.int64)
+            cols = np.asarray(cols, dtype=np.int64)
+            self._sums = self._sums + sp.csr_matrix((np.asarray(vals, dtype=np.float64), (rows, cols)), shape=shape)
+            self._counts = self._counts + sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=shape)
+        self._matrix = None
+        return len(rows)
+
+    @staticmethod
+    def _position(key, index, ids):
+        pos = index.get(key)
+        if pos is None:
+            pos = index[key] = len(ids)
+            ids.append(key)
+        return pos
+
+    # ------------------------
+    # Accessors
+    # ------------------------
+    @property
+    def shape(self):
+        return self._sums.shape
+
+    @property
+    def nnz(self):
+        return self._counts.nnz
+
+    @property
+    def matrix(self):
+        """Mean rating per (customer, product) as float32 CSR; missing cells are 0."""
+        if self._matrix is None:
+            inverse = self._counts.copy()
+            inverse.data = 1.0 / inverse.data
+            self._matrix = self._sums.multiply(inverse).tocsr().astype(np.float32)
+        return self._matrix
+
+    def __contains__(self, customer_id):
+        return customer_id in self.customer_index
+
+    def user_row(self, customer_id):
+        """Sparse 1 x n_products row of the customer (None if unknown)."""
+        pos = self.customer_index.get(customer_id)
+        if pos is None:
+            return None
+        return self.matrix[pos]
+
+    def rated_products(self, customer_id):
+        """Product ids the customer has rated (> 0)."""
+        row = self.user_row(customer_id)
+        if row is None:
+            return []
+        return [self.product_ids[j] for j, v in zip(row.indices, row.data) if v > 0]
+
+    def user_vector(self, customer_id, product_ids):
+        """Dense rating vector of the customer aligned to `product_ids`."""
+        vector = np.zeros(len(product_ids), dtype=np.float32)
+        row = self.user_row(customer_id)
+        if row is None:
+            return vector
+        ratings = dict(zip((self.product_ids[j] for j in row.indices), row.data))
+        for pos, pid in enumerate(product_ids):
+            vector[pos] = ratings.get(pid, 0.0)
+        return vector
+
+    def top_rated(self, top_n=5):
+        """Product ids ordered by mean raw rating (same as groupby().mean())."""
+        sums = np.asarray(self._sums.sum(axis=0)).ravel()
+        counts = np.asarray(self._counts.sum(axis=0)).ravel()
+        means = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+        order = np.argsort(-means, kind="stable")[:top_n]
+        return [self.product_ids[j] for j in order if counts[j] > 0]
+
+
+# ------------------------
+# Shared, incrementally refreshed instance
+# ------------------------
+_lock = threading.Lock()
+_shared = None
+
+
+def get_rating_matrix(force_rebuild=False, force_refresh=False):
+    """
+    Return the process-wide RatingMatrix, refreshing it with a delta query at
+    most every REFRESH_INTERVAL seconds (or now, with force_refresh) and
+    rebuilding it every REBUILD_INTERVAL.
+    """
+    global _shared
+    with _lock:
+        now = time.monotonic()
+        if force_rebuild or _shared is None or now - _shared.built_at >= REBUILD_INTERVAL:
+            _shared = RatingMatrix().rebuild()
+        elif force_refresh or now - _shared.refreshed_at >= REFRESH_INTERVAL:
+            # Refresh a copy and swap it in, so concurrent readers never see
+            # id maps and matrices of different sizes.
+            updated = _shared.clone()
+            updated.refresh()
+            _shared = updated
+        return _shared
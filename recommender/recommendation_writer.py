@@ -0,0 +1,140 @@
+# recommender/recommendation_writer.py
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from recommender.models import PestRecommendation
+
+
+WRITE_CHUNK = 500      # rows per upsert
+_MAX_SCORE = Decimal("999.99")   # confidence_score is DECIMAL(5, 2)
+
+
+def _score(value):
+    if value is None:
+        return None
+    score = Decimal(str(float(value))).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return max(-_MAX_SCORE, min(_MAX_SCORE, score))
+
+
+class RecommendationWriter:
+    """
+    Collects PestRecommendation rows and writes them in chunks, one row per
+    (customer, base_product, recommended_product, type):
+
+        with RecommendationWriter(model_version="item_neighbors_v2.npz@...") as writer:
+            writer.add(customer_id, product_id, "collaborative", score=0.8)
+
+    A repeated key within a batch keeps the last score. Keys already in the
+    table are upserted in place (score, model version and created_at
+    refreshed) instead of appended, and older duplicates of a written key are
+    removed, so regenerating recommendations doesn't grow the table.
+    """
+
+    def __init__(self, model_version="", chunk_size=WRITE_CHUNK):
+        self.model_version = model_version or ""
+        self.chunk_size = chunk_size
+        self._rows = {}
+        self.written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, customer_id, recommended_product_id, recommendation_type, score=None, base_product_id=None):
+        # bulk_create skips PestRecommendation.save(), so normalize here
+        rec_type = PestRecommendation.normalize_recommendation_type(recommendation_type)
+        key = (customer_id, base_product_id, recommended_product_id, rec_type)
+        self._rows.pop(key, None)           # keep insertion order of the latest value
+        self._rows[key] = _score(score)
+        if len(self._rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Upsert the collected rows. Returns the number written."""
+        rows = list(self._rows.items())
+        self._rows.clear()
+        for start in range(0, len(rows), self.chunk_size):
+            self._write(rows[start:start + self.chunk_size])
+        return self.written
+
+    # ------------------------
+    # Upsert
+    # ------------------------
+    def _write(self, chunk):
+        existing, duplicates = self._existing([key for key, _ in chunk])
+        objs = [
+            PestRecommendation(
+                id=existing.get(key),
+                customer_id=key[0],
+                base_product_id=key[1],
+                recommended_product_id=key[2],
+                recommendation_type=key[3],
+                confidence_score=score,
+                model_version=self.model_version,
+            )
+            for key, score in chunk
+        ]
+        # conflicts on the primary key of prefetched rows; the table has no
+        # unique key on the tuple because base_product / type may be NULL
+        kwargs = {}
+        if connection.features.supports_update_conflicts_with_target:
+            kwargs["unique_fields"] = ["id"]
+        with transaction.atomic():
+            if duplicates:
+                PestRecommendation.objects.filter(id__in=duplicates).delete()
+            PestRecommendation.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                update_fields=["confidence_score", "model_version", "created_at"],
+                **kwargs,
+            )
+        self.written += len(objs)
+
+    @staticmethod
+    def _existing(keys):
+        """({key: lowest id}, [ids of further rows with the same key]) for the keys already stored."""
+        wanted = set(keys)
+        q = Q(customer_id__in={k[0] for k in keys if k[0] is not None})
+        if any(k[0] is None for k in keys):
+            q |= Q(customer_id__isnull=True)
+        rows = (
+            PestRecommendation.objects.filter(q, recommended_product_id__in={k[2] for k in keys})
+            .order_by("id")
+            .values_list("id", "customer_id", "base_product_id", "recommended_product_id", "recommendation_type")
+        )
+        existing, duplicates = {}, []
+        for row_id, *key in rows:
+            key = tuple(key)
+            if key not in wanted:
+                continue
+            if key in existing:
+                duplicates.append(row_id)
+            else:
+                existing[key] = row_id
+        return existing, duplicates
+
+
+def write_recommendations(rows, model_version="", chunk_size=WRITE_CHUNK):
+    """
+    Upsert an iterable of dicts with customer_id, recommended_product_id,
+    recommendation_type and optional score / base_product_id. Returns the
+    number of rows written.
+    """
+    writer = RecommendationWriter(model_version, chunk_size)
+    for row in rows:
+        writer.add(
+            row["customer_id"],
+            row["recommended_product_id"],
+            row["recommendation_type"],
+            score=row.get("score"),
+            base_product_id=row.get("base_product_id"),
+        )
+    return writer.flush()
@@ -7,9 +7,20 @@ from django.db import models
 
 
 from django.db import connection
+from django.conf import settings
 from sklearn.metrics.pairwise import cosine_similarity
 
-from recommender.models import Rating, Item, SavedModel, PestRecommendation
+from recommender.models import Rating, Item, SavedModel, PestRecommendation, PrecomputedRecommendation
+from recommender.model_registry import model_registry
+from recommender.rating_matrix import get_rating_matrix
+from recommender.item_neighbors import ItemNeighborIndex, DEFAULT_K
+from recommender.quantization import QUANTIZATION
+from recommender.user_based import UserBasedScorer
+from recommender import artifacts
+from recommender.association_rules import get_rule_index, customer_products
+from recommender.customer_similarity import get_customer_similarity_index
+from recommender.popularity import popular_items_for_customer, popular_products, customer_contexts
+from recommender.hybrid import hybrid_recommendations
 from crmapp.models import Product, customer_details
 
 
@@ -23,6 +34,14 @@ os.makedirs(TRAINED_MODELS_DIR, exist_ok=True)
 USER_ITEM_MATRIX = os.path.join(TRAINED_MODELS_DIR, "user_item_matrix.csv")
 ITEM_SIM_MODEL = os.path.join(TRAINED_MODELS_DIR, "item_similarity_model.pkl")
 USER_TOP5 = os.path.join(TRAINED_MODELS_DIR, "user_top5_recommendations.csv")
+USER_SIM_MATRIX = os.path.join(TRAINED_MODELS_DIR, "user_similarity_matrix.csv")
+
+LEGACY_SIMILARITY_MODEL = "recommender_similarity"  # v1: dense pickled DataFrame
+ITEM_NEIGHBORS_MODEL = "item_neighbors"              # v2: top-K neighbour index (.npz)
+ITEM_NEIGHBORS_PATCH_MODEL = "item_neighbors_patch"  # v2 + intra-day rows (recommender/cooccurrence.py)
+
+# Fuse all engines concurrently instead of the priority chain (recommender/hybrid.py).
+HYBRID_RANKING = getattr(settings, "RECOMMENDER_HYBRID_RANKING", False)
 
 
 # ------------------------
@@ -40,58 +59,115 @@ def load_fabricated_models():
         return None, None, None
 
 
+def _load_fabricated_top_n(path):
+    """
+    Parse user_top5_recommendations.csv once into
+    {"by_customer": {index label: [product, ...]}, "fallback": [product, ...]},
+    where fallback is every product ordered by how often it is recommended.
+    """
+    rec_df = pd.read_csv(path, index_col=0)
+    by_customer = {}
+    for label, row in zip(rec_df.index, rec_df.to_numpy()):
+        by_customer.setdefault(label, row[~pd.isna(row)].tolist())
+
+    melted = rec_df.melt(value_name="product").dropna(subset=["product"])
+    fallback = melted["product"].value_counts().index.tolist()
+    return {"by_customer": by_customer, "fallback": fallback}
+
+
+def load_fabricated_top_n():
+    """Cached fabricated top-N lookup (reloaded when the CSV's mtime changes), or None."""
+    try:
+        return model_registry.get_file(USER_TOP5, _load_fabricated_top_n)
+    except Exception as e:
+        print("⚠️ Error loading fabricated models:", e)
+        return None
+
+
 def get_fabricated_recommendations(user_id, top_n=5):
     """Return fabricated top-n if available (index may be str or int)."""
-    _, _, rec_df = load_fabricated_models()
-    if rec_df is None:
+    lookup = load_fabricated_top_n()
+    if lookup is None:
         return []
+    return _fabricated_lookup(lookup, user_id, top_n)
 
-    # ensure consistent index type
-    idx = str(user_id)
-    if idx in rec_df.index:
-        items = rec_df.loc[idx].dropna().tolist()
-        return items[:top_n]
-    # try integer index
-    if user_id in rec_df.index:
-        items = rec_df.loc[user_id].dropna().tolist()
+
+def _fabricated_lookup(lookup, user_id, top_n=5):
+    by_customer = lookup["by_customer"]
+    # ensure consistent index type, then try integer index
+    items = by_customer.get(str(user_id))
+    if items is None:
+        items = by_customer.get(user_id)
+    if items is not None:
         return items[:top_n]
 
     # fallback: most frequent recommendations across users
-    try:
-        melted = rec_df.melt(value_name="product").dropna(subset=["product"])
-        top = melted["product"].value_counts().head(top_n).index.tolist()
-        return top
-    except Exception:
-        return []
+    return lookup["fallback"][:top_n]
 
 
 # ------------------------
 # Trained model loader
 # ------------------------
+def _load_similarity_file(model_path):
+    with open(model_path, "rb") as f:
+        model_obj = pickle.load(f)
+    # Accept pandas.DataFrame or numpy array.
+    if isinstance(model_obj, pd.DataFrame):
+        return model_obj
+    # if numpy array, convert to DataFrame with no index (caller must know mapping)
+    return pd.DataFrame(model_obj)
+
+
 def load_trained_model(model_name="recommender_similarity"):
     """
     Loads a saved similarity matrix (pickled DataFrame or numpy array).
-    The SavedModel table (recommender.SavedModel) stores file_path.
+    The SavedModel table (recommender.SavedModel) stores file_path; the loaded
+    object is kept in the process-wide model registry until a new version is saved.
     """
     try:
-        saved_model = SavedModel.objects.filter(name=model_name).latest("created_at")
-        model_path = saved_model.file_path
-        with open(model_path, "rb") as f:
-            model_obj = pickle.load(f)
-        # Accept pandas.DataFrame or numpy array.
-        if isinstance(model_obj, pd.DataFrame):
-            return model_obj
-        else:
-            # if numpy array, convert to DataFrame with no index (caller must know mapping)
-            return pd.DataFrame(model_obj)
-    except SavedModel.DoesNotExist:
-        print("⚠️ No trained model saved (SavedModel row missing).")
-        return None
+        model_obj = model_registry.get(model_name, _load_similarity_file)
+        if model_obj is None:
+            print("⚠️ No trained model saved (SavedModel row missing).")
+        return model_obj
     except Exception as e:
         print("⚠️ Error loading saved model:", e)
         return None
 
 
+def load_item_neighbors():
+    """
+    Load item-item similarity as an ItemNeighborIndex: the v2 top-K artifact
+    (SavedModel "item_neighbors") when published, otherwise the legacy v1 dense
+    pickle converted once and cached under its own registry key.
+
+    An intra-day patch of the v2 index ("item_neighbors_patch") is served
+    instead while it was applied to the current one. model_version stays the
+    version of the trained index, so patches don't invalidate precomputed or
+    cached results.
+    """
+    try:
+        key = ITEM_NEIGHBORS_MODEL
+        index = model_registry.get(ITEM_NEIGHBORS_MODEL, ItemNeighborIndex.load)
+        if index is None:
+            key = LEGACY_SIMILARITY_MODEL + ":topk"
+            index = model_registry.get(
+                LEGACY_SIMILARITY_MODEL,
+                lambda path: ItemNeighborIndex.from_dataframe(_load_similarity_file(path)).quantize(QUANTIZATION),
+                key=key,
+            )
+        if index is not None:
+            index.model_version = model_registry.version(key)
+        if key == ITEM_NEIGHBORS_MODEL and index is not None:
+            patch = model_registry.get(ITEM_NEIGHBORS_PATCH_MODEL, ItemNeighborIndex.load)
+            if patch is not None and patch.base_version == index.model_version:
+                patch.model_version = index.model_version
+                index = patch
+        return index
+    except Exception as e:
+        print("⚠️ Error loading item neighbours:", e)
+        return None
+
+
 # ------------------------
 # Generate recommendations for a single user
 # ------------------------ 
@@ -102,7 +178,15 @@ def generate_recommendations_for_user(customer_id, top_n=5):  # Renamed from use
       1) fabricated (CSV)
       2) collaborative model (saved similarity)
       3) popular fallback
+    With RECOMMENDER_HYBRID_RANKING the engines are fused instead (see
+    recommender/hybrid.py) and a list of Items is returned.
     """
+    if HYBRID_RANKING:
+        try:
+            return hybrid_recommendations(customer_id, top_n)
+        except Exception as e:
+            print(f"⚠️ Hybrid ranking failed for customer {customer_id}, using the priority chain: {e}")
+
     try:
         # 1) fabricated
         fabricated = get_fabricated_recommendations(customer_id, top_n)  # Updated
@@ -114,80 +198,60 @@ def generate_recommendations_for_user(customer_id, top_n=5):  # Renamed from use
                 item.score = None  # Or compute if possible
             return items
 
-        # 2) build rating pivot
-        qs = Rating.objects.all().values("customer_id", "product_id", "rating")
-        df = pd.DataFrame(list(qs))
-        if df.empty:
-            # fallback: return first top items by popularity (empty if none)
-            top_products = Rating.objects.all().values("product_id").annotate(avg=models.Avg("rating")).order_by("-avg")[:top_n]
-            top_pids = [r["product_id"] for r in top_products]
-            items = Item.objects.filter(product_id__in=top_pids)[:top_n]
+        # 2) shared sparse rating matrix (refreshed incrementally)
+        ratings = get_rating_matrix()
+        if ratings.nnz == 0:
+            # fallback: precomputed segment popularity (empty if none)
+            items = popular_items_for_customer(customer_id, top_n)
             for item in items:
                 item.score = None
             return items
 
-        # pivot: index = customer_id, columns = product_id
-        pivot = df.pivot_table(index="customer_id", columns="product_id", values="rating", aggfunc="mean").fillna(0)
-
-        if customer_id not in pivot.index:  # Updated
-            # user has no ratings -> return top-rated products
-            top_products = df.groupby("product_id")["rating"].mean().sort_values(ascending=False).head(top_n).index.tolist()
-            items = Item.objects.filter(product_id__in=top_products)
+        if customer_id not in ratings:  # Updated
+            # user has no ratings -> popular in their branch / segment
+            items = popular_items_for_customer(customer_id, top_n)
             for item in items:
                 item.score = None
             return items
 
-        # load saved item-item similarity
-        similarity_df = load_trained_model()
-        if similarity_df is None:
-            # fallback: compute simple item similarity from current data
-            matrix = pivot.values
-            if matrix.size == 0:
+        # load saved item-item neighbours (top-K index, or legacy dense matrix)
+        neighbors = load_item_neighbors()
+        if neighbors is None:
+            # fallback: compute item neighbours from current data
+            if ratings.nnz == 0:
                 return Item.objects.none()  # Empty queryset
             try:
-                computed = cosine_similarity(matrix.T)
-                similarity_df = pd.DataFrame(computed, index=pivot.columns, columns=pivot.columns)
+                neighbors = ItemNeighborIndex.build(ratings.matrix, ratings.product_ids)
             except Exception as e:
                 print(f"⚠️ Error computing similarity: {e}")
                 # fallback to popularity
-                top_products = df.groupby("product_id")["rating"].mean().sort_values(ascending=False).head(top_n).index.tolist()
-                items = Item.objects.filter(product_id__in=top_products)
+                items = popular_items_for_customer(customer_id, top_n)
                 for item in items:
                     item.score = None
                 return items
 
-        # align matrix columns (similarity_df index must be product ids)
-        if isinstance(similarity_df, pd.DataFrame):
-            sim_index = list(map(int, similarity_df.index))
-        else:
-            sim_index = list(pivot.columns)  # best-effort
-
-        # create user vector aligned to sim_index
-        user_vector = pivot.loc[customer_id].reindex(index=sim_index, fill_value=0).values.reshape(1, -1)  # Updated
+        # user vector aligned to the index's product order
+        sim_index = neighbors.product_ids
+        user_vector = ratings.user_vector(customer_id, sim_index)  # Updated
 
-        # if similarity is df, convert to numpy with same order
-        if isinstance(similarity_df, pd.DataFrame):
-            sim_mat = similarity_df.reindex(index=sim_index, columns=sim_index).fillna(0).values
-        else:
-            sim_mat = np.array(similarity_df)
-
-        # score = sim * user_vector
+        # score = sparse neighbours * user_vector
         try:
-            scores = np.dot(sim_mat, user_vector.T).flatten()
+            scores = neighbors.score(user_vector)
         except Exception as e:
             print(f"⚠️ Error computing scores: {e}")
-            scores = np.zeros(len(sim_index))
+            scores = np.zeros(len(sim_index), dtype=np.float32)
 
-        # build predictions DataFrame
-        preds = pd.DataFrame({"product_id": sim_index, "score": scores})
         # exclude items already rated by user
-        rated = pivot.loc[customer_id][pivot.loc[customer_id] > 0].index.tolist()  # Updated
-        preds = preds[~preds["product_id"].isin(rated)]
-        preds = preds.sort_values("score", ascending=False).head(top_n)
-
-        items = Item.objects.filter(product_id__in=preds["product_id"].astype(int).tolist())
+        scores[user_vector > 0] = -np.inf
+        n = min(top_n, len(scores))
+        top_idx = np.argpartition(-scores, n - 1)[:n] if n else np.array([], dtype=int)
+        top_idx = top_idx[np.argsort(-scores[top_idx], kind="stable")]
+        top_idx = top_idx[np.isfinite(scores[top_idx])]
+
+        top_pids = [int(sim_index[i]) for i in top_idx]
+        items = Item.objects.filter(product_id__in=top_pids)
         # Attach scores to items
-        score_dict = dict(zip(preds["product_id"], preds["score"]))
+        score_dict = {int(sim_index[i]): float(scores[i]) for i in top_idx}
         for item in items:
             item.score = score_dict.get(item.product_id, None)
         return items
@@ -196,6 +260,105 @@ def generate_recommendations_for_user(customer_id, top_n=5):  # Renamed from use
         print(f"⚠️ Unexpected error in generate_recommendations_for_user for customer {customer_id}: {e}")  # Updated
         return Item.objects.none()  # Return empty queryset on any error
 
+# ------------------------
+# Batch scoring for many customers
+# ------------------------
+def iter_recommendations(customer_ids, top_n=5):
+    """
+    Yield (customer_id, [(product_id, score), ...]) for many customers with the
+    same priorities as generate_recommendations_for_user(), but loading the
+    rating matrix and neighbour index once and scoring every customer with
+    rated products in one matrix product per block. Fallback entries
+    (fabricated, popular in the customer's branch / segment) carry a None score.
+    """
+    from recommender.precompute import score_customers
+
+    customer_ids = list(dict.fromkeys(customer_ids))
+    known_items = set(Item.objects.values_list("product_id", flat=True))
+
+    def _items(pids):
+        return [(int(pid), None) for pid in pids if int(pid) in known_items]
+
+    def _popular(customers):
+        # popular_for_customer() with the customers' contexts read in one query
+        contexts = customer_contexts(customers)
+        for customer_id in customers:
+            branch_id, segment = contexts.get(customer_id, (None, ""))
+            yield customer_id, _items(popular_products(top_n, branch_id, segment))
+
+    # 1) fabricated (cached lookup)
+    lookup = load_fabricated_top_n()
+    if lookup is not None:
+        for customer_id in customer_ids:
+            fabricated = _fabricated_lookup(lookup, customer_id, top_n)
+            yield customer_id, _items([x for x in fabricated[:top_n] if str(x).isdigit()])
+        return
+
+    ratings = get_rating_matrix()
+    if ratings.nnz == 0:
+        yield from _popular(customer_ids)
+        return
+
+    # 2) customers without ratings -> popular in their branch / segment
+    rated = [c for c in customer_ids if c in ratings]
+    cold = [c for c in customer_ids if c not in ratings]
+    if cold:
+        yield from _popular(cold)
+    if not rated:
+        return
+
+    # 3) collaborative scores for everybody else, block by block
+    neighbors = load_item_neighbors()
+    if neighbors is None:
+        try:
+            neighbors = ItemNeighborIndex.build(ratings.matrix, ratings.product_ids)
+        except Exception as e:
+            print(f"⚠️ Error computing similarity: {e}")
+            yield from _popular(rated)
+            return
+
+    for customer_id, product_ids, scores in score_customers(ratings, neighbors, rated, top_n):
+        yield customer_id, [(pid, score) for pid, score in zip(product_ids, scores) if pid in known_items]
+
+
+def recommend_many(customer_ids, top_n=5):
+    """{customer_id: [(product_id, score), ...]} for every requested customer."""
+    return dict(iter_recommendations(customer_ids, top_n))
+
+
+# ------------------------
+# Materialized top-N (written by precompute.py)
+# ------------------------
+def get_precomputed_recommendations(customer_id, top_n=5):
+    """
+    Return top-N Items (with .score) from PrecomputedRecommendation using a
+    single indexed lookup, or None when the customer has no precomputed row.
+
+    The table only holds item-CF scores: it is bypassed (None) while
+    generate_recommendations_for_user() would answer otherwise, i.e. with
+    RECOMMENDER_HYBRID_RANKING or a fabricated top-N file.
+    """
+    if HYBRID_RANKING or load_fabricated_top_n() is not None:
+        return None
+    row = (
+        PrecomputedRecommendation.objects
+        .filter(customer_id=customer_id)
+        .values_list("product_ids", "scores")
+        .first()
+    )
+    if not row or not row[0]:
+        return None
+
+    product_ids, scores = row[0][:top_n], row[1][:top_n]
+    order = {pid: i for i, pid in enumerate(product_ids)}
+    score_dict = dict(zip(product_ids, scores))
+    items = list(Item.objects.filter(product_id__in=product_ids))
+    items.sort(key=lambda x: order[x.product_id])
+    for item in items:
+        item.score = score_dict.get(item.product_id)
+    return items
+
+
 # ------------------------
 # SQL/ORM-based content & collaborative helpers
 # ------------------------
@@ -215,9 +378,15 @@ def get_content_based_recommendations(product_name, top_n=5):
 
 def get_collaborative_recommendations(customer_id, top_k=5):
     """
-    Find other customers who share recommended products (from PestRecommendation).
-    Returns list of dicts: {customer_id, common_count}
+    Find other customers with overlapping products (purchases, ratings and
+    PestRecommendation) from the customer MinHash/LSH index.
+    Returns list of dicts: {customer_id, common_count, jaccard}; falls back to
+    counting shared recommended products when no index has been built.
     """
+    index = get_customer_similarity_index()
+    if index is not None:
+        return index.similar_customers(customer_id, top_k=top_k)
+
     rows = (
         PestRecommendation.objects
         .filter(customer_id=customer_id)
@@ -242,7 +411,18 @@ def get_collaborative_recommendations(customer_id, top_k=5):
 def get_upsell_recommendations(product_id, top_n=5):
     """
     Return product names recommended as upsell for a base product_id.
+    Mined co-purchase rules (same category, higher price) come first, the
+    stored PestRecommendation upsells fill up.
     """
+    names = []
+    index = get_rule_index()
+    if index is not None:
+        rules = index.upsell(product_id, top_n=top_n)
+        found = dict(Product.objects.filter(product_id__in=[r[0] for r in rules]).values_list("product_id", "product_name"))
+        names = [found[r[0]] for r in rules if r[0] in found]
+    if len(names) >= top_n:
+        return names
+
     qs = (
         PestRecommendation.objects
         .filter(base_product_id=product_id, recommendation_type__iexact="upsell")
@@ -250,159 +430,211 @@ def get_upsell_recommendations(product_id, top_n=5):
         .values_list("recommended_product__product_name", flat=True)
         .distinct()[:top_n]
     )
-    return list(qs)
+    for name in qs:
+        if len(names) >= top_n:
+            break
+        if name not in names:
+            names.append(name)
+    return names
 
 
 def get_crosssell_recommendations(user, top_n=5):
     """
     Recommend items for a user (customer) excluding already rated/purchased.
-    Returns Item objects.
+    Items bought together with the customer's products (association rules,
+    best lift first) are topped up with the most frequently bought products.
+    Returns Item objects; `score` holds the rule lift (None for the top-up).
     """
     user_id = user.id if hasattr(user, "id") else int(user)
-    purchased_pids = Rating.objects.filter(customer_id=user_id).values_list("product_id", flat=True).distinct()
-    crosssell = Item.objects.exclude(product_id__in=list(purchased_pids)).order_by("?")[:top_n]
-    return list(crosssell)
+    rated = set(Rating.objects.filter(customer_id=user_id, product_id__isnull=False).values_list("product_id", flat=True))
+    bought = customer_products(user_id)
+
+    index = get_rule_index()
+    if index is None:
+        crosssell = Item.objects.exclude(product_id__in=rated | bought).order_by("-created_at")[:top_n]
+        return list(crosssell)
+
+    # over-fetch: not every product has an Item row
+    ranked = index.crosssell(bought | rated, exclude=rated | bought, top_n=top_n * 2)
+    items = {i.product_id: i for i in Item.objects.filter(product_id__in=[r[0] for r in ranked])}
+    crosssell = []
+    for pid, _support, _confidence, lift in ranked:
+        item = items.get(pid)
+        if item is not None:
+            item.score = lift
+            crosssell.append(item)
+            if len(crosssell) >= top_n:
+                break
+    return crosssell
 
 
 # ------------------------
 # User-based recommender (file-backed)
 # ------------------------
+def load_user_based_scorer():
+    """
+    UserBasedScorer over the precomputed user_item_matrix / user_similarity_matrix,
+    kept in the model registry. The memory-mapped .npy artifacts are preferred
+    (see convert_trained_models); the CSVs are parsed only when the artifacts
+    are missing or older than them. Both files of a pair are written together
+    (similarity last), so its mtime versions the pair.
+    """
+    if artifacts.is_current(USER_ITEM_MATRIX) and artifacts.is_current(USER_SIM_MATRIX):
+        return model_registry.get_file(
+            artifacts.paths(USER_SIM_MATRIX)[0],
+            lambda path: UserBasedScorer.from_artifacts(USER_ITEM_MATRIX, USER_SIM_MATRIX),
+        )
+    if not os.path.exists(USER_ITEM_MATRIX) or not os.path.exists(USER_SIM_MATRIX):
+        return None
+    return model_registry.get_file(
+        USER_SIM_MATRIX,
+        lambda path: UserBasedScorer.from_csv(USER_ITEM_MATRIX, path),
+    )
+
+
+def _format_user_based(item_ids):
+    """Item ids -> "title (Category: ...)" labels, keeping the ranking order."""
+    items = {
+        i[0]: i
+        for i in Item.objects.filter(product_id__in=item_ids).values_list("product_id", "title", "category")
+    }
+    return [f"{items[pid][1]} (Category: {items[pid][2]})" for pid in item_ids if pid in items]
+
+
 def get_user_based_recommendations(user_id, top_n=5):
     """
     Uses precomputed CSVs user_item_matrix and user_similarity_matrix
     to recommend items for a user.
     """
-    base_dir = os.getcwd()
-    user_item_path = os.path.join(base_dir, "trained_models", "user_item_matrix.csv")
-    similarity_path = os.path.join(base_dir, "trained_models", "user_similarity_matrix.csv")
-
-    if not os.path.exists(user_item_path) or not os.path.exists(similarity_path):
+    scorer = load_user_based_scorer()
+    if scorer is None:
         print("⚠️ Precomputed files missing.")
         return []
 
-    user_item = pd.read_csv(user_item_path, index_col=0)
-    similarity = pd.read_csv(similarity_path, index_col=0)
-
-    # ensure integer indices
-    try:
-        user_item.index = user_item.index.astype(int)
-        similarity.index = similarity.index.astype(int)
-        similarity.columns = similarity.columns.astype(int)
-    except Exception:
-        pass
-
-    if user_id not in user_item.index:
+    if user_id not in scorer:
         print(f"⚠️ User {user_id} not found in matrix.")
         return []
 
-    sim_scores = similarity.loc[user_id]
-    sim_scores = sim_scores[sim_scores > 0]
-
-    if sim_scores.empty:
+    if not scorer.has_neighbors(user_id):
         print("⚠️ No similar users found.")
         return []
 
-    user_ratings = user_item.loc[user_id]
-    unrated_items = user_ratings[user_ratings == 0].index
+    ranked = scorer.recommend(user_id, top_n)
+    if not ranked:
+        return scorer.popular_items[:top_n].tolist()
 
-    weighted_scores = {}
-    for item in unrated_items:
-        total_sim, weighted_sum = 0.0, 0.0
-        for other_user, score in sim_scores.items():
-            if user_item.loc[other_user, item] > 0:
-                weighted_sum += score * user_item.loc[other_user, item]
-                total_sim += score
-        if total_sim > 0:
-            weighted_scores[item] = weighted_sum / total_sim
+    return _format_user_based([int(item) for item, _ in ranked])
 
-    if not weighted_scores:
-        item_means = user_item.replace(0, np.nan).mean(axis=0).sort_values(ascending=False)
-        return item_means.head(top_n).index.tolist()
 
-    ranked = sorted(weighted_scores.items(), key=lambda x: x[1], reverse=True)
-    top_items = [int(item) for item, _ in ranked[:top_n]]
-    items = Item.objects.filter(product_id__in=top_items).values_list("product_id", "title", "category")
-    return [f"{i[1]} (Category: {i[2]})" for i in items]
+def get_user_based_recommendations_batch(user_ids, top_n=5):
+    """
+    Batch variant for campaign generation: {user_id: [labels]} for many users,
+    scored block-wise in one pass and resolved with a single Item query.
+    Users missing from the matrix are left out.
+    """
+    scorer = load_user_based_scorer()
+    if scorer is None:
+        print("⚠️ Precomputed files missing.")
+        return {}
+
+    ranked = scorer.recommend_many(user_ids, top_n)
+    popular = scorer.popular_items[:top_n].tolist()
+    all_items = {int(item) for recs in ranked.values() for item, _ in recs}
+    items = {
+        i[0]: f"{i[1]} (Category: {i[2]})"
+        for i in Item.objects.filter(product_id__in=all_items).values_list("product_id", "title", "category")
+    }
+
+    results = {}
+    for user_id, recs in ranked.items():
+        if not scorer.has_neighbors(user_id):
+            results[user_id] = []
+        elif not recs:
+            results[user_id] = popular
+        else:
+            results[user_id] = [items[int(pid)] for pid, _ in recs if int(pid) in items]
+    return results
 
 
 # ------------------------
 # Train and save collaborative (item-item) model
 # ------------------------
-def train_and_save_model():
+def train_and_save_model(top_k=DEFAULT_K, legacy=False, quantization=QUANTIZATION):
     """
-    Train item-item similarity (cosine) from Rating table and save with SavedModel.
+    Train item-item similarity (cosine) from Rating table, keep the top-K
+    neighbours per product and save the top-K artifact (scores stored as
+    `quantization`: float32 / float16 / int8) with SavedModel.
+    legacy=True also writes the v1 dense pickle for workers still reading it.
     """
-    qs = Rating.objects.all().values("customer_id", "product_id", "rating")
-    df = pd.DataFrame(list(qs))
+    ratings = get_rating_matrix(force_rebuild=True)
 
-    if df.empty:
+    if ratings.nnz == 0:
         print("❌ No ratings found in DB.")
         return None
 
-    # pivot table: rows=customers, cols=products
-    matrix = df.pivot_table(index="customer_id", columns="product_id", values="rating", aggfunc="mean").fillna(0)
-
-    # compute item-item similarity
-    sim = cosine_similarity(matrix.T)
-    sim_df = pd.DataFrame(sim, index=matrix.columns, columns=matrix.columns)
+    # sparse matrix: rows=customers, cols=products
+    index = ItemNeighborIndex.build(ratings.matrix, ratings.product_ids, k=top_k).quantize(quantization)
 
     # save to disk
-    model_path = os.path.join(TRAINED_MODELS_DIR, "recommender_similarity.pkl")
-    with open(model_path, "wb") as f:
-        pickle.dump(sim_df, f)
+    model_path = os.path.join(TRAINED_MODELS_DIR, "item_neighbors_v2.npz")
+    index.save(model_path)
 
     # save path to SavedModel table
     SavedModel.objects.update_or_create(
-        name="recommender_similarity",
+        name=ITEM_NEIGHBORS_MODEL,
         defaults={"file_path": model_path},
     )
+    # patches of the previous index no longer apply
+    SavedModel.objects.filter(name=ITEM_NEIGHBORS_PATCH_MODEL).delete()
+    model_registry.invalidate(ITEM_NEIGHBORS_MODEL)
+    model_registry.invalidate(ITEM_NEIGHBORS_PATCH_MODEL)
+
+    if legacy:
+        sim = cosine_similarity(ratings.matrix.T)
+        sim_df = pd.DataFrame(sim, index=ratings.product_ids, columns=ratings.product_ids)
+        legacy_path = os.path.join(TRAINED_MODELS_DIR, "recommender_similarity.pkl")
+        with open(legacy_path, "wb") as f:
+            pickle.dump(sim_df, f)
+        SavedModel.objects.update_or_create(
+            name=LEGACY_SIMILARITY_MODEL,
+            defaults={"file_path": legacy_path},
+        )
+        model_registry.invalidate(LEGACY_SIMILARITY_MODEL)
+        model_registry.invalidate(LEGACY_SIMILARITY_MODEL + ":topk")
 
-    print(f"✅ Model trained (items={len(sim_df)}) and saved → {model_path}")
-    return sim_df
+    print(f"✅ Model trained (items={len(index)}, k={top_k}, nnz={index.matrix.nnz}, {quantization}) and saved → {model_path}")
+    return index
 
 
 
 def recommendations_with_scores(user_id, top_n=5):
     """Return top-N recommendations with predicted scores."""
-    from recommender.models import Rating, Item
-    import pandas as pd
-
     # Get recommended items
     items = generate_recommendations_for_user(user_id, top_n=top_n)
 
-    # Load collaborative similarity matrix
-    similarity_matrix = load_trained_model()
-    if similarity_matrix is None:
+    # Load collaborative similarity (top-K neighbour index)
+    neighbors = load_item_neighbors()
+    if neighbors is None:
         return [
             {"product_id": r.product_id, "title": r.title, "category": r.category, "score": None}
             for r in items
         ]
 
-    # Create user-item pivot table
-    ratings_df = pd.DataFrame(list(Rating.objects.all().values("customer_id", "product_id", "rating")))
-    if ratings_df.empty:
+    # Shared sparse user-item matrix
+    ratings = get_rating_matrix()
+    if ratings.nnz == 0 or user_id not in ratings:
         return [
             {"product_id": r.product_id, "title": r.title, "category": r.category, "score": None}
             for r in items
         ]
 
-    pivot_table = ratings_df.pivot_table(index="customer_id", columns="product_id", values="rating").fillna(0)
-
-    if user_id not in pivot_table.index:
-        return [
-            {"product_id": r.product_id, "title": r.title, "category": r.category, "score": None}
-            for r in items
-        ]
-
-    user_vector = pivot_table.loc[user_id].values.reshape(1, -1)
-    scores = (similarity_matrix.values @ user_vector.T).flatten()
+    sim_index = neighbors.product_ids
+    user_vector = ratings.user_vector(user_id, sim_index)
+    scores = dict(zip(sim_index.tolist(), neighbors.score(user_vector)))
 
     scored_items = []
     for r in items:
-        if r.product_id in pivot_table.columns:
-            score = scores[pivot_table.columns.get_loc(r.product_id)]
-        else:
-            score = None
+        score = scores.get(r.product_id)
         scored_items.append({
             "product_id": r.product_id,
             "title": r.title,
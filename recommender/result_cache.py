@@ -0,0 +1,248 @@
+# recommender/result_cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Max
+
+from recommender.models import SavedModel, PrecomputedRecommendation
+
+
+# ------------------------
+# Settings
+# ------------------------
+LOCAL_MAX_ENTRIES = getattr(settings, "RECOMMENDER_RESULT_CACHE_SIZE", 10000)
+# The in-process tier can't see invalidations made by other workers: keep it short.
+LOCAL_TIMEOUT = getattr(settings, "RECOMMENDER_RESULT_CACHE_LOCAL_TIMEOUT", 60)
+# Shared tier: a Django cache alias (None disables it). Only used when the
+# alias is shared between processes (Redis, memcached, database...): a
+# per-process LocMemCache can't carry invalidations to the other workers.
+SHARED_ALIAS = getattr(settings, "RECOMMENDER_RESULT_CACHE_ALIAS", "default")
+SHARED_TIMEOUT = getattr(settings, "RECOMMENDER_RESULT_CACHE_TIMEOUT", 6 * 3600)
+VERSION_TTL = 60     # seconds between two model version lookups
+# Counters only: what they change reaches results through item_neighbors_patch.
+VERSION_EXCLUDED = ("item_cooccurrence",)
+KEY_PREFIX = "recommender:result"
+
+
+class ResultCache:
+    """
+    Two-tier cache of recommendation results keyed by
+    (kind, customer_id, model_version, top_n):
+
+      - an in-process LRU (LOCAL_MAX_ENTRIES, LOCAL_TIMEOUT seconds),
+      - an optional shared Django cache (SHARED_ALIAS, skipped when it is a
+        per-process backend), read together with the customer's generation
+        counter in one get_many().
+
+    invalidate(customer_id) drops the customer's local entries and bumps
+    their shared generation, so every worker's shared entries for that
+    customer become misses. Hit/miss counters are per process.
+    """
+
+    def __init__(self, max_entries=LOCAL_MAX_ENTRIES, local_timeout=LOCAL_TIMEOUT,
+                 shared_alias=SHARED_ALIAS, shared_timeout=SHARED_TIMEOUT):
+        self.max_entries = max_entries
+        self.local_timeout = local_timeout
+        self.shared_alias = shared_alias
+        self._shared_checked = False
+        self.shared_timeout = shared_timeout
+        self._entries = OrderedDict()        # key -> (expires_at, value)
+        self._by_customer = {}               # customer_id -> {key, ...}
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @property
+    def shared(self):
+        if not self._shared_checked:
+            self._shared_checked = True
+            if self.shared_alias and isinstance(caches[self.shared_alias], (LocMemCache, DummyCache)):
+                print(f"⚠️ Cache {self.shared_alias!r} is local to each process; shared result cache disabled.")
+                self.shared_alias = None
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    @staticmethod
+    def _shared_key(key):
+        kind, customer_id, version, top_n = key
+        return f"{KEY_PREFIX}:{kind}:{customer_id}:{version}:{top_n}"
+
+    @staticmethod
+    def _generation_key(customer_id):
+        return f"{KEY_PREFIX}:gen:{customer_id}"
+
+    # ------------------------
+    # Lookup / store
+    # ------------------------
+    def get(self, kind, customer_id, model_version, top_n):
+        """Cached value or None."""
+        return self._lookup((kind, customer_id, model_version, top_n))[0]
+
+    def set(self, kind, customer_id, model_version, top_n, value, generation=None):
+        """
+        Store a value. `generation` is the customer's generation seen before
+        computing it (see get_or_compute), so a result computed across an
+        invalidation is never served afterwards.
+        """
+        key = (kind, customer_id, model_version, top_n)
+        self._put_local(key, value)
+        shared = self.shared
+        if shared is not None:
+            try:
+                if generation is None:
+                    generation = shared.get(self._generation_key(customer_id), 0)
+                shared.set(self._shared_key(key), (generation, value), self.shared_timeout)
+            except Exception as e:
+                print("⚠️ Shared result cache unavailable:", e)
+        return value
+
+    def get_or_compute(self, kind, customer_id, top_n, compute, model_version=None):
+        """Cached value, or compute() stored under the current model version."""
+        model_version = model_version if model_version is not None else current_model_version()
+        value, generation = self._lookup((kind, customer_id, model_version, top_n))
+        if value is None:
+            value = self.set(kind, customer_id, model_version, top_n, compute(), generation)
+        return value
+
+    def _lookup(self, key):
+        """(value or None, customer generation read from the shared tier or None)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+                return entry[1], None
+            if entry is not None:
+                self._drop(key)
+
+        generation = None
+        shared = self.shared
+        if shared is not None:
+            generation_key = self._generation_key(key[1])
+            try:
+                found = shared.get_many([self._shared_key(key), generation_key])
+                generation = found.get(generation_key, 0)
+            except Exception as e:
+                print("⚠️ Shared result cache unavailable:", e)
+                found = {}
+            stored = found.get(self._shared_key(key))
+            if stored is not None and stored[0] == generation:
+                self._put_local(key, stored[1])
+                with self._lock:
+                    self.shared_hits += 1
+                return stored[1], generation
+
+        with self._lock:
+            self.misses += 1
+        return None, generation
+
+    def _put_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.local_timeout, value)
+            self._entries.move_to_end(key)
+            self._by_customer.setdefault(key[1], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_customer.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_customer[key[1]]
+
+    # ------------------------
+    # Invalidation
+    # ------------------------
+    def invalidate(self, customer_id):
+        with self._lock:
+            for key in list(self._by_customer.get(customer_id, ())):
+                self._drop(key)
+            self.invalidations += 1
+        shared = self.shared
+        if shared is not None:
+            generation_key = self._generation_key(customer_id)
+            try:
+                if not shared.add(generation_key, 1, None):
+                    shared.incr(generation_key)
+            except ValueError:          # expired between add() and incr()
+                shared.set(generation_key, 1, None)
+            except Exception as e:
+                print("⚠️ Shared result cache unavailable:", e)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_customer.clear()
+
+    # ------------------------
+    # Metrics
+    # ------------------------
+    def reset_stats(self):
+        self.local_hits = self.shared_hits = self.misses = 0
+        self.evictions = self.invalidations = 0
+
+    def stats(self):
+        lookups = self.local_hits + self.shared_hits + self.misses
+        return {
+            "pid": os.getpid(),                  # counters are per worker process
+            "shared_alias": self.shared_alias if self.shared is not None else None,
+            "lookups": lookups,
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.local_hits + self.shared_hits) / lookups if lookups else 0.0,
+            "local_hit_ratio": self.local_hits / lookups if lookups else 0.0,
+            "local_entries": len(self._entries),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# ------------------------
+# Model version (part of the key)
+# ------------------------
+_version = {"value": None, "checked": 0.0}
+
+
+def current_model_version():
+    """
+    Short token that changes whenever a SavedModel artifact is retrained or
+    rewritten (row timestamps + file mtimes, neighbour patch included), a
+    precompute run writes PrecomputedRecommendation rows, or the user-based
+    CSV / .npy matrices change. Looked up at most every VERSION_TTL seconds.
+    """
+    from recommender import artifacts
+    from recommender.recommender_engine import USER_ITEM_MATRIX, USER_SIM_MATRIX
+
+    now = time.monotonic()
+    if _version["value"] is not None and now - _version["checked"] < VERSION_TTL:
+        return _version["value"]
+    parts = []
+    for name, path, trained_at, created_at in SavedModel.objects.exclude(name__in=VERSION_EXCLUDED) \
+            .order_by("name").values_list("name", "file_path", "trained_at", "created_at"):
+        try:
+            mtime = int(os.path.getmtime(path))
+        except OSError:
+            mtime = 0
+        parts.append(f"{name}:{trained_at or created_at}:{mtime}")
+    parts.append(str(PrecomputedRecommendation.objects.aggregate(last=Max("generated_at"))["last"]))
+    for path in (USER_ITEM_MATRIX, USER_SIM_MATRIX, *artifacts.paths(USER_ITEM_MATRIX), *artifacts.paths(USER_SIM_MATRIX)):
+        try:
+            parts.append(f"{path}:{int(os.path.getmtime(path))}")
+        except OSError:
+            pass
+    value = hashlib.md5("|".join(parts).encode()).hexdigest()[:12]
+    _version.update(value=value, checked=now)
+    return value
+
+
+result_cache = ResultCache()
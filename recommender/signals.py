@@ -0,0 +1,23 @@
+# recommender/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from crmapp.models import TaxInvoice
+from recommender.models import Rating, Interaction
+from recommender.result_cache import result_cache
+
+
+# ------------------- Result cache invalidation -------------------
+@receiver(post_save, sender=Rating)
+@receiver(post_delete, sender=Rating)
+@receiver(post_save, sender=Interaction)
+@receiver(post_delete, sender=Interaction)
+@receiver(post_save, sender=TaxInvoice)
+@receiver(post_delete, sender=TaxInvoice)
+def invalidate_customer_results(sender, instance, **kwargs):
+    """New ratings, interactions or invoices change the customer's recommendations."""
+    customer_id = instance.customer_id
+    if customer_id is not None:
+        # after commit: a reader must not re-cache the pre-write answer
+        transaction.on_commit(lambda: result_cache.invalidate(customer_id))
@@ -1,19 +1,109 @@
 from celery import shared_task
-from recommender.utils import train_content_model, train_cf_svd
-from recommender.models import PestRecommendation, SentMessageLog
+from recommender.training import run_training
+from recommender import precompute
+from recommender.content_index import build_content_index
+from recommender.association_rules import build_rule_index
+from recommender.customer_similarity import build_customer_similarity_index
+from recommender.cooccurrence import update_item_similarities
+from recommender.popularity import refresh_popularity
+from recommender.engines.rule_based import build_lead_suggestions
+from recommender.models import PestRecommendation, HybridRankingDebug
 from recommender.rapbooster_api import send_recommendation_message
-from crmapp.models import customer_details as Customer
+from crmapp.models import customer_details as Customer, SentMessageLog
 
 
 # ==========================================
 # 🔹 Task 1: Re-train Recommenders
 # ==========================================
 @shared_task
-def retrain_recommenders():
-    """Retrain both recommender models (content & collaborative)."""
-    train_content_model()
-    train_cf_svd()
-    return "✅ Recommenders retrained successfully"
+def retrain_recommenders(full=False):
+    """
+    Retrain the recommender models (content, collaborative, item neighbours)
+    from the rows added since each model's watermark; every step falls back
+    to a full rebuild on schedule or drift (see recommender/training.py).
+    """
+    report = run_training(full=full)
+    modes = ", ".join(f"{step}={result['mode']}" for step, result in report.items())
+    return f"✅ Recommenders retrained ({modes})"
+
+
+# ==========================================
+# 🔹 Task 1b: Materialize top-N recommendations
+# ==========================================
+@shared_task
+def precompute_top_n_recommendations(top_n=10, full=False):
+    """Rescore changed customers (or everybody) into PrecomputedRecommendation."""
+    result = precompute.precompute_recommendations(top_n=top_n, full=full)
+    return f"✅ Precomputed top-{top_n} for {result['written']} customers (full={result['full']})"
+
+
+# ==========================================
+# 🔹 Task 1c: Keep the TF-IDF content index in sync with Item
+# ==========================================
+@shared_task
+def refresh_content_index(full=False):
+    """Apply changed Items to the persisted content index and publish it."""
+    index, changed = build_content_index(full=full)
+    return f"✅ Content index: {len(index)} items, {changed} changed"
+
+
+# ==========================================
+# 🔹 Task 1d: Mine co-purchase association rules
+# ==========================================
+@shared_task
+def mine_association_rules():
+    """Re-mine cross-sell/upsell rules from invoices, services and purchases."""
+    index = build_rule_index()
+    return f"✅ Association rules: {len(index)} rules over {index.n_baskets} baskets"
+
+
+# ==========================================
+# 🔹 Task 1e: Re-sign customers with new purchases/ratings
+# ==========================================
+@shared_task
+def refresh_customer_similarity_index(full=False):
+    """Apply new purchases, ratings and recommendations to the customer MinHash index."""
+    index, changed = build_customer_similarity_index(full=full)
+    return f"✅ Customer MinHash index: {len(index)} customers, {changed} updated"
+
+
+# ==========================================
+# 🔹 Task 1f: Keep item-item similarities fresh intra-day
+# ==========================================
+@shared_task
+def update_item_cooccurrence(full=False):
+    """Fold new ratings/interactions/invoice lines into the co-occurrence counters."""
+    counters, changed, pairs = update_item_similarities(full=full)
+    return f"✅ Item co-occurrence: {len(changed)} products changed, {len(pairs)} pair scores updated"
+
+
+# ==========================================
+# 🔹 Task 1g: Refresh segmented popularity (cold-start fallback)
+# ==========================================
+@shared_task
+def refresh_product_popularity():
+    """Recompute the time-decayed popularity per branch/segment/category and recache it."""
+    rows = refresh_popularity()
+    return f"✅ Product popularity: {rows} rows"
+
+
+# ==========================================
+# 🔹 Task 1h: Store a sampled hybrid ranking trace
+# ==========================================
+@shared_task(ignore_result=True)
+def log_hybrid_ranking_debug(customer_id, num_candidates, debug_log):
+    """Write one HybridRankingDebug row off the request path (see recommender/hybrid.py)."""
+    HybridRankingDebug.objects.create(customer_id=customer_id, num_candidates=num_candidates, debug_log=debug_log)
+
+
+# ==========================================
+# 🔹 Task 1i: Pre-compute rule-based suggestions for open leads
+# ==========================================
+@shared_task
+def build_lead_rule_suggestions():
+    """Evaluate the lead rule table over every open lead in one vectorized pass."""
+    suggestions = build_lead_suggestions()
+    return f"✅ Lead rule suggestions: {len(suggestions)} open leads"
 
 
 # ==========================================
@@ -0,0 +1,52 @@
+from decimal import Decimal
+
+import numpy as np
+import scipy.sparse as sp
+
+from crmapp.models import customer_details, BankAccounts, Branch, Product, TaxInvoice, TaxInvoiceItem
+
+
+def random_ratings(n_customers=40, n_products=15, density=0.3, seed=0):
+    """Sparse customers x products matrix of 1-5 ratings."""
+    rng = np.random.default_rng(seed)
+    dense = rng.integers(1, 6, size=(n_customers, n_products)).astype(np.float32)
+    dense[rng.random(dense.shape) > density] = 0.0
+    return sp.csr_matrix(dense)
+
+
+def make_customers(n, start=0):
+    fields = dict(
+        primaryemail="test@example.com", contactperson="x", designation="x",
+        shifttopartyaddress="x", shifttopartycity="x", shifttopartystate="x", shifttopartypostal="x",
+        soldtopartyaddress="x", soldtopartycity="x", soldtopartystate="x", soldtopartypostal="x",
+    )
+    return customer_details.objects.bulk_create(
+        [customer_details(fullname=f"Customer {i}", primarycontact=9000000000 + i, **fields)
+         for i in range(start, start + n)]
+    )
+
+
+def make_products(n, category="Pest Control", start=0):
+    return [Product.objects.create(product_name=f"Product {i}", category=category) for i in range(start, start + n)]
+
+
+def make_invoice(customer, product_names, price=100):
+    """TaxInvoice for `customer` with one line per product name (branch / bank created on first use)."""
+    branch, _ = Branch.objects.get_or_create(
+        branch_name="Test Branch",
+        defaults=dict(contact_1="0", email_1="branch@example.com", gst_number="-", pan_number="-",
+                      full_address="x", state="x", code=0, shortcut="TST"),
+    )
+    bank, _ = BankAccounts.objects.get_or_create(
+        bank_name="Test Bank", defaults=dict(account_number="0", ifs_code="-", branch="x")
+    )
+    invoice = TaxInvoice.objects.create(
+        customer=customer, branch=branch, bank=bank, service_titel="test",
+        shifttopartystate="x", shifttopartystatecode="00", soldtopartystate="x", soldtopartystatecode="00",
+    )
+    TaxInvoiceItem.objects.bulk_create([
+        TaxInvoiceItem(tax_invoice=invoice, product_name=name, quantity=Decimal(1), price=Decimal(price),
+                       total=Decimal(price))
+        for name in product_names
+    ])
+    return invoice
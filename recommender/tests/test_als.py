@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import scipy.sparse as sp
+from django.test import SimpleTestCase
+
+from recommender.als import ImplicitALS, train_validation_split
+from recommender.tests.helpers import random_ratings
+
+
+class ImplicitALSTests(SimpleTestCase):
+    def setUp(self):
+        self.user_items = random_ratings(n_customers=60, n_products=20, density=0.25)
+
+    def test_half_step_matches_the_closed_form(self):
+        model = ImplicitALS(factors=4, regularization=0.5, alpha=2.0, block_size=7)
+        Y = np.random.default_rng(0).standard_normal((20, 4)).astype(np.float32)
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            X = model._solve(self.user_items, Y, pool)
+
+        dense = self.user_items.toarray()
+        for u in range(dense.shape[0]):
+            confidence = 1.0 + model.alpha * dense[u]
+            preference = (dense[u] > 0).astype(np.float64)
+            A = Y.T @ (confidence[:, None] * Y) + model.regularization * np.eye(4)
+            expected = np.linalg.solve(A, Y.T @ (confidence * preference)) if preference.any() else np.zeros(4)
+            np.testing.assert_allclose(X[u], expected, rtol=1e-3, atol=1e-4)
+
+    def test_thread_count_does_not_change_the_factors(self):
+        serial = ImplicitALS(factors=8, iterations=3, n_jobs=1).fit(self.user_items)
+        parallel = ImplicitALS(factors=8, iterations=3, n_jobs=4, block_size=5).fit(self.user_items)
+        np.testing.assert_allclose(parallel.user_factors, serial.user_factors, rtol=1e-4, atol=1e-5)
+        np.testing.assert_allclose(parallel.item_factors, serial.item_factors, rtol=1e-4, atol=1e-5)
+
+    def test_early_stopping_keeps_the_best_iteration(self):
+        train, validation = train_validation_split(self.user_items, fraction=0.2)
+        model = ImplicitALS(factors=8, iterations=10, patience=2, n_jobs=2).fit(train, validation)
+        recalls = [entry["recall"] for entry in model.history]
+        self.assertEqual(model.best_iteration, int(np.argmax(recalls)) + 1)
+        self.assertAlmostEqual(model.recall_at_k(train, validation), max(recalls), places=6)
+
+    def test_split_never_holds_out_a_single_interaction(self):
+        user_items = sp.csr_matrix(np.array([[1, 0, 0], [1, 1, 1], [0, 2, 3]], dtype=np.float32))
+        train, validation = train_validation_split(user_items, fraction=1.0)
+        self.assertEqual(train[0].nnz, 1)
+        self.assertEqual(validation[0].nnz, 0)
+        np.testing.assert_array_equal((train + validation).toarray(), user_items.toarray())
@@ -0,0 +1,37 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from recommender.ann import ItemFactorLSH, exact_top_k
+
+
+class ItemFactorLSHTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.items = rng.standard_normal((3000, 16)).astype(np.float32)
+        self.users = rng.standard_normal((20, 16)).astype(np.float32)
+        self.index = ItemFactorLSH.build(self.items, n_tables=8, n_bits=8)
+
+    def test_codes_are_sorted_per_table(self):
+        self.assertTrue((np.diff(self.index.codes, axis=1) >= 0).all())
+        for table in range(self.index.n_tables):
+            self.assertEqual(sorted(self.index.order[table].tolist()), list(range(len(self.items))))
+
+    def test_recall_against_the_exact_scan(self):
+        recalls = []
+        for user in self.users:
+            exact = exact_top_k(self.items, user, 10)
+            approx = self.index.search(user, self.items, top_k=10, rerank=1000)
+            self.assertEqual(len(approx), 10)
+            recalls.append(len(set(exact.tolist()) & set(approx.tolist())) / 10)
+        self.assertGreaterEqual(np.mean(recalls), 0.85)       # a random third of the items: ~0.33
+
+    def test_reranked_results_are_ordered_by_score(self):
+        user = self.users[0]
+        approx = self.index.search(user, self.items, top_k=10)
+        scores = self.items[approx] @ user
+        self.assertTrue((np.diff(scores) <= 0).all())
+
+    def test_falls_back_to_the_exact_scan_when_buckets_are_small(self):
+        index = ItemFactorLSH.build(self.items[:5], n_tables=1, n_bits=16)
+        np.testing.assert_array_equal(index.search(self.users[0], self.items[:5], top_k=5),
+                                      exact_top_k(self.items[:5], self.users[0], 5))
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from recommender import artifacts
+from recommender.tests.helpers import random_ratings
+from recommender.user_based import UserBasedScorer
+
+
+class MatrixArtifactTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def test_convert_csv_round_trip_is_memory_mapped(self):
+        csv_path = os.path.join(self.dir, "matrix.csv")
+        df = pd.DataFrame([[1.0, np.nan], [0.5, 2.0]], index=[7, 9], columns=["101", "102"])
+        df.to_csv(csv_path)
+        self.assertFalse(artifacts.is_current(csv_path))
+
+        artifacts.convert_csv(csv_path)
+        loaded = artifacts.load_matrix(csv_path)
+        self.assertTrue(artifacts.is_current(csv_path))
+        self.assertIsInstance(loaded.values, np.memmap)
+        self.assertEqual((loaded.row_ids, loaded.col_ids), ([7, 9], [101, 102]))
+        np.testing.assert_array_equal(loaded.row(9), [0.5, 2.0])
+        self.assertEqual(loaded.values[0, 1], 0.0)
+
+        os.utime(csv_path, (os.path.getmtime(csv_path) + 10,) * 2)      # CSV rewritten later
+        self.assertFalse(artifacts.is_current(csv_path))
+
+    def test_shape_mismatch_is_rejected(self):
+        with self.assertRaises(ValueError):
+            artifacts.save_matrix(os.path.join(self.dir, "bad"), np.zeros((2, 2)), [1, 2], [1])
+
+    def test_user_based_scorer_from_artifacts_matches_csv(self):
+        ratings = random_ratings(n_customers=6, n_products=5).toarray()
+        users, items = [11, 12, 13, 14, 15, 16], [1, 2, 3, 4, 5]
+        similarity = np.random.default_rng(1).uniform(-0.5, 1.0, size=(6, 6))
+        user_item = os.path.join(self.dir, "user_item.csv")
+        user_sim = os.path.join(self.dir, "user_sim.csv")
+        pd.DataFrame(ratings, index=users, columns=items).to_csv(user_item)
+        pd.DataFrame(similarity, index=users[::-1], columns=users[::-1]).to_csv(user_sim)
+        artifacts.convert_csv(user_item)
+        artifacts.convert_csv(user_sim)
+
+        from_csv = UserBasedScorer.from_csv(user_item, user_sim)
+        from_npy = UserBasedScorer.from_artifacts(user_item, user_sim)
+        for user_id in users:
+            expected, got = from_csv.recommend(user_id), from_npy.recommend(user_id)
+            self.assertEqual([pid for pid, _ in got], [pid for pid, _ in expected])
+            np.testing.assert_allclose([s for _, s in got], [s for _, s in expected], rtol=1e-5)
@@ -0,0 +1,49 @@
+import json
+from unittest import mock
+
+from django.test import RequestFactory, TestCase
+
+from recommender import api_views
+from recommender.association_rules import customer_products, mine_rules, most_purchased
+from recommender.models import Item
+from recommender.tests.helpers import make_customers, make_invoice, make_products
+
+
+class MineRulesTests(TestCase):
+    def test_support_confidence_and_lift(self):
+        baskets = [{1, 2}, {1, 2}, {1, 3}, {2, 3}]
+        index = mine_rules(baskets, min_support_count=2, min_confidence=0.0, min_lift=0.0)
+        (consequent, support, confidence, lift), = index.consequents(1)
+        self.assertEqual(consequent, 2)
+        self.assertAlmostEqual(support, 2 / 4)
+        self.assertAlmostEqual(confidence, 2 / 3)
+        self.assertAlmostEqual(lift, (2 / 3) / (3 / 4))
+        self.assertEqual(index.consequents(3), [])               # one basket per pair: below min support
+        self.assertEqual([r[0] for r in index.crosssell([3], top_n=2)], [1, 2])   # popular products fill up
+
+
+class CustomerProductsTests(TestCase):
+    def setUp(self):
+        self.customer, self.other = make_customers(2)
+        self.products = make_products(4)
+
+    def test_maps_invoice_names_without_loading_every_product(self):
+        make_invoice(self.customer, [" product 1 ", "PRODUCT 2", "Unknown"])
+        with mock.patch("recommender.association_rules.product_name_lookup", side_effect=AssertionError):
+            self.assertEqual(customer_products(self.customer.id), {self.products[1].pk, self.products[2].pk})
+
+    def test_endpoints_fall_back_to_purchase_counts_without_rules(self):
+        for product in self.products:
+            Item.objects.create(title=product.product_name, category=product.category, product=product)
+        make_invoice(self.customer, ["Product 0"])
+        make_invoice(self.other, ["Product 0", "Product 3"])
+        make_invoice(self.other, ["Product 3", "Product 1"])
+        make_invoice(self.other, ["Product 3"])
+        self.assertEqual(most_purchased(2), [self.products[3].pk, self.products[0].pk])
+
+        request = RequestFactory().get("/")
+        with mock.patch("recommender.api_views.get_rule_index", return_value=None):
+            response = api_views.cross_sell_recommendations_api(request, self.customer.id)
+            self.assertEqual(json.loads(response.content)["cross_sell_suggestions"], ["Product 3", "Product 1"])
+            response = api_views.user_recommendations(request, make_customers(1, start=2)[0].id)
+            self.assertEqual(json.loads(response.content)["recommendations"], [])
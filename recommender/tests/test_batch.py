@@ -0,0 +1,62 @@
+import json
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase
+
+from recommender import views
+from recommender.models import Item, Rating
+from recommender.rating_matrix import get_rating_matrix
+from recommender.recommender_engine import generate_recommendations_for_user, recommend_many
+from recommender.tests.helpers import make_customers, make_products
+
+
+class _User(AnonymousUser):
+    is_authenticated = True
+
+
+class BatchRecommendationTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch("recommender.recommender_engine.load_fabricated_top_n", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.customers = make_customers(6)
+        self.products = make_products(6)
+        for product in self.products:
+            Item.objects.create(title=product.product_name, category=product.category, product=product)
+        rng = np.random.default_rng(5)
+        Rating.objects.bulk_create([
+            Rating(customer=customer, product=product, rating=float(rng.integers(1, 6)))
+            for customer in self.customers[:5] for product in self.products if rng.random() < 0.5
+        ])
+        get_rating_matrix(force_rebuild=True)
+
+    def test_batch_matches_single_customer_scoring(self):
+        ids = [c.id for c in self.customers]
+        results = recommend_many(ids, top_n=3)
+        self.assertEqual(set(results), set(ids))
+        for customer_id in ids[:5]:
+            single = {(item.product_id, round(item.score, 5))
+                      for item in generate_recommendations_for_user(customer_id, top_n=3)}
+            self.assertEqual({(pid, round(score, 5)) for pid, score in results[customer_id]}, single)
+        self.assertTrue(all(score is None for _, score in results[ids[5]]))   # cold customer: popularity
+
+    def request(self, **kwargs):
+        request = RequestFactory().post("/", data=json.dumps(kwargs), content_type="application/json")
+        request.user = _User()
+        return views.batch_recommendations_api(request)
+
+    def test_api_validates_and_streams(self):
+        self.assertEqual(self.request(customer_ids=[]).status_code, 400)
+        self.assertEqual(self.request(customer_ids=["x"]).status_code, 400)
+        self.assertEqual(self.request(customer_ids=[1], top_n=0).status_code, 400)
+
+        ids = [c.id for c in self.customers[:2]]
+        response = self.request(customer_ids=ids, top_n=2)
+        self.assertEqual(set(json.loads(response.content)["results"]), {str(i) for i in ids})
+
+        response = self.request(customer_ids=ids, top_n=2, format="ndjson")
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([line["customer_id"] for line in lines], ids)
+        self.assertTrue(all(len(line["recommendations"]) <= 2 for line in lines))
@@ -0,0 +1,39 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from crmapp.models import customer_details, Product, TaxInvoice
+from recommender.benchmark import benchmark_entry_point, compare_reports
+from recommender.models import Item, PestRecommendation, Rating
+
+
+class SyntheticDataTests(TestCase):
+    def generate(self, **options):
+        call_command("generate_synthetic_data", stdout=StringIO(), **options)
+
+    def test_generates_the_requested_volume_and_purges_it(self):
+        self.generate(ratings=300, customers=20, products=15, invoices=5, recommendations=30)
+        self.assertEqual(Rating.objects.count(), 300)
+        self.assertEqual(customer_details.objects.count(), 20)
+        self.assertEqual(Product.objects.count(), 15)
+        self.assertEqual(Item.objects.count(), 15)
+        self.assertEqual(TaxInvoice.objects.count(), 5)
+        self.assertEqual(PestRecommendation.objects.count(), 30)
+
+        self.generate(purge=True)
+        self.assertEqual(Rating.objects.count(), 0)
+        self.assertEqual(customer_details.objects.count(), 0)
+
+    def test_benchmark_reports_latency_and_queries(self):
+        self.generate(ratings=200, customers=20, products=10, invoices=0, recommendations=0)
+        result = benchmark_entry_point("generate_recommendations_for_user", iterations=5, warmup=1)
+        self.assertEqual((result["iterations"], result["errors"]), (5, 0))
+        self.assertLessEqual(result["latency_ms"]["p50"], result["latency_ms"]["p99"])
+        self.assertGreater(result["queries"]["max"], 0)
+
+        baseline = {"results": {"x": {"latency_ms": {"p50": 10.0, "p95": 20.0, "p99": 40.0}, "queries": {"mean": 4}}}}
+        current = {"results": {"x": {"latency_ms": {"p50": 5.0, "p95": 20.0, "p99": 50.0}, "queries": {"mean": 1}}}}
+        self.assertEqual(compare_reports(baseline, current)["x"], {
+            "p50": (10.0, 5.0, -50.0), "p95": (20.0, 20.0, 0.0), "p99": (40.0, 50.0, 25.0), "queries": (4, 1, -75.0),
+        })
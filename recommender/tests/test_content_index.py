@@ -0,0 +1,55 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from recommender import content_index
+from recommender.content_index import ContentIndex, get_content_index
+from recommender.models import Item
+
+
+def _item(title, description="", tags=""):
+    return Item.objects.create(title=title, description=description, category="Pest Control", tags=tags)
+
+
+class ContentIndexTests(TestCase):
+    def setUp(self):
+        content_index._shared = content_index._published = None
+        self.addCleanup(setattr, content_index, "_shared", None)
+        self.termite = _item("Termite control", "termite barrier treatment", "termite")
+        self.termite_2 = _item("Termite inspection", "termite survey", "termite")
+        self.rodent = _item("Rodent control", "rodent bait stations", "rodent")
+
+    def test_refresh_applies_inserts_updates_and_deletes(self):
+        index = ContentIndex().rebuild()
+        self.assertEqual(len(index), 3)
+        added = _item("Termite baiting", "termite bait", "termite")
+        self.rodent.delete()
+        self.termite.description = "termite soil treatment"
+        self.termite.save()
+
+        self.assertEqual(index.refresh(refit=False), 3)
+        self.assertEqual(sorted(index.item_ids), sorted([self.termite.pk, self.termite_2.pk, added.pk]))
+        self.assertEqual(index.refresh(refit=False), 0)
+
+    def test_builds_in_process_until_an_index_is_published(self):
+        index = get_content_index()
+        self.assertEqual(len(index), 3)
+        self.assertIsNone(content_index._published)
+        self.assertIs(get_content_index(), index)
+
+    def test_refreshes_outside_the_lock(self):
+        index = get_content_index()
+        index.refreshed_at -= content_index.REFRESH_INTERVAL
+        added = _item("Termite baiting", "termite bait", "termite")
+
+        refresh = ContentIndex.refresh
+
+        def checked_refresh(self, refit=True):
+            assert not content_index._lock.locked()
+            return refresh(self, refit)
+
+        with mock.patch.object(ContentIndex, "refresh", checked_refresh):
+            updated = get_content_index()
+        self.assertIsNot(updated, index)
+        self.assertIn(added.pk, updated.item_index)
+        self.assertNotIn(added.pk, index.item_index)           # readers of the old copy are untouched
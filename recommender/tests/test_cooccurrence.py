@@ -0,0 +1,47 @@
+import numpy as np
+from django.test import TestCase
+
+from recommender.cooccurrence import CooccurrenceCounters
+from recommender.models import Interaction, Rating
+from recommender.tests.helpers import make_customers, make_invoice, make_products
+
+
+class CooccurrenceCountersTests(TestCase):
+    def setUp(self):
+        self.customers = make_customers(6)
+        self.products = make_products(5)
+        rng = np.random.default_rng(4)
+        Rating.objects.bulk_create([
+            Rating(customer=self.customers[c], product=self.products[p], rating=float(rng.integers(1, 6)))
+            for c in range(4) for p in range(5) if rng.random() < 0.6
+        ])
+        Interaction.objects.create(customer=self.customers[4], product=self.products[0], interaction_type="view")
+
+    def assertSameCounters(self, counters, expected):
+        self.assertEqual(set(counters.norms), set(expected.norms))
+        for pid, norm in expected.norms.items():
+            self.assertAlmostEqual(counters.norms[pid], norm, places=6)
+        products = set(expected.norms)
+        for i in products:
+            for j in products:
+                self.assertAlmostEqual(counters.cosine(i, j), expected.cosine(i, j), places=6)
+
+    def test_delta_matches_full_recount(self):
+        counters = CooccurrenceCounters().rebuild()
+        # new customer, an existing customer re-rating, implicit signals of an unrated pair
+        Rating.objects.create(customer=self.customers[5], product=self.products[1], rating=4.0)
+        Rating.objects.create(customer=self.customers[5], product=self.products[3], rating=2.0)
+        Rating.objects.create(customer=self.customers[0], product=self.products[2], rating=5.0)
+        Interaction.objects.create(customer=self.customers[4], product=self.products[4], interaction_type="purchase")
+        Interaction.objects.create(customer=self.customers[4], product=self.products[0], interaction_type="click")
+        make_invoice(self.customers[3], ["product 4"])
+
+        changed = counters.apply_delta()
+        self.assertTrue({self.products[i].pk for i in (0, 1, 2, 3, 4)} >= changed)
+        self.assertIn(self.products[4].pk, changed)
+        self.assertSameCounters(counters, CooccurrenceCounters().rebuild())
+
+    def test_delta_without_new_rows_changes_nothing(self):
+        counters = CooccurrenceCounters().rebuild()
+        self.assertEqual(counters.apply_delta(), set())
+        self.assertSameCounters(counters, CooccurrenceCounters().rebuild())
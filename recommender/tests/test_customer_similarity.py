@@ -0,0 +1,54 @@
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from recommender.customer_similarity import CustomerMinHashIndex
+from recommender.models import Rating
+from recommender.tests.helpers import make_customers, make_products
+
+
+class MinHashTests(SimpleTestCase):
+    def setUp(self):
+        self.sets = {
+            1: set(range(0, 40)),
+            2: set(range(2, 42)),        # Jaccard 38 / 42 with customer 1
+            3: set(range(1000, 1040)),   # disjoint
+            4: {7},
+        }
+        self.index = CustomerMinHashIndex(num_perm=128, bands=32)
+        self.index._sign_all(self.sets)
+
+    def test_vectorized_signatures_match_single_ones(self):
+        for customer_id, products in self.sets.items():
+            np.testing.assert_array_equal(self.index.signatures[customer_id], self.index.signature(products))
+
+    def test_similar_customers_estimate_jaccard(self):
+        (best, *rest) = self.index.similar_customers(1, top_k=3)
+        self.assertEqual(best["customer_id"], 2)
+        self.assertEqual(best["common_count"], 38)
+        self.assertAlmostEqual(best["jaccard"], 38 / 42, delta=0.1)
+        self.assertNotIn(3, [r["customer_id"] for r in rest])
+
+    def test_unknown_customers_are_signed_on_the_fly(self):
+        results = self.index.similar_customers(99, products=set(range(0, 40)))
+        self.assertEqual(results[0]["customer_id"], 1)
+        self.assertEqual(results[0]["jaccard"], 1.0)
+
+
+class MinHashRefreshTests(TestCase):
+    def test_refresh_matches_a_rebuild(self):
+        customers = make_customers(3)
+        products = make_products(4)
+        Rating.objects.create(customer=customers[0], product=products[0], rating=4.0)
+        Rating.objects.create(customer=customers[1], product=products[0], rating=3.0)
+        index = CustomerMinHashIndex().rebuild()
+
+        Rating.objects.create(customer=customers[1], product=products[1], rating=5.0)
+        Rating.objects.create(customer=customers[2], product=products[2], rating=5.0)
+        self.assertEqual(index.refresh(), 2)
+        self.assertEqual(index.refresh(), 0)
+
+        rebuilt = CustomerMinHashIndex().rebuild()
+        self.assertEqual(index.products, rebuilt.products)
+        for customer_id, signature in rebuilt.signatures.items():
+            np.testing.assert_array_equal(index.signatures[customer_id], signature)
+        self.assertEqual([dict(band) for band in index.buckets], [dict(band) for band in rebuilt.buckets])
@@ -0,0 +1,46 @@
+import numpy as np
+import scipy.sparse as sp
+from django.test import SimpleTestCase
+
+from recommender.evaluation import TemporalSplit, evaluate_variant, ranking_metrics
+
+
+class RankingMetricsTests(SimpleTestCase):
+    def test_metrics_at_k_by_hand(self):
+        scores = np.array([[0.9, 0.8, 0.7, 0.1], [0.9, 0.8, 0.7, 0.1]])
+        seen = sp.csr_matrix(np.array([[0, 0, 0, 0], [1, 0, 0, 0]]))
+        relevant = sp.csr_matrix(np.array([[0, 1, 0, 1], [0, 1, 1, 0]]))
+        metrics = ranking_metrics(scores, seen, relevant, k=2)
+
+        # user 0: top [0, 1], one hit at rank 2; user 1: item 0 masked, top [1, 2], two hits
+        np.testing.assert_allclose(metrics["precision"], [0.5, 1.0])
+        np.testing.assert_allclose(metrics["recall"], [0.5, 1.0])
+        np.testing.assert_allclose(metrics["ndcg"], [(1 / np.log2(3)) / (1 + 1 / np.log2(3)), 1.0], rtol=1e-6)
+        np.testing.assert_allclose(metrics["map"], [0.25, 1.0])
+
+
+class TemporalSplitTests(SimpleTestCase):
+    def test_test_set_holds_later_relevant_new_pairs_of_known_ids(self):
+        customers = np.array([1, 1, 2, 2, 1, 2, 2, 3, 1])
+        products = np.array([10, 11, 10, 12, 12, 11, 12, 10, 13])
+        values = np.array([5, 4, 3, 4, 5, 1, 5, 5, 5], dtype=np.float32)
+        stamps = np.array([1, 2, 3, 4, 10, 11, 12, 13, 14], dtype=np.float64)
+        split = TemporalSplit.build(customers, products, values, stamps, cutoff=5.0)
+
+        self.assertEqual(split.customer_ids.tolist(), [1, 2])
+        self.assertEqual(split.product_ids.tolist(), [10, 11, 12])
+        # (1, 12) is new and relevant; (2, 11) rated 1; (2, 12) already in train;
+        # customer 3 and product 13 were never seen in training
+        self.assertEqual(split.test.toarray().tolist(), [[0, 0, 1], [0, 0, 0]])
+        self.assertEqual(split.summary()["test_customers"], 1)
+
+    def test_popularity_variant_scores_every_test_customer(self):
+        rng = np.random.default_rng(0)
+        n = 400
+        customers, products = rng.integers(0, 30, n), rng.integers(0, 12, n)
+        values = rng.integers(1, 6, n).astype(np.float32)
+        split = TemporalSplit.build(customers, products, values, np.arange(n, dtype=np.float64))
+        result = evaluate_variant({"name": "popularity", "model": "popularity"}, split, k=5)
+        self.assertEqual(result["users"], split.summary()["test_customers"])
+        for metric in ("precision@5", "recall@5", "ndcg@5", "map@5"):
+            self.assertTrue(0.0 <= result[metric] <= 1.0)
@@ -0,0 +1,42 @@
+import os
+import tempfile
+from unittest import mock
+
+import pandas as pd
+from django.test import SimpleTestCase
+
+from recommender import recommender_engine
+from recommender.model_registry import model_registry
+
+
+class FabricatedLookupTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "user_top5_recommendations.csv")
+        pd.DataFrame(
+            {"rec_1": [11, 12, 13], "rec_2": [12, 13, 12], "rec_3": [13, 14, 14]},
+            index=pd.Index([1, 2, 3], name="customer_id"),
+        ).to_csv(self.path)
+        patcher = mock.patch.object(recommender_engine, "USER_TOP5", self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(model_registry.invalidate, self.path)
+
+    def test_lookup_and_frequency_fallback(self):
+        self.assertEqual(recommender_engine.get_fabricated_recommendations(1, 2), [11, 12])
+        self.assertEqual(recommender_engine.get_fabricated_recommendations(2), [12, 13, 14])
+        # unknown customer: products by how often they are recommended
+        self.assertEqual(recommender_engine.get_fabricated_recommendations(99, 2), [12, 13])
+
+    def test_csv_is_parsed_once(self):
+        load = mock.Mock(wraps=recommender_engine._load_fabricated_top_n)
+        with mock.patch.object(recommender_engine, "_load_fabricated_top_n", load):
+            for customer_id in (1, 2, 3, 1):
+                recommender_engine.get_fabricated_recommendations(customer_id)
+        self.assertEqual(load.call_count, 1)
+
+    def test_missing_file_means_no_lookup(self):
+        os.remove(self.path)
+        self.assertIsNone(recommender_engine.load_fabricated_top_n())
+        self.assertEqual(recommender_engine.get_fabricated_recommendations(1), [])
@@ -0,0 +1,75 @@
+import threading
+import time
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from recommender import hybrid
+
+
+class FuseTests(SimpleTestCase):
+    def test_weighted_sum_of_scaled_scores(self):
+        fused = hybrid.fuse(
+            {"item_cf": [(1, 4.0), (2, 2.0)], "popularity": [(2, 1.0), (3, 0.5)]},
+            weights={"item_cf": 1.0, "popularity": 0.5},
+        )
+        self.assertEqual([pid for pid, _, _ in fused], [1, 2, 3])
+        self.assertAlmostEqual(fused[1][1], 0.5 + 0.5)
+        self.assertEqual(fused[1][2], {"item_cf": 0.5, "popularity": 0.5})
+
+
+class GatherCandidatesTests(SimpleTestCase):
+    def test_timed_out_engine_is_skipped_until_its_run_finishes(self):
+        release = threading.Event()
+        finished = threading.Event()
+
+        def slow(customer_id, n):
+            release.wait(5)
+            finished.set()
+            return [(1, 1.0)]
+
+        engines = {"slow": slow, "fast": lambda customer_id, n: [(2, 1.0)]}
+        with mock.patch.dict(hybrid.ENGINES, engines), mock.patch.object(hybrid, "close_old_connections"):
+            candidates, status = hybrid.gather_candidates(1, ["slow", "fast"], timeouts={"slow": 0.05})
+            self.assertEqual(status["slow"], {"status": "timeout"})
+            self.assertEqual(candidates, {"fast": [(2, 1.0)]})
+
+            _, status = hybrid.gather_candidates(1, ["slow", "fast"])
+            self.assertEqual(status["slow"], {"status": "skipped"})
+
+            release.set()
+            finished.wait(5)
+            for _ in range(100):                       # done callbacks run right after the return
+                if "slow" not in hybrid._stalled:
+                    break
+                time.sleep(0.01)
+            candidates, status = hybrid.gather_candidates(1, ["slow"], timeouts={"slow": 5})
+            self.assertEqual(candidates, {"slow": [(1, 1.0)]})
+
+
+class SvdCandidatesTests(SimpleTestCase):
+    def test_masks_rated_products_through_the_item_map(self):
+        data = {
+            "user_map": {7: 0},
+            "user_factors": np.array([[1.0, 0.0]]),
+            "item_ids": [10, 20, 30],
+            "item_map": {10: 0, 20: 1, 30: 2},
+            "item_factors": np.array([[3.0, 0.0], [2.0, 0.0], [1.0, 0.0]]),
+        }
+        ratings = mock.Mock()
+        ratings.rated_products.return_value = [10, 99]          # 99: unknown to the model
+        with mock.patch("recommender.utils.load_cf_svd", return_value=data), \
+                mock.patch("recommender.rating_matrix.get_rating_matrix", return_value=ratings):
+            self.assertEqual(hybrid.svd_candidates(7, 5), [(20, 2.0), (30, 1.0)])
+
+
+class DebugLogTests(SimpleTestCase):
+    def test_logs_the_weights_used_for_the_ranking(self):
+        weights = {"popularity": 1.0}
+        with mock.patch.object(hybrid, "gather_candidates", return_value=({"popularity": [(1, 1.0)]}, {})), \
+                mock.patch.object(hybrid, "DEBUG_SAMPLE_RATE", 1.0), \
+                mock.patch.object(hybrid.Item.objects, "in_bulk", return_value={}), \
+                mock.patch.object(hybrid, "log_ranking_debug") as log:
+            hybrid.hybrid_recommendations(1, weights=weights)
+        self.assertIs(log.call_args[0][4], weights)
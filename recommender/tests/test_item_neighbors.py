@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+from sklearn.metrics.pairwise import cosine_similarity
+
+from recommender.item_neighbors import ItemNeighborIndex
+from recommender.tests.helpers import random_ratings
+
+
+class ItemNeighborIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.ratings = random_ratings()
+        self.product_ids = np.arange(100, 100 + self.ratings.shape[1])
+        self.index = ItemNeighborIndex.build(self.ratings, self.product_ids, k=5)
+
+    def test_build_keeps_top_k_without_self(self):
+        matrix = self.index.matrix
+        self.assertTrue((np.diff(matrix.indptr) <= 5).all())
+        self.assertEqual(matrix.diagonal().max(), 0.0)
+
+    def test_neighbors_are_the_top_dense_cosines(self):
+        dense = cosine_similarity(self.ratings.T.toarray())
+        np.fill_diagonal(dense, 0.0)
+        for pos, pid in enumerate(self.product_ids):
+            expected = np.sort(dense[pos])[::-1][:5]
+            got = [score for _, score in self.index.neighbors(pid, 5)]
+            np.testing.assert_allclose(got, expected[expected > 0], rtol=1e-5)
+
+    def test_from_dataframe_matches_build(self):
+        dense = pd.DataFrame(cosine_similarity(self.ratings.T.toarray()), index=self.product_ids,
+                             columns=self.product_ids)
+        legacy = ItemNeighborIndex.from_dataframe(dense, k=5)
+        np.testing.assert_allclose(legacy.similarities().toarray(), self.index.similarities().toarray(), atol=1e-6)
+
+    def test_with_rows_matches_a_full_build(self):
+        rng = np.random.default_rng(3)
+        updated = self.ratings.tolil()
+        updated[rng.integers(0, 40, 10), 2] = 5.0
+        updated = updated.tocsr()
+        full = ItemNeighborIndex.build(updated, self.product_ids, k=5)
+        # rows whose top-K moved: product 102 and those with 102 among their neighbours
+        moved = {102} | {int(p) for p in self.product_ids if 102 in dict(full.neighbors(p, 5))}
+        moved |= {int(p) for p in self.product_ids if 102 in dict(self.index.neighbors(p, 5))}
+        patched = self.index.with_rows(updated, self.product_ids, moved)
+        np.testing.assert_allclose(patched.similarities().toarray(), full.similarities().toarray(), atol=1e-6)
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+from django.test import TestCase
+
+from recommender.model_registry import ModelRegistry
+from recommender.models import SavedModel
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+class ModelRegistryTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "model.txt")
+        self._write("v1", mtime=1_000)
+        self.registry = ModelRegistry(check_interval=0)
+        self.loads = 0
+
+    def _write(self, content, mtime):
+        with open(self.path, "w") as f:
+            f.write(content)
+        os.utime(self.path, (mtime, mtime))
+
+    def load(self, path):
+        self.loads += 1
+        return _read(path)
+
+    def test_loads_once_and_reloads_when_the_file_changes(self):
+        SavedModel.objects.create(name="model", file_path=self.path)
+        self.assertEqual(self.registry.get("model", self.load), "v1")
+        self.assertEqual(self.registry.get("model", self.load), "v1")
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(self.registry.version("model"), "model.txt@1000")
+
+        self._write("v2", mtime=2_000)
+        self.assertEqual(self.registry.get("model", self.load), "v2")
+        self.assertEqual(self.loads, 2)
+        self.assertEqual(self.registry.stats()["model"]["loads"], 2)
+
+    def test_unpublished_model_is_none_until_registered(self):
+        self.assertIsNone(self.registry.get("model", self.load))
+        SavedModel.objects.create(name="model", file_path=self.path)
+        self.assertEqual(self.registry.get("model", self.load), "v1")
+
+    def test_serves_from_memory_within_the_check_interval(self):
+        registry = ModelRegistry(check_interval=3600)
+        self.assertEqual(registry.get_file(self.path, self.load), "v1")
+        self._write("v2", mtime=2_000)
+        self.assertEqual(registry.get_file(self.path, self.load), "v1")
+        registry.invalidate(self.path)
+        self.assertEqual(registry.get_file(self.path, self.load), "v2")
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from unittest import mock
+
+import pandas as pd
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from recommender import popularity
+from recommender.models import Item, ProductPopularity, Rating
+from recommender.rating_matrix import get_rating_matrix
+from recommender.recommender_engine import iter_recommendations
+from recommender.tests.helpers import make_customers, make_products
+
+
+class PopularityTests(TestCase):
+    def setUp(self):
+        cache.delete(popularity.CACHE_KEY)
+        popularity._checked.update(at=0.0, computed_at=None)
+        self.customers = make_customers(5)
+        self.products = make_products(3)
+        for product in self.products:
+            Item.objects.create(title=product.product_name, category=product.category, product=product)
+        # product 0: three recent 3-star ratings, product 1: one 5-star, product 2: below MIN_RATING
+        for customer in self.customers[:3]:
+            Rating.objects.create(customer=customer, product=self.products[0], rating=3.0)
+        Rating.objects.create(customer=self.customers[0], product=self.products[1], rating=5.0)
+        Rating.objects.create(customer=self.customers[1], product=self.products[2], rating=1.0)
+
+    def test_decayed_counts_rank_every_rollup(self):
+        now = timezone.now().timestamp()
+        events = pd.DataFrame({
+            "customer": [self.customers[0].id, self.customers[1].id, self.customers[2].id],
+            "product": [self.products[0].pk, self.products[1].pk, self.products[1].pk],
+            "branch": [-1, -1, -1],
+            "weight": [1.0, 0.5 ** 2, 0.5 ** 2],      # product 1: two events two half-lives old
+        })
+        table = popularity.compute_popularity(events, top_k=5)
+        overall = table[(table["branch"] == -1) & (table["segment"] == "") & (table["category"] == "")]
+        self.assertEqual(overall["product"].tolist(), [self.products[0].pk, self.products[1].pk])
+        self.assertEqual(overall["rank"].tolist(), [0, 1])
+        self.assertAlmostEqual(overall["score"].iloc[1], 0.5)
+        by_category = table[(table["branch"] == -1) & (table["segment"] == "") & (table["category"] == "Pest Control")]
+        self.assertEqual(by_category["product"].tolist(), overall["product"].tolist())
+
+        weights = popularity._events(now, half_life_days=30).set_index(["customer", "product"])["weight"]
+        self.assertNotIn((self.customers[1].id, self.products[2].pk), weights.index)   # below MIN_RATING
+        self.assertAlmostEqual(weights[(self.customers[0].id, self.products[0].pk)], 1.0, places=3)
+
+    def test_lookup_follows_a_refresh_made_elsewhere(self):
+        popularity.refresh_popularity()
+        self.assertEqual(popularity.popular_products(1), [self.products[0].pk])
+
+        # another process recomputes the table; this process's cache still holds the old lookup
+        ProductPopularity.objects.all().delete()
+        ProductPopularity.objects.create(product=self.products[2], score=9.0, rank=0,
+                                         computed_at=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(popularity.popular_products(1), [self.products[0].pk])   # within CHECK_INTERVAL
+        popularity._checked["at"] -= popularity.CHECK_INTERVAL
+        self.assertEqual(popularity.popular_products(1), [self.products[2].pk])
+
+    def test_batch_scoring_serves_popularity_to_cold_customers(self):
+        popularity.refresh_popularity()
+        get_rating_matrix(force_rebuild=True)
+        cold = self.customers[4].id
+        with mock.patch("recommender.recommender_engine.load_fabricated_top_n", return_value=None):
+            results = dict(iter_recommendations([cold], top_n=2))
+        # top_rated() would put the single 5-star product first
+        self.assertEqual([pid for pid, _ in results[cold]], [self.products[0].pk, self.products[1].pk])
+        self.assertEqual(
+            [pid for pid, _ in results[cold]],
+            [item.product_id for item in popularity.popular_items_for_customer(cold, 2)],
+        )
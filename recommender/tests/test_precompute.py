@@ -0,0 +1,51 @@
+from unittest import mock
+
+import numpy as np
+import scipy.sparse as sp
+from django.test import SimpleTestCase, TestCase
+
+from recommender.models import Item, PrecomputedRecommendation
+from recommender.precompute import top_n_scores
+from recommender.recommender_engine import get_precomputed_recommendations
+from recommender.tests.helpers import make_customers, make_products
+
+
+class TopNScoresTests(SimpleTestCase):
+    def test_masks_rated_items_and_orders_by_score(self):
+        users = sp.csr_matrix(np.array([[5.0, 0, 0, 0], [0, 0, 0, 0]], dtype=np.float32))
+        similarity = np.array([
+            [1.0, 0.0, 0.0, 0.0],
+            [0.9, 1.0, 0.0, 0.0],
+            [0.2, 0.0, 1.0, 0.0],
+            [0.5, 0.0, 0.0, 1.0],
+        ], dtype=np.float32)
+        idx, scores = top_n_scores(users, similarity, top_n=3)
+        np.testing.assert_array_equal(idx[0], [1, 3, 2])
+        np.testing.assert_allclose(scores[0], [4.5, 2.5, 1.0])
+        self.assertTrue(np.all(scores[1] == 0))
+
+
+class PrecomputedLookupTests(TestCase):
+    def setUp(self):
+        self.customer = make_customers(1)[0]
+        products = make_products(3)
+        for product in products:
+            Item.objects.create(title=product.product_name, category=product.category, product=product)
+        self.product_ids = [products[2].pk, products[0].pk]
+        PrecomputedRecommendation.objects.create(
+            customer=self.customer, product_ids=self.product_ids, scores=[0.9, 0.4], model_version="v",
+        )
+
+    def test_serves_the_row_on_the_item_cf_path(self):
+        with mock.patch("recommender.recommender_engine.load_fabricated_top_n", return_value=None):
+            items = get_precomputed_recommendations(self.customer.id)
+        self.assertEqual([i.product_id for i in items], self.product_ids)
+        self.assertEqual([i.score for i in items], [0.9, 0.4])
+
+    def test_bypassed_when_the_live_path_is_not_item_cf(self):
+        fabricated = {"by_customer": {}, "fallback": []}
+        with mock.patch("recommender.recommender_engine.load_fabricated_top_n", return_value=fabricated):
+            self.assertIsNone(get_precomputed_recommendations(self.customer.id))
+        with mock.patch("recommender.recommender_engine.load_fabricated_top_n", return_value=None), \
+                mock.patch("recommender.recommender_engine.HYBRID_RANKING", True):
+            self.assertIsNone(get_precomputed_recommendations(self.customer.id))
@@ -0,0 +1,100 @@
+import tempfile
+
+import numpy as np
+import scipy.sparse as sp
+from django.test import SimpleTestCase
+
+from recommender.item_neighbors import ItemNeighborIndex
+from recommender.quantization import QuantizedMatrix, quantize_csr, quantize_values
+from recommender.tests.helpers import random_ratings
+
+
+class QuantizationTests(SimpleTestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.values = rng.standard_normal((50, 8)).astype(np.float32)
+        self.values[3] = 0.0                      # all-zero row keeps scale 1
+
+    def test_float32_is_lossless(self):
+        stored, scales = quantize_values(self.values, "float32")
+        self.assertIsNone(scales)
+        np.testing.assert_array_equal(stored, self.values)
+
+    def test_int8_values_error_within_half_a_step(self):
+        stored, scales = quantize_values(self.values, "int8")
+        self.assertEqual(stored.dtype, np.int8)
+        self.assertEqual(scales[3], 1.0)
+        error = np.abs(stored * scales[:, None] - self.values)
+        self.assertTrue((error <= scales[:, None] / 2 + 1e-6).all())
+
+    def test_int8_csr_error_within_half_a_step(self):
+        matrix = random_ratings().multiply(1 / 7.0).tocsr()
+        stored, scales = quantize_csr(matrix, "int8")
+        np.testing.assert_array_equal(stored.indptr, matrix.indptr)
+        np.testing.assert_array_equal(stored.indices, matrix.indices)
+        rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+        error = np.abs(stored.data * scales[rows] - matrix.data)
+        self.assertTrue((error <= scales[rows] / 2 + 1e-6).all())
+
+    def test_unknown_mode_raises(self):
+        with self.assertRaises(ValueError):
+            quantize_values(self.values, "int4")
+
+    def test_quantized_matrix_matches_float32(self):
+        rng = np.random.default_rng(2)
+        vector = rng.standard_normal(8).astype(np.float32)
+        block = rng.standard_normal((8, 5)).astype(np.float32)
+        for mode, tolerance in (("float16", 1e-2), ("int8", 5e-2)):
+            with self.subTest(mode=mode):
+                m = QuantizedMatrix.from_array(self.values, mode)
+                reference = m.dequantize()
+                np.testing.assert_allclose(reference, self.values, atol=tolerance)
+                np.testing.assert_allclose(m @ vector, reference @ vector, rtol=1e-5, atol=1e-5)
+                np.testing.assert_allclose(m @ block, reference @ block, rtol=1e-5, atol=1e-5)
+                np.testing.assert_allclose(m[[4, 0, 7]], reference[[4, 0, 7]])
+                np.testing.assert_allclose(m[5], reference[5])
+                np.testing.assert_allclose(np.asarray(m), reference)
+
+
+class QuantizedNeighborIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.ratings = random_ratings()
+        self.product_ids = np.arange(100, 100 + self.ratings.shape[1])
+        self.index = ItemNeighborIndex.build(self.ratings, self.product_ids, k=5)
+
+    def test_quantized_scores_match_float32(self):
+        user = self.ratings[0].toarray().ravel()
+        users = self.ratings[:10]
+        expected = self.index.score(user)
+        expected_block = np.asarray(self.index.score_matrix(users).todense())
+        for mode in ("float16", "int8"):
+            with self.subTest(mode=mode):
+                quantized = self.index.quantize(mode)
+                if mode == "int8":
+                    self.assertIsNotNone(quantized.row_scale)
+                np.testing.assert_allclose(quantized.score(user), expected, atol=5e-3 * np.abs(expected).max())
+                block = quantized.score_matrix(users)
+                block = np.asarray(block.todense() if sp.issparse(block) else block)
+                np.testing.assert_allclose(block, expected_block, atol=5e-3 * np.abs(expected_block).max())
+
+    def test_save_load_round_trip(self):
+        quantized = self.index.quantize("int8")
+        with tempfile.TemporaryDirectory() as tmp:
+            loaded = ItemNeighborIndex.load(quantized.save(f"{tmp}/index.npz"))
+        self.assertEqual(loaded.quantization, "int8")
+        np.testing.assert_array_equal(loaded.row_scale, quantized.row_scale)
+        np.testing.assert_array_equal(loaded.similarities().toarray(), quantized.similarities().toarray())
+
+    def test_int8_index_stores_compact_indices(self):
+        quantized = self.index.quantize("int8")
+        self.assertEqual(quantized.indices.dtype, np.uint16)
+        self.assertEqual(self.index.indices.dtype, np.int32)   # float32 keeps the trained layout
+        # 1-byte score + 2-byte column per neighbour, against 4 + 4 in float32
+        nnz = len(quantized.data)
+        self.assertEqual(quantized.data.nbytes + quantized.indices.nbytes, 3 * nnz)
+        self.assertEqual(self.index.data.nbytes + self.index.indices.nbytes, 8 * nnz)
+        for pid in self.product_ids[:5]:
+            expected = self.index.neighbors(pid, 3)
+            got = quantized.neighbors(pid, 3)
+            self.assertEqual([p for p, _ in got], [p for p, _ in expected])
+            np.testing.assert_allclose([s for _, s in got], [s for _, s in expected], atol=1e-2)
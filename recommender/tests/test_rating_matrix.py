@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+from django.test import TestCase
+
+from recommender.models import Rating
+from recommender.rating_matrix import RatingMatrix
+from recommender.tests.helpers import make_customers, make_products
+
+
+class RatingMatrixTests(TestCase):
+    def setUp(self):
+        self.customers = make_customers(3)
+        self.products = make_products(3)
+        self.rate(0, 0, 4.0)
+        self.rate(0, 0, 2.0)           # repeated rating: averaged
+        self.rate(1, 2, 5.0)
+
+    def rate(self, customer, product, rating):
+        Rating.objects.create(customer=self.customers[customer], product=self.products[product], rating=rating)
+
+    def dense(self, ratings):
+        """Matrix as a DataFrame indexed by ids, to compare instances with different positions."""
+        return pd.DataFrame(ratings.matrix.toarray(), index=ratings.customer_ids, columns=ratings.product_ids) \
+            .sort_index().sort_index(axis=1)
+
+    def test_means_match_pivot_table(self):
+        ratings = RatingMatrix().rebuild()
+        df = pd.DataFrame(Rating.objects.values("customer_id", "product_id", "rating"))
+        expected = df.pivot_table(index="customer_id", columns="product_id", values="rating", aggfunc="mean").fillna(0)
+        pd.testing.assert_frame_equal(self.dense(ratings), expected, check_dtype=False, check_names=False)
+
+    def test_delta_refresh_matches_a_rebuild(self):
+        ratings = RatingMatrix().rebuild()
+        reader = ratings.clone()
+        self.rate(0, 0, 3.0)
+        self.rate(2, 1, 1.0)           # new customer and product
+        self.assertEqual(ratings.refresh(), 2)
+        self.assertEqual(ratings.refresh(), 0)
+
+        pd.testing.assert_frame_equal(self.dense(ratings), self.dense(RatingMatrix().rebuild()))
+        self.assertAlmostEqual(ratings.user_vector(self.customers[0].id, [self.products[0].pk])[0], 3.0)
+        self.assertEqual(reader.shape, (2, 2))                  # clones keep their own size
+        self.assertEqual(ratings.top_rated(1), [self.products[2].pk])
+        np.testing.assert_array_equal(ratings.rated_products(self.customers[2].id), [self.products[1].pk])
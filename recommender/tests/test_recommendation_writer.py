@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from recommender.models import PestRecommendation
+from recommender.recommendation_writer import RecommendationWriter
+from recommender.tests.helpers import make_customers, make_products
+
+
+class RecommendationWriterTests(TestCase):
+    def setUp(self):
+        self.customers = make_customers(2)
+        self.products = make_products(3)
+
+    def test_repeated_key_in_a_batch_keeps_the_last_score(self):
+        customer, product = self.customers[0].id, self.products[0].pk
+        with RecommendationWriter(model_version="v1") as writer:
+            writer.add(customer, product, "collaborative", score=0.1)
+            writer.add(customer, product, "Collaborative", score=0.9)
+        rows = list(PestRecommendation.objects.values_list("recommendation_type", "confidence_score"))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0][0], "collaborative")
+        self.assertEqual(float(rows[0][1]), 0.9)
+
+    def test_rewrite_upserts_in_place_and_drops_duplicates(self):
+        customer, product = self.customers[0], self.products[1]
+        for score in ("0.10", "0.20"):  # rows written before the upsert existed
+            PestRecommendation.objects.create(
+                customer=customer, recommended_product=product, recommendation_type="content", confidence_score=score,
+            )
+        first = PestRecommendation.objects.order_by("id").first().id
+
+        with RecommendationWriter(model_version="v2") as writer:
+            writer.add(customer.id, product.pk, "content", score=0.75)
+            writer.add(customer.id, self.products[2].pk, "content", score=0.5)
+            writer.add(self.customers[1].id, product.pk, "upsell", score=0.3, base_product_id=self.products[0].pk)
+        with RecommendationWriter(model_version="v3") as writer:
+            writer.add(customer.id, product.pk, "content", score=0.8)
+
+        self.assertEqual(PestRecommendation.objects.count(), 3)
+        row = PestRecommendation.objects.get(customer=customer, recommended_product=product)
+        self.assertEqual(row.id, first)
+        self.assertEqual(float(row.confidence_score), 0.8)
+        self.assertEqual(row.model_version, "v3")
+        self.assertEqual(
+            PestRecommendation.objects.get(customer=self.customers[1]).base_product_id, self.products[0].pk
+        )
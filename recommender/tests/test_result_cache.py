@@ -0,0 +1,86 @@
+import tempfile
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from recommender import precompute, result_cache as result_cache_module
+from recommender.models import PrecomputedRecommendation, SavedModel
+from recommender.result_cache import ResultCache, current_model_version, result_cache
+from recommender.tests.helpers import make_customers
+
+
+def _fresh_version():
+    result_cache_module._version.update(value=None, checked=0.0)
+    return current_model_version()
+
+
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        self.cache = ResultCache(shared_alias=None)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return [self.calls]
+
+    def test_hit_until_invalidated(self):
+        self.assertEqual(self.cache.get_or_compute("personalized", 1, 5, self.compute, model_version="v"), [1])
+        self.assertEqual(self.cache.get_or_compute("personalized", 1, 5, self.compute, model_version="v"), [1])
+        self.cache.invalidate(2)
+        self.assertEqual(self.cache.get_or_compute("personalized", 1, 5, self.compute, model_version="v"), [1])
+        self.cache.invalidate(1)
+        self.assertEqual(self.cache.get_or_compute("personalized", 1, 5, self.compute, model_version="v"), [2])
+        self.assertEqual(self.cache.get_or_compute("personalized", 1, 5, self.compute, model_version="w"), [3])
+
+    def test_lru_evicts_oldest(self):
+        cache = ResultCache(max_entries=2, shared_alias=None)
+        for customer_id in (1, 2, 3):
+            cache.set("titles", customer_id, "v", 5, [customer_id])
+        self.assertIsNone(cache.get("titles", 1, "v", 5))
+        self.assertEqual(cache.get("titles", 3, "v", 5), [3])
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_local_memory_alias_disables_the_shared_tier(self):
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            self.assertIsNone(ResultCache(shared_alias="default").shared)
+
+    def test_shared_invalidation_reaches_other_workers(self):
+        with tempfile.TemporaryDirectory() as tmp, override_settings(CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "shared": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": tmp},
+        }):
+            worker_a, worker_b = ResultCache(shared_alias="shared"), ResultCache(shared_alias="shared")
+            worker_a.get_or_compute("personalized", 7, 5, self.compute, model_version="v")
+            self.assertEqual(worker_b.get("personalized", 7, "v", 5), [1])
+            worker_b.clear()
+            worker_a.invalidate(7)
+            self.assertIsNone(worker_b.get("personalized", 7, "v", 5))
+
+
+class ModelVersionTests(TestCase):
+    def test_neighbor_patch_and_precompute_runs_change_the_version(self):
+        customer = make_customers(1)[0]
+        before = _fresh_version()
+        SavedModel.objects.create(name="item_cooccurrence", file_path="/nonexistent")
+        self.assertEqual(_fresh_version(), before)
+
+        SavedModel.objects.create(name="item_neighbors_patch", file_path="/nonexistent")
+        patched = _fresh_version()
+        self.assertNotEqual(patched, before)
+
+        PrecomputedRecommendation.objects.create(
+            customer=customer, product_ids=[1], scores=[1.0], model_version="v",
+            generated_at=timezone.now() - timedelta(minutes=15),
+        )
+        first_run = _fresh_version()
+        self.assertNotEqual(first_run, patched)
+        PrecomputedRecommendation.objects.update(generated_at=timezone.now())
+        self.assertNotEqual(_fresh_version(), first_run)
+
+    def test_precompute_write_invalidates_the_customers(self):
+        customer_id = make_customers(1)[0].id
+        result_cache.set("personalized", customer_id, "v", 5, ["old"])
+        with self.captureOnCommitCallbacks(execute=True):
+            precompute._write([(customer_id, [1], [0.5])], "v", timezone.now())
+        self.assertIsNone(result_cache.get("personalized", customer_id, "v", 5))
@@ -0,0 +1,32 @@
+import pandas as pd
+from django.test import SimpleTestCase
+
+from recommender.engines.rule_based import CompiledRules, rule_based_recommendation
+
+
+class CompiledRulesTests(SimpleTestCase):
+    def test_single_lead_wrapper(self):
+        result = rule_based_recommendation("Hot", "Service", "Cockroaches", "AMC Renewal, Gel", "new")
+        self.assertEqual(result["upsell"], ["Premium AMC Service", "AMC Renewal Discount"])
+        self.assertEqual(result["cross_sell"], ["Pest Control Addon Spray", "Kitchen Deep Clean"])
+        self.assertEqual(result["priority"], "upsell_first")
+
+        result = rule_based_recommendation("cold", None, "ants", [], "repeat")
+        self.assertEqual(result, {"upsell": ["Annual Maintenance Plan"], "cross_sell": [],
+                                  "priority": "crosssell_first"})
+
+    def test_frame_matches_single_lead_path(self):
+        leads = pd.DataFrame({
+            "lead_type": ["hot", " WARM ", None, "cold", "hot"],
+            "service_type": ["service", "product", "Service", None, "service"],
+            "pest_issue": ["termites", "cockroaches", None, "bed bugs", "termites"],
+            "customer_category": ["repeat", "new", None, "repeat", "repeat"],
+            "past_purchases": [["AMC Renewal"], [], "gel, amc basic", None, ["AMC Renewal"]],
+        }, index=[10, 11, 12, 13, 14])
+        rules = CompiledRules()
+        frame = rules.recommend(leads)
+        self.assertEqual(frame.index.tolist(), leads.index.tolist())
+        for lead_id, lead in leads.iterrows():
+            expected = rules.recommend_one(lead.to_dict())
+            self.assertEqual(frame.loc[lead_id].to_dict(), expected, lead_id)
+        self.assertEqual(frame.loc[12, "upsell"], ["AMC Renewal Discount"])
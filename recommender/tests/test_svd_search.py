@@ -0,0 +1,72 @@
+import importlib.util
+import unittest
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+HAS_SURPRISE = importlib.util.find_spec("surprise") is not None
+
+
+@unittest.skipUnless(HAS_SURPRISE, "surprise is not installed")
+class FactorScorerTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(0)
+        cls.train = pd.DataFrame({
+            "user_idx": rng.integers(0, 30, 400),
+            "item_idx": rng.integers(0, 20, 400),
+            "rating": rng.integers(1, 6, 400).astype(float),
+        }).drop_duplicates(["user_idx", "item_idx"])
+        # held-out pairs include an unknown user (99) and an unknown item (77)
+        cls.heldout = pd.DataFrame({
+            "user_idx": [0, 1, 2, 99, 3, 99],
+            "item_idx": [1, 2, 77, 3, 4, 77],
+            "rating": [5.0, 4.0, 3.0, 2.0, 5.0, 1.0],
+        })
+
+    def _fit(self, **params):
+        from surprise import SVD
+        from train_model_from_csv import build_trainset
+
+        trainset = build_trainset(self.train)
+        algo = SVD(n_factors=8, n_epochs=5, random_state=0, **params)
+        algo.fit(trainset)
+        return algo, trainset
+
+    def test_predict_matches_surprise(self):
+        from train_model_from_csv import FactorScorer
+
+        for biased in (True, False):
+            algo, trainset = self._fit(biased=biased)
+            scorer = FactorScorer(algo, trainset)
+            users, items = self.heldout["user_idx"].tolist(), self.heldout["item_idx"].tolist()
+            expected = [algo.predict(u, i).est for u, i in zip(users, items)]
+            np.testing.assert_allclose(scorer.predict(users, items), expected, rtol=1e-9, err_msg=str(biased))
+
+            # compared by estimate: clipping can tie items (an unbiased model starts near 0)
+            top = scorer.top_n(0, top_n=3)
+            best = sorted((algo.predict(0, i).est for i in scorer.item_ids.tolist()), reverse=True)[:3]
+            np.testing.assert_allclose([est for _, est in top], best, rtol=1e-9)
+            for iid, est in top:
+                self.assertAlmostEqual(algo.predict(0, iid).est, est)
+
+    def test_evaluate_and_select_best(self):
+        from train_model_from_csv import evaluate, select_best
+
+        algo, trainset = self._fit()
+        metrics = evaluate(algo, trainset, self.heldout, k=5)
+        self.assertEqual(metrics["users"], 3)   # known users with a rating >= 4 on a known item: 0, 1, 3
+        for name in ("precision", "recall", "ndcg"):
+            self.assertGreaterEqual(metrics[name], 0.0)
+            self.assertLessEqual(metrics[name], 1.0)
+
+        results = [
+            {"params": {"a": 1}, "rmse": 1.0, "ndcg": 0.1, "precision": 0.2},
+            {"params": {"a": 2}, "rmse": 1.00001, "ndcg": 0.3, "precision": 0.1},
+            {"params": {"a": 3}, "error": "boom"},
+        ]
+        self.assertEqual(select_best(results)["params"], {"a": 2})        # RMSE tie -> better NDCG
+        self.assertEqual(select_best(results, "precision")["params"], {"a": 1})
+        self.assertIsNone(select_best(results[2:]))
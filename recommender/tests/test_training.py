@@ -0,0 +1,79 @@
+import tempfile
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from recommender.als import ImplicitALS
+from recommender.model_registry import model_registry
+from recommender.models import Rating, SavedModel
+from recommender.tests.helpers import make_customers, make_products, random_ratings
+from recommender.training import _full_reason, train_cf_delta
+from recommender.utils import load_cf_svd
+
+
+class FullReasonTests(SimpleTestCase):
+    def saved(self, days_ago=1, rows_at_full=100, rows_since_full=0):
+        return SimpleNamespace(
+            full_trained_at=timezone.now() - timedelta(days=days_ago),
+            training_stats={"rows_at_full": rows_at_full, "rows_since_full": rows_since_full},
+        )
+
+    def test_delta_until_schedule_or_drift(self):
+        self.assertIsNone(_full_reason(self.saved(), changed_rows=10, new_products=1, n_products=100))
+        self.assertEqual(_full_reason(None), "no previous full training")
+        self.assertEqual(_full_reason(self.saved(), force=True), "forced")
+        self.assertEqual(_full_reason(self.saved(days_ago=8)), "schedule")
+        self.assertTrue(_full_reason(self.saved(rows_since_full=20), changed_rows=5).startswith("drift"))
+        self.assertTrue(_full_reason(self.saved(), new_products=10, n_products=100).startswith("drift"))
+        self.assertIsNone(_full_reason(self.saved(rows_since_full=20), changed_rows=5, drift=False))
+
+
+class PartialFitTests(SimpleTestCase):
+    def test_only_the_changed_rows_move(self):
+        user_items = random_ratings(n_customers=30, n_products=10)
+        model = ImplicitALS(factors=4, iterations=3, n_jobs=1).fit(user_items)
+        before_users, before_items = model.user_factors.copy(), model.item_factors.copy()
+        model.partial_fit(user_items, users={0, 1}, items={2}, iterations=1)
+
+        untouched = np.setdiff1d(np.arange(30), [0, 1])
+        np.testing.assert_array_equal(model.user_factors[untouched], before_users[untouched])
+        np.testing.assert_array_equal(np.delete(model.item_factors, 2, axis=0), np.delete(before_items, 2, axis=0))
+        self.assertTrue(model.history[-1]["partial"])
+
+
+class DeltaTrainingTests(TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch("recommender.utils.MODEL_DIR", tmp.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(model_registry.invalidate, "cf_svd")
+        self.customers = make_customers(7)
+        self.products = make_products(5)
+        rng = np.random.default_rng(6)
+        Rating.objects.bulk_create([
+            Rating(customer=customer, product=product, rating=float(rng.integers(1, 6)))
+            for customer in self.customers[:6] for product in self.products if rng.random() < 0.7
+        ])
+
+    def test_delta_run_folds_new_ratings_in(self):
+        self.assertEqual(train_cf_delta()["mode"], "full")
+        saved = SavedModel.objects.get(name="cf_svd")
+        self.assertIsNotNone(saved.full_trained_at)
+        self.assertIsNotNone(saved.watermark)
+
+        newcomer = self.customers[6].id
+        Rating.objects.create(customer=self.customers[6], product=self.products[0], rating=5.0)
+        result = train_cf_delta()
+        self.assertEqual((result["mode"], result["rows"]), ("delta", 1))
+        payload = load_cf_svd()
+        self.assertIn(newcomer, payload["user_map"])
+        self.assertEqual(len(payload["user_ids"]), len(payload["user_factors"]))
+        self.assertEqual(SavedModel.objects.get(name="cf_svd").training_stats["rows_since_full"], 1)
+
+        self.assertEqual(train_cf_delta()["mode"], "skipped")
@@ -0,0 +1,46 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from recommender.models import Interaction, Rating
+from recommender.tests.helpers import make_customers, make_invoice, make_products
+from recommender.training_export import export_training_data, read_training_data
+
+
+class TrainingExportTests(TestCase):
+    def setUp(self):
+        self.customer, self.other = make_customers(2)
+        self.products = make_products(2)
+
+    def _export(self, **kwargs):
+        output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output, ignore_errors=True)
+        manifest = export_training_data(output=output, fmt="npy", **kwargs)
+        return manifest, read_training_data(output)
+
+    def test_keeps_the_latest_rating_and_every_source(self):
+        old = Rating.objects.create(customer=self.customer, product=self.products[0], rating=2.0)
+        new = Rating.objects.create(customer=self.customer, product=self.products[0], rating=5.0)
+        Rating.objects.filter(pk=old.pk).update(timestamp=timezone.now() - timedelta(days=1))
+        Interaction.objects.create(customer=self.customer, product=self.products[1], interaction_type="purchase")
+        make_invoice(self.customer, ["Product 1"])
+
+        manifest, df = self._export()
+        ratings = df[df["source"] == "rating"]
+        self.assertEqual(ratings["source_id"].tolist(), [new.pk])
+        self.assertEqual(ratings["rating"].tolist(), [5.0])
+        purchases = df[(df["event_type"] == "purchase") & (df["item_id"] == self.products[1].pk)]
+        self.assertEqual(sorted(purchases["source"].astype(str)), ["interaction", "invoice"])
+        self.assertEqual(manifest["sources"]["rating"], {"read": 2, "written": 1})
+
+    def test_dedupes_within_each_file(self):
+        for rating in (1.0, 2.0, 3.0):
+            Rating.objects.create(customer=self.customer, product=self.products[0], rating=rating)
+        Rating.objects.create(customer=self.other, product=self.products[0], rating=4.0)
+
+        manifest, df = self._export(sources=["rating"], chunk_size=2, rows_per_file=2)
+        self.assertEqual([f["rows"] for f in manifest["files"]], [1, 2])
+        self.assertEqual(sorted(df["rating"].tolist()), [2.0, 3.0, 4.0])
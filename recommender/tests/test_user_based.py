@@ -0,0 +1,59 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from recommender.tests.helpers import random_ratings
+from recommender.user_based import UserBasedScorer
+
+
+def _reference(ratings, similarity, u):
+    """The per-item loop the scorer replaces."""
+    scores = {}
+    for i in range(ratings.shape[1]):
+        if ratings[u, i] != 0:
+            continue
+        weights = np.clip(similarity[u], 0, None) * (ratings[:, i] > 0)
+        if weights.sum() > 0:
+            scores[i] = float(weights @ ratings[:, i] / weights.sum())
+    return scores
+
+
+class UserBasedScorerTests(SimpleTestCase):
+    def setUp(self):
+        self.ratings = random_ratings(n_customers=12, n_products=8).toarray()
+        rng = np.random.default_rng(2)
+        similarity = rng.uniform(-0.5, 1.0, size=(12, 12)).astype(np.float32)
+        self.similarity = (similarity + similarity.T) / 2
+        self.user_ids = np.arange(500, 512)
+        self.item_ids = np.arange(10, 18)
+        self.scorer = UserBasedScorer(self.user_ids, self.item_ids, self.ratings, self.similarity)
+
+    def test_scores_match_the_weighted_mean(self):
+        for u in range(12):
+            expected = _reference(self.ratings, self.similarity, u)
+            got = dict(self.scorer.recommend(int(self.user_ids[u]), top_n=8))
+            self.assertEqual(set(got), {int(self.item_ids[i]) for i in expected})
+            for i, score in expected.items():
+                self.assertAlmostEqual(got[int(self.item_ids[i])], score, places=5)
+
+    def test_batch_matches_single_users(self):
+        users = [int(u) for u in self.user_ids] + [999]
+        batch = self.scorer.recommend_many(users, top_n=3)
+        self.assertNotIn(999, batch)
+        for user_id in self.user_ids.tolist():
+            self.assertEqual(batch[user_id], self.scorer.recommend(user_id, top_n=3))
+        self.assertEqual(self.scorer.recommend(999), [])
+
+    def test_from_csv_aligns_the_similarity_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            user_item = os.path.join(tmp, "user_item.csv")
+            similarity = os.path.join(tmp, "similarity.csv")
+            pd.DataFrame(self.ratings, index=self.user_ids, columns=self.item_ids).to_csv(user_item)
+            order = self.user_ids[::-1]                     # saved in another user order
+            pd.DataFrame(self.similarity[::-1, ::-1], index=order, columns=order).to_csv(similarity)
+            loaded = UserBasedScorer.from_csv(user_item, similarity)
+        for user_id in self.user_ids.tolist():
+            self.assertEqual(loaded.recommend(user_id), self.scorer.recommend(user_id))
@@ -0,0 +1,285 @@
+# recommender/training.py
+import os
+import time
+from datetime import datetime
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from recommender.models import Rating, SavedModel
+from recommender.model_registry import model_registry
+from recommender.rating_matrix import get_rating_matrix
+from recommender.als import ImplicitALS
+from recommender.ann import ItemFactorLSH
+from recommender.quantization import quantize_factors
+
+
+# ------------------------
+# Settings
+# ------------------------
+# Seconds between two full rebuilds of a model, whatever the change volume.
+FULL_REBUILD_INTERVAL = getattr(settings, "RECOMMENDER_FULL_REBUILD_INTERVAL", 7 * 24 * 3600)
+# Full rebuild once the rows added since the last one reach this share of the rows it saw.
+DRIFT_CHANGE_FRACTION = getattr(settings, "RECOMMENDER_DRIFT_CHANGE_FRACTION", 0.25)
+# Full rebuild once products unseen by the last full fit reach this share of the catalogue.
+DRIFT_NEW_PRODUCTS = getattr(settings, "RECOMMENDER_DRIFT_NEW_PRODUCTS", 0.1)
+# ALS sweeps over the changed rows on a warm start.
+WARM_START_ITERATIONS = getattr(settings, "RECOMMENDER_WARM_START_ITERATIONS", 2)
+
+STEPS = ("content", "cf", "item_neighbors")
+
+
+# ------------------------
+# Watermarks / bookkeeping
+# ------------------------
+def _encode(watermark):
+    """(timestamp, id) -> JSON."""
+    if watermark is None:
+        return None
+    ts, row_id = watermark
+    return {"timestamp": ts.isoformat(), "id": row_id}
+
+
+def _decode(data):
+    if not data or "timestamp" not in data:
+        return None
+    return datetime.fromisoformat(data["timestamp"]), data["id"]
+
+
+def _full_reason(saved, force=False, changed_rows=0, new_products=0, n_products=0, drift=True):
+    """
+    Why this run must be a full rebuild (None = a delta is fine). drift=False
+    for models whose delta update is exact, which only need the schedule.
+    """
+    if force:
+        return "forced"
+    if saved is None or saved.full_trained_at is None:
+        return "no previous full training"
+    if (timezone.now() - saved.full_trained_at).total_seconds() >= FULL_REBUILD_INTERVAL:
+        return "schedule"
+    if not drift:
+        return None
+    stats = saved.training_stats or {}
+    since_full = stats.get("rows_since_full", 0) + changed_rows
+    if since_full >= DRIFT_CHANGE_FRACTION * max(stats.get("rows_at_full", 0), 1):
+        return f"drift: {since_full} rows since the last full rebuild"
+    if n_products and new_products >= DRIFT_NEW_PRODUCTS * n_products:
+        return f"drift: {new_products} new products"
+    return None
+
+
+def _record(name, watermark, full, rows, **stats):
+    """Store the watermark and counters of a finished run on the SavedModel row."""
+    saved = SavedModel.objects.filter(name=name).first()
+    if saved is None:
+        return None
+    now = timezone.now()
+    training_stats = dict(saved.training_stats or {})
+    if full:
+        training_stats.update(rows_at_full=rows, rows_since_full=0)
+        saved.full_trained_at = now
+    else:
+        training_stats["rows_since_full"] = training_stats.get("rows_since_full", 0) + rows
+    training_stats.update(stats, last_rows=rows, last_mode="full" if full else "delta")
+    saved.watermark = watermark
+    saved.trained_at = now
+    saved.training_stats = training_stats
+    saved.save(update_fields=["watermark", "trained_at", "full_trained_at", "training_stats"])
+    return saved
+
+
+# ------------------------
+# Collaborative filtering (cf_svd: SVD or ALS factors)
+# ------------------------
+def _align(factors, old_ids, new_ids, scale=0.0, random_state=0):
+    """Rows of `factors` reordered to `new_ids`; ids without a row get small random values (or zeros)."""
+    old_index = {key: pos for pos, key in enumerate(old_ids)}
+    positions = np.array([old_index.get(key, -1) for key in new_ids], dtype=np.int64)
+    out = np.zeros((len(new_ids), factors.shape[1]), dtype=np.float32)
+    known = positions >= 0
+    out[known] = factors[positions[known]]
+    if scale and (~known).any():
+        out[~known] = np.random.default_rng(random_state).standard_normal(((~known).sum(), factors.shape[1])) * scale
+    return out, np.flatnonzero(~known)
+
+
+def train_cf_delta(full=False):
+    """
+    Update the cf_svd factors with the ratings past the SavedModel watermark:
+    ALS re-solves the changed customers/products from the previous factors,
+    SVD folds new customers and products into the previous basis. Falls back
+    to utils.train_cf() on schedule or drift.
+    """
+    from recommender.utils import train_cf, load_cf_svd
+
+    started = time.perf_counter()
+    saved = SavedModel.objects.filter(name="cf_svd").first()
+    payload = load_cf_svd() if saved is not None else None
+    watermark = _decode(saved.watermark) if saved is not None else None
+
+    ratings = get_rating_matrix(force_refresh=True)
+    delta = Rating.objects.filter(customer_id__isnull=False, product_id__isnull=False)
+    if watermark is not None:
+        ts, last_id = watermark
+        delta = delta.filter(Q(timestamp__gt=ts) | Q(timestamp=ts, id__gt=last_id))
+    if ratings.watermark is not None:
+        ts, last_id = ratings.watermark
+        delta = delta.filter(Q(timestamp__lt=ts) | Q(timestamp=ts, id__lte=last_id))
+    changed = list(delta.values_list("customer_id", "product_id").distinct())
+
+    known_items = set(payload["item_ids"]) if payload else set()
+    new_products = len(set(ratings.product_ids) - known_items)
+    reason = _full_reason(saved if payload else None, full, len(changed), new_products, len(ratings.product_ids))
+
+    if reason:
+        payload = train_cf()
+        if payload is None:
+            return {"mode": "skipped", "reason": "no ratings"}
+        ratings = get_rating_matrix()
+        _record("cf_svd", _encode(ratings.watermark), True, ratings.nnz,
+                products_at_full=len(ratings.product_ids))
+        return {"mode": "full", "reason": reason, "rows": ratings.nnz, "seconds": time.perf_counter() - started}
+
+    if not changed:
+        _record("cf_svd", _encode(ratings.watermark), False, 0)
+        return {"mode": "skipped", "reason": "no new ratings", "rows": 0, "seconds": time.perf_counter() - started}
+
+    users = {ratings.customer_index[c] for c, _ in changed if c in ratings.customer_index}
+    items = {ratings.product_index[p] for _, p in changed if p in ratings.product_index}
+    R = ratings.matrix
+
+    if payload.get("algorithm") == "als":
+        params = payload["params"]
+        model = ImplicitALS(factors=params["factors"], regularization=params["regularization"], alpha=params["alpha"])
+        model.user_factors, new_users = _align(payload["user_factors"], payload["user_ids"], ratings.customer_ids, 0.01)
+        model.item_factors, new_items = _align(payload["item_factors"], payload["item_ids"], ratings.product_ids, 0.01)
+        model.partial_fit(R, users | set(new_users.tolist()), items | set(new_items.tolist()),
+                          iterations=WARM_START_ITERATIONS)
+        user_factors, item_factors = model.user_factors, model.item_factors
+    else:
+        # user_factors = U·Σ, item_factors = V: fold new products in with the old
+        # customers (v = Σ⁻² (UΣ)ᵀ r), then recompute changed customers (u = r·V)
+        user_factors, new_users = _align(payload["user_factors"], payload["user_ids"], ratings.customer_ids)
+        item_factors, new_items = _align(payload["item_factors"], payload["item_ids"], ratings.product_ids)
+        if new_items.size:
+            sigma2 = np.asarray(payload["svd"].singular_values_, dtype=np.float32) ** 2
+            folded = (R[:, new_items].T @ user_factors) / np.maximum(sigma2, 1e-12)
+            item_factors[new_items] = folded
+        rows = np.array(sorted(users | set(new_users.tolist())), dtype=np.int64)
+        if rows.size:
+            user_factors[rows] = R[rows] @ item_factors
+
+    payload = dict(
+        payload,
+        user_map=dict(ratings.customer_index),
+        item_map=dict(ratings.product_index),
+        user_ids=list(ratings.customer_ids),
+        item_ids=list(ratings.product_ids),
+        # re-stored with the quantization the full retrain chose
+        user_factors=quantize_factors(user_factors, payload.get("quantization")),
+        item_factors=quantize_factors(item_factors, payload.get("quantization")),
+        ann=ItemFactorLSH.build(item_factors),
+    )
+    joblib.dump(payload, saved.file_path + ".tmp")
+    os.replace(saved.file_path + ".tmp", saved.file_path)
+    model_registry.invalidate("cf_svd")
+    _record("cf_svd", _encode(ratings.watermark), False, len(changed))
+    return {
+        "mode": "delta",
+        "rows": len(changed),
+        "customers": len(users),
+        "products": len(items),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+# ------------------------
+# Content (TF-IDF index, also published as content_tfidf)
+# ------------------------
+def train_content_delta(full=False):
+    """Apply changed Items to the content index and republish content_tfidf from it."""
+    from recommender.content_index import build_content_index, CONTENT_INDEX_MODEL
+    from recommender.utils import MODEL_DIR
+
+    started = time.perf_counter()
+    saved = SavedModel.objects.filter(name=CONTENT_INDEX_MODEL).first()
+    # ContentIndex refits its vocabulary itself once REFIT_FRACTION of the rows changed
+    reason = _full_reason(saved, full, drift=False)
+    index, changed = build_content_index(full=bool(reason))
+    watermark = _encode(index.watermark)
+    _record(CONTENT_INDEX_MODEL, watermark, bool(reason), changed if not reason else len(index))
+
+    if reason or changed or not SavedModel.objects.filter(name="content_tfidf").exists():
+        # same payload as utils.train_content_model(), without refitting
+        model_path = os.path.join(MODEL_DIR, "content_tfidf.joblib")
+        joblib.dump({"tfidf": index.vectorizer, "matrix": index.matrix, "ids": list(index.item_ids)}, model_path)
+        SavedModel.objects.update_or_create(name="content_tfidf", defaults={"file_path": model_path})
+        model_registry.invalidate("content_tfidf")
+        _record("content_tfidf", watermark, bool(reason), changed)
+    return {
+        "mode": "full" if reason else ("delta" if changed else "skipped"),
+        "reason": reason,
+        "rows": changed,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+# ------------------------
+# Item neighbours (co-occurrence counters)
+# ------------------------
+def train_item_neighbors_delta(full=False):
+    """
+    Patch the item_neighbors index (published as item_neighbors_patch) for
+    the products the co-occurrence counters report as changed; a full
+    rebuild retrains the index and recounts. The patched rows are exact, so
+    only the schedule (or a missing artifact) forces the full path.
+    """
+    from recommender.cooccurrence import update_item_similarities, COOCCURRENCE_MODEL
+    from recommender.recommender_engine import train_and_save_model, ITEM_NEIGHBORS_MODEL, ITEM_NEIGHBORS_PATCH_MODEL
+
+    started = time.perf_counter()
+    saved = SavedModel.objects.filter(name=ITEM_NEIGHBORS_MODEL).first()
+    reason = _full_reason(saved, full, drift=False)
+    if reason:
+        if train_and_save_model() is None:
+            return {"mode": "skipped", "reason": "no ratings"}
+        counters, changed, _ = update_item_similarities(full=True, patch_neighbors=False)
+    else:
+        counters, changed, _ = update_item_similarities()
+
+    # a delta only touches the patch: the trained index's row (its version) stays as it is
+    _record(ITEM_NEIGHBORS_MODEL if reason else ITEM_NEIGHBORS_PATCH_MODEL,
+            dict(counters.watermarks), bool(reason), len(changed))
+    _record(COOCCURRENCE_MODEL, dict(counters.watermarks), bool(reason), len(changed))
+    return {
+        "mode": "full" if reason else ("delta" if changed else "skipped"),
+        "reason": reason,
+        "products": len(changed),
+        "seconds": time.perf_counter() - started,
+    }
+
+
+# ------------------------
+# Orchestrator
+# ------------------------
+def run_training(full=False, steps=STEPS):
+    """
+    Delta-train the given models in order; each step decides between a
+    warm-started delta and a full rebuild on its own. Returns {step: report}.
+    """
+    runners = {
+        "content": train_content_delta,
+        "cf": train_cf_delta,
+        "item_neighbors": train_item_neighbors_delta,
+    }
+    report = {}
+    for step in steps:
+        try:
+            report[step] = runners[step](full=full)
+        except Exception as e:
+            print(f"⚠️ Training step {step} failed:", e)
+            report[step] = {"mode": "failed", "reason": str(e)}
+    return report
@@ -0,0 +1,283 @@
+# recommender/training_export.py
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from crmapp.models import TaxInvoiceItem, ServiceProduct
+from recommender.models import Rating, Interaction
+from recommender.association_rules import product_name_lookup
+from recommender.cooccurrence import INTERACTION_WEIGHTS, INVOICE_WEIGHT
+
+try:
+    import pyarrow  # noqa: F401  (Feather / Parquet writers)
+except ImportError:  # optional: pip install pyarrow
+    pyarrow = None
+
+
+# ------------------------
+# Export format
+# ------------------------
+# <output>/manifest.json                      schema, files, per-source id watermarks
+# <output>/<source>/part-00000.feather        Arrow IPC, uncompressed (memory-mappable)
+# <output>/<source>/part-00000.parquet        or Parquet (compressed, not mappable)
+# <output>/<source>/part-00000/<column>.npy   or raw NumPy columns (no pyarrow needed)
+FORMAT_NAME = "training_events"
+FORMAT_VERSION = 1
+FORMATS = ("feather", "parquet", "npy")
+EXPORT_DIR = getattr(settings, "RECOMMENDER_EXPORT_DIR", os.path.join(settings.BASE_DIR, "trained_models", "training_export"))
+CHUNK_SIZE = 5000               # rows per keyset page
+ROWS_PER_FILE = 1_000_000       # rows per partition file
+
+SOURCES = ("rating", "interaction", "invoice", "service")
+EVENT_TYPES = ["rating", "view", "click", "call", "purchase", "recommend", "service"]
+COLUMNS = ["user_id", "item_id", "event_type", "rating", "ts", "source", "source_id"]
+# one row per (customer, product, event type, source) within each partition file:
+# the latest one. An invoice purchase and an Interaction "purchase" are both kept.
+DEDUPE_KEY = ["user_id", "item_id", "event_type", "source"]
+
+
+def default_format():
+    return "feather" if pyarrow is not None else "npy"
+
+
+# ------------------------
+# Streaming sources
+# ------------------------
+def _querysets():
+    """source -> values_list(id, customer, product (id or name), event / value, timestamp)."""
+    return {
+        "rating": Rating.objects.values_list("id", "customer_id", "product_id", "rating", "timestamp"),
+        "interaction": Interaction.objects.values_list(
+            "id", "customer_id", "product_id", "interaction_type", "timestamp"),
+        "invoice": TaxInvoiceItem.objects.values_list(
+            "id", "tax_invoice__customer_id", "product_name", "quantity", "tax_invoice__created_at"),
+        "service": ServiceProduct.objects.annotate(
+            ts=Coalesce("service__service_date", "service__lead_date"),
+        ).values_list("id", "service__customer_id", "product_id", "quantity", "ts"),
+    }
+
+
+def stream_rows(qs, upper, chunk_size=CHUNK_SIZE):
+    """
+    Pages of rows with id <= upper by keyset pagination (id > last ORDER BY id
+    LIMIT n): constant memory on every backend, where iterator() on MySQL
+    still buffers the whole result client-side.
+    """
+    last = 0
+    while True:
+        rows = list(qs.filter(id__gt=last, id__lte=upper).order_by("id")[:chunk_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def clean_chunk(source, rows, names=None):
+    """Raw rows of one source -> DataFrame in the export schema (invalid rows dropped)."""
+    df = pd.DataFrame(rows, columns=["source_id", "user_id", "item", "value", "ts"])
+    if source == "rating":
+        df["event_type"] = "rating"
+        df["rating"] = pd.to_numeric(df["value"], errors="coerce")
+    elif source == "interaction":
+        df["event_type"] = df["value"].astype(str).str.strip().str.lower()
+        df["rating"] = df["event_type"].map(INTERACTION_WEIGHTS)
+    else:
+        df["event_type"] = "purchase" if source == "invoice" else "service"
+        df["rating"] = INVOICE_WEIGHT
+    if source == "invoice":
+        df["item"] = df["item"].map(lambda name: names.get((name or "").strip().lower()))
+
+    df = df.rename(columns={"item": "item_id"})
+    # no customer / product, unknown event or zero weight: not a training signal
+    df = df[df["user_id"].notna() & df["item_id"].notna() & df["event_type"].isin(EVENT_TYPES)
+            & (df["rating"].fillna(0) > 0)]
+    return pd.DataFrame({
+        "user_id": df["user_id"].astype(np.int64),
+        "item_id": df["item_id"].astype(np.int64),
+        "event_type": pd.Categorical(df["event_type"], categories=EVENT_TYPES),
+        "rating": df["rating"].astype(np.float32),
+        "ts": pd.to_datetime(df["ts"], errors="coerce", utc=True).astype("datetime64[ms, UTC]"),
+        "source": pd.Categorical([source] * len(df), categories=list(SOURCES)),
+        "source_id": df["source_id"].astype(np.int64),
+    })
+
+
+def dedupe(df):
+    """
+    One row per DEDUPE_KEY: the latest by (ts, source id), so a re-rating
+    replaces the earlier rating. Rows without a timestamp lose to dated ones.
+    """
+    latest = df.sort_values(["ts", "source_id"], na_position="first", kind="stable")
+    return latest.drop_duplicates(DEDUPE_KEY, keep="last")
+
+
+# ------------------------
+# Writing
+# ------------------------
+def _write_part(df, folder, index, fmt):
+    """Write one partition sorted by user, time. Returns (path, sorted frame)."""
+    df = df.sort_values(["user_id", "ts"], kind="stable").reset_index(drop=True)
+    name = f"part-{index:05d}"
+    if fmt == "feather":
+        path = os.path.join(folder, name + ".feather")
+        df.to_feather(path, compression="uncompressed")
+    elif fmt == "parquet":
+        path = os.path.join(folder, name + ".parquet")
+        df.to_parquet(path, index=False)
+    else:
+        path = os.path.join(folder, name)
+        os.makedirs(path)
+        for column in COLUMNS:
+            values = df[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.cat.codes.astype(np.int8)           # categories in the manifest
+            elif column == "ts":
+                values = values.dt.tz_convert(None)                 # UTC, NaT kept
+            np.save(os.path.join(path, column + ".npy"), values.to_numpy())
+    return path, df
+
+
+def _flush(buffer, staging, source, index, fmt):
+    path, part = _write_part(dedupe(pd.concat(buffer, ignore_index=True)), os.path.join(staging, source), index, fmt)
+    has_ts = bool(part["ts"].notna().any())
+    return {
+        "path": os.path.relpath(path, staging),
+        "source": source,
+        "rows": int(len(part)),
+        "min_ts": part["ts"].min().isoformat() if has_ts else None,
+        "max_ts": part["ts"].max().isoformat() if has_ts else None,
+        "min_source_id": int(part["source_id"].min()),
+        "max_source_id": int(part["source_id"].max()),
+    }
+
+
+def export_training_data(output=EXPORT_DIR, fmt=None, sources=SOURCES, chunk_size=CHUNK_SIZE,
+                         rows_per_file=ROWS_PER_FILE):
+    """
+    Stream the training sources out of the database into partition files
+    plus manifest.json. Rows are cleaned chunk by chunk and deduplicated per
+    partition file (DEDUPE_KEY, latest row wins): memory stays bounded by
+    rows_per_file, and a key split across two files of one source keeps a
+    row in each. Written to a temporary folder and swapped in at the end.
+    Returns the manifest.
+    """
+    fmt = fmt or default_format()
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    if fmt != "npy" and pyarrow is None:
+        raise ImportError(f"The {fmt} export needs pyarrow (pip install pyarrow); use fmt='npy' instead")
+
+    started = time.perf_counter()
+    output = os.path.abspath(output)
+    staging = f"{output}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    querysets = _querysets()
+    names = None
+    files, watermarks, stats = [], {}, {}
+    for source in sources:
+        qs = querysets[source]
+        upper = qs.aggregate(last=Max("id"))["last"] or 0
+        watermarks[source] = upper
+        stats[source] = {"read": 0, "written": 0}
+        if source == "invoice" and upper:
+            names = product_name_lookup()
+        folder = os.path.join(staging, source)
+        os.makedirs(folder)
+
+        buffer, buffered, parts = [], 0, 0
+        for rows in stream_rows(qs, upper, chunk_size):
+            stats[source]["read"] += len(rows)
+            chunk = clean_chunk(source, rows, names)
+            if chunk.empty:
+                continue
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= rows_per_file:
+                files.append(_flush(buffer, staging, source, parts, fmt))
+                buffer, buffered, parts = [], 0, parts + 1
+        if buffer:
+            files.append(_flush(buffer, staging, source, parts, fmt))
+        stats[source]["written"] = sum(f["rows"] for f in files if f["source"] == source)
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "file_format": fmt,
+        "created_at": timezone.now().isoformat(),
+        "columns": COLUMNS,
+        "categories": {"event_type": EVENT_TYPES, "source": list(SOURCES)},
+        "dedupe_key": DEDUPE_KEY,
+        "dedupe_scope": "file",              # latest row per key within each file
+        "sorted_by": ["user_id", "ts"],      # within each file
+        "watermarks": watermarks,
+        "sources": stats,
+        "rows": sum(f["rows"] for f in files),
+        "files": files,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    # swap the finished export in
+    previous = f"{output}.old-{os.getpid()}"
+    if os.path.exists(output):
+        os.replace(output, previous)
+    os.replace(staging, output)
+    shutil.rmtree(previous, ignore_errors=True)
+    return manifest
+
+
+# ------------------------
+# Reading (trainers)
+# ------------------------
+def load_manifest(output=EXPORT_DIR):
+    with open(os.path.join(output, "manifest.json")) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_NAME or manifest.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported training export {output}: {manifest.get('format')} v{manifest.get('version')}")
+    return manifest
+
+
+def iter_parts(output=EXPORT_DIR, columns=None, sources=None):
+    """
+    Yield one {column: array} per partition file. Feather and .npy columns
+    are memory-mapped (numeric columns without nulls are not copied), so a
+    trainer only holds the pages it touches.
+    """
+    manifest = load_manifest(output)
+    columns = columns or manifest["columns"]
+    for entry in manifest["files"]:
+        if sources and entry["source"] not in sources:
+            continue
+        path = os.path.join(output, entry["path"])
+        if manifest["file_format"] == "npy":
+            yield {c: np.load(os.path.join(path, c + ".npy"), mmap_mode="r") for c in columns}
+        elif manifest["file_format"] == "feather":
+            import pyarrow.feather as feather
+            table = feather.read_table(path, columns=columns, memory_map=True)
+            yield {c: table.column(c).to_numpy() for c in columns}
+        else:
+            yield pd.read_parquet(path, columns=columns).to_dict("series")
+
+
+def read_training_data(output=EXPORT_DIR, columns=None, sources=None):
+    """The export as one DataFrame (categorical codes decoded)."""
+    manifest = load_manifest(output)
+    columns = columns or manifest["columns"]
+    frames = [pd.DataFrame({c: np.asarray(v) for c, v in part.items()})
+              for part in iter_parts(output, columns, sources)]
+    df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+    for column, categories in manifest["categories"].items():
+        if column in df and pd.api.types.is_integer_dtype(df[column]):
+            df[column] = pd.Categorical.from_codes(df[column], categories=categories)
+    return df
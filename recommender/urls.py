@@ -30,6 +30,8 @@ urlpatterns = [
     path('api/recommendations/<int:customer_id>/', api_ai_personalized, name='api_recommendations_customer'),
     path('api/user_recommendations/<int:customer_id>/', api_ai_personalized, name='api_user_recommendations'),
     path('api/customer_recommendations/<int:customer_id>/', views.customer_recommendations_api, name='customer_recommendations_api'),
+    path('api/recommendations/batch/', views.batch_recommendations_api, name='api_recommendations_batch'),
+    path('api/recommendations/cache-stats/', views.recommendation_cache_stats, name='api_recommendations_cache_stats'),
 
     # Collaborative / Upsell / Cross-sell
     path('api/collaborative/<int:customer_id>/', views.collaborative_view, name='api_collaborative'),
@@ -0,0 +1,136 @@
+# recommender/user_based.py
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from recommender import artifacts
+
+
+SCORE_CHUNK = 1000  # users scored per matrix product in the batch variant
+
+
+class UserBasedScorer:
+    """
+    User-user collaborative filtering over the precomputed user-item and
+    user-similarity matrices (written by pest_recommender_train.py, as CSV
+    or as memory-mapped .npy artifacts).
+
+    For a user u and an item i the score is the similarity-weighted mean of
+    the ratings given to i by users similar to u:
+
+        score(u, i) = sum_v s(u,v) * r(v,i) / sum_v s(u,v) * [r(v,i) > 0]
+
+    with s clipped to positive similarities. Both sums are one sparse matrix
+    product each, for a single user or a whole block of users.
+    """
+
+    def __init__(self, user_ids, item_ids, ratings, similarity):
+        self.user_ids = np.asarray(user_ids)
+        self.item_ids = np.asarray(item_ids)
+        self.user_index = {uid: i for i, uid in enumerate(self.user_ids.tolist())}
+        self.ratings = sp.csr_matrix(ratings, dtype=np.float32)
+        self.rated = (self.ratings > 0).astype(np.float32).tocsr()
+        # kept as given (possibly a read-only memmap); only the rows being
+        # scored are read and clipped
+        self.similarity = similarity
+
+        # popularity fallback: mean of the non-zero ratings per item
+        sums = np.asarray(self.ratings.sum(axis=0)).ravel()
+        counts = np.asarray(self.rated.sum(axis=0)).ravel()
+        means = np.divide(sums, counts, out=np.full_like(sums, np.nan), where=counts > 0)
+        order = np.argsort(-np.nan_to_num(means, nan=-np.inf), kind="stable")
+        self.popular_items = self.item_ids[order[np.isfinite(means[order])]]
+
+    def __contains__(self, user_id):
+        return user_id in self.user_index
+
+    # ------------------------
+    # Loading
+    # ------------------------
+    @classmethod
+    def from_csv(cls, user_item_path, similarity_path):
+        user_item = pd.read_csv(user_item_path, index_col=0)
+        similarity = pd.read_csv(similarity_path, index_col=0)
+        user_item.index = _as_int(user_item.index)
+        user_item.columns = _as_int(user_item.columns)
+        similarity.index = _as_int(similarity.index)
+        similarity.columns = _as_int(similarity.columns)
+
+        # align similarity rows/columns to the user-item row order
+        similarity = similarity.reindex(index=user_item.index, columns=user_item.index).fillna(0)
+        return cls(
+            user_item.index.to_numpy(),
+            user_item.columns.to_numpy(),
+            user_item.fillna(0).to_numpy(dtype=np.float32),
+            similarity.to_numpy(dtype=np.float32),
+        )
+
+    @classmethod
+    def from_artifacts(cls, user_item_base, similarity_base):
+        """Open the .npy artifacts (see recommender.artifacts) memory-mapped."""
+        user_item = artifacts.load_matrix(user_item_base)
+        similarity = artifacts.load_matrix(similarity_base)
+        values = similarity.values
+        if similarity.row_ids != user_item.row_ids or similarity.col_ids != user_item.row_ids:
+            # different user order: realign once (private copy)
+            rows = np.array([similarity.row_index.get(uid, -1) for uid in user_item.row_ids], dtype=np.int64)
+            cols = np.array([similarity.col_index.get(uid, -1) for uid in user_item.row_ids], dtype=np.int64)
+            values = np.asarray(values[np.ix_(np.maximum(rows, 0), np.maximum(cols, 0))], dtype=np.float32)
+            values[rows < 0] = 0
+            values[:, cols < 0] = 0
+        return cls(user_item.row_ids, user_item.col_ids, user_item.values, values)
+
+    # ------------------------
+    # Scoring
+    # ------------------------
+    def score_rows(self, rows):
+        """
+        Dense (len(rows) x n_items) scores for the given user positions;
+        items the user already rated, or that no similar user rated, are NaN.
+        """
+        weights = sp.csr_matrix(np.clip(self.similarity[rows], 0, None), dtype=np.float32)
+        numerator = (weights @ self.ratings).toarray()
+        denominator = (weights @ self.rated).toarray()
+        scores = np.divide(
+            numerator, denominator,
+            out=np.full(numerator.shape, np.nan, dtype=np.float32),
+            where=denominator > 0,
+        )
+        scores[self.ratings[rows].toarray() != 0] = np.nan
+        return scores
+
+    def has_neighbors(self, user_id):
+        pos = self.user_index.get(user_id)
+        return pos is not None and bool((self.similarity[pos] > 0).any())
+
+    def recommend(self, user_id, top_n=5):
+        """[(item_id, score), ...] best first; [] for unknown users."""
+        pos = self.user_index.get(user_id)
+        if pos is None:
+            return []
+        return self._top_n(self.score_rows([pos])[0], top_n)
+
+    def recommend_many(self, user_ids, top_n=5):
+        """{user_id: [(item_id, score), ...]} scored block by block; unknown users are skipped."""
+        known = [(uid, self.user_index[uid]) for uid in user_ids if uid in self.user_index]
+        results = {}
+        for start in range(0, len(known), SCORE_CHUNK):
+            block = known[start:start + SCORE_CHUNK]
+            scores = self.score_rows([pos for _, pos in block])
+            for (uid, _), row in zip(block, scores):
+                results[uid] = self._top_n(row, top_n)
+        return results
+
+    def _top_n(self, scores, top_n):
+        valid = np.flatnonzero(~np.isnan(scores))
+        if valid.size == 0:
+            return []
+        order = valid[np.argsort(-scores[valid], kind="stable")][:top_n]
+        return [(self.item_ids[i].item(), float(scores[i])) for i in order]
+
+
+def _as_int(labels):
+    try:
+        return labels.astype(int)
+    except (TypeError, ValueError):
+        return labels
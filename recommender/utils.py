@@ -3,11 +3,16 @@ import joblib
 import numpy as np
 import pandas as pd
 from django.conf import settings
-from django.db import models  # ✅ Added for Avg() aggregation
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.decomposition import TruncatedSVD
 from .models import Item, Rating, SavedModel
+from .model_registry import model_registry
+from .rating_matrix import get_rating_matrix
+from .popularity import popular_for_customer
+from .als import ImplicitALS, train_validation_split
+from .ann import ItemFactorLSH, ANN_MIN_ITEMS, exact_top_k
+from .quantization import quantize_factors, QUANTIZATION
 from crmapp.models import SentMessageLog
 
 import requests
@@ -20,6 +25,9 @@ import requests
 MODEL_DIR = os.path.join(settings.BASE_DIR, 'models')
 os.makedirs(MODEL_DIR, exist_ok=True)
 
+# "svd" (TruncatedSVD) or "als" (implicit ALS) for retrain_recommenders
+CF_TRAINER = getattr(settings, "RECOMMENDER_CF_TRAINER", "svd")
+
 
 # =======================================================
 # 🧠 CONTENT-BASED FILTERING (TF-IDF)
@@ -43,18 +51,14 @@ def train_content_model(save=True):
     if save:
         joblib.dump({'tfidf': tfidf, 'matrix': tfidf_matrix, 'ids': df['id'].tolist()}, model_path)
         SavedModel.objects.update_or_create(name='content_tfidf', defaults={'file_path': model_path})
+        model_registry.invalidate('content_tfidf')
 
     return {'tfidf': tfidf, 'matrix': tfidf_matrix, 'ids': df['id'].tolist()}
 
 
 def load_content_model():
-    """Load the saved TF-IDF model."""
-    try:
-        sm = SavedModel.objects.get(name='content_tfidf')
-        data = joblib.load(sm.file_path)
-        return data
-    except SavedModel.DoesNotExist:
-        return None
+    """Load the saved TF-IDF model (cached in the model registry)."""
+    return model_registry.get('content_tfidf', joblib.load)
 
 
 def recommended_items_content(item_id, top_k=10):
@@ -90,22 +94,22 @@ def recommended_items_content(item_id, top_k=10):
 # =======================================================
 # 🤝 COLLABORATIVE FILTERING (SVD)
 # =======================================================
-def train_cf_svd(n_components=50, save=True):
-    """Train a Collaborative Filtering model using SVD."""
-    ratings = Rating.objects.all().values('user_id', 'item_id', 'rating')
-    df = pd.DataFrame(list(ratings))
-    if df.empty:
+def train_cf_svd(n_components=50, save=True, quantization=QUANTIZATION):
+    """
+    Train a Collaborative Filtering model using SVD (customers x products).
+    Factors are stored as `quantization` (float32 / float16 / int8 per-row scaled).
+    """
+    ratings = get_rating_matrix(force_rebuild=True)
+    if ratings.nnz == 0:
         return None
 
-    user_ids = df['user_id'].unique().tolist()
-    item_ids = df['item_id'].unique().tolist()
-    user_map = {u: i for i, u in enumerate(user_ids)}
-    item_map = {it: i for i, it in enumerate(item_ids)}
+    user_ids = list(ratings.customer_ids)
+    item_ids = list(ratings.product_ids)
+    user_map = dict(ratings.customer_index)
+    item_map = dict(ratings.product_index)
 
-    # Build user-item matrix
-    R = np.zeros((len(user_ids), len(item_ids)))
-    for row in df.itertuples():
-        R[user_map[row.user_id], item_map[row.item_id]] = row.rating
+    # Sparse user-item matrix (TruncatedSVD works on CSR directly)
+    R = ratings.matrix
 
     # Train SVD
     svd = TruncatedSVD(n_components=min(n_components, min(R.shape) - 1))
@@ -119,33 +123,95 @@ def train_cf_svd(n_components=50, save=True):
         'item_map': item_map,
         'user_ids': user_ids,
         'item_ids': item_ids,
-        'user_factors': user_factors,
-        'item_factors': item_factors,
+        'user_factors': quantize_factors(user_factors, quantization),
+        'item_factors': quantize_factors(item_factors, quantization),
+        'quantization': quantization,
+        'ann': ItemFactorLSH.build(item_factors),
     }
 
     # Save model
     if save:
         joblib.dump(payload, model_path)
         SavedModel.objects.update_or_create(name='cf_svd', defaults={'file_path': model_path})
+        model_registry.invalidate('cf_svd')
 
     return payload
 
 
-def load_cf_svd():
-    """Load the saved SVD collaborative filtering model."""
-    try:
-        sm = SavedModel.objects.get(name='cf_svd')
-        data = joblib.load(sm.file_path)
-        return data
-    except SavedModel.DoesNotExist:
+def train_cf_als(factors=64, regularization=0.1, alpha=40.0, iterations=15, n_jobs=None,
+                 validation_fraction=0.1, patience=2, save=True, quantization=QUANTIZATION):
+    """
+    Train implicit-feedback ALS on the sparse rating matrix (customers x products)
+    with early stopping on a held-out split, then publish the factors as the
+    'cf_svd' SavedModel so recommended_items_cf() serves them unchanged.
+    """
+    ratings = get_rating_matrix(force_rebuild=True)
+    if ratings.nnz == 0:
         return None
 
+    R = ratings.matrix
+    model = ImplicitALS(
+        factors=min(factors, max(1, min(R.shape) - 1)),
+        regularization=regularization,
+        alpha=alpha,
+        iterations=iterations,
+        n_jobs=n_jobs,
+        patience=patience,
+    )
+    history = []
+    if validation_fraction:
+        train, validation = train_validation_split(R, fraction=validation_fraction)
+        model.fit(train, validation=validation if validation.nnz else None)
+        history = model.history
+        # refit on everything for the chosen number of iterations
+        model.iterations = model.best_iteration
+    model.fit(R)
+
+    model_path = os.path.join(MODEL_DIR, 'cf_als.joblib')
+    payload = {
+        'svd': None,
+        'algorithm': 'als',
+        'params': {
+            'factors': model.factors,
+            'regularization': regularization,
+            'alpha': alpha,
+            'iterations': model.iterations,
+        },
+        'history': history or model.history,
+        'user_map': dict(ratings.customer_index),
+        'item_map': dict(ratings.product_index),
+        'user_ids': list(ratings.customer_ids),
+        'item_ids': list(ratings.product_ids),
+        'user_factors': quantize_factors(model.user_factors, quantization),
+        'item_factors': quantize_factors(model.item_factors, quantization),
+        'quantization': quantization,
+        'ann': ItemFactorLSH.build(model.item_factors),
+    }
+
+    # Publish under the 'cf_svd' name: same payload keys as train_cf_svd()
+    if save:
+        joblib.dump(payload, model_path)
+        SavedModel.objects.update_or_create(name='cf_svd', defaults={'file_path': model_path})
+        model_registry.invalidate('cf_svd')
+
+    return payload
+
+
+def train_cf():
+    """Train the collaborative model selected by RECOMMENDER_CF_TRAINER."""
+    return train_cf_als() if CF_TRAINER == "als" else train_cf_svd()
+
+
+def load_cf_svd():
+    """Load the saved SVD collaborative filtering model (cached in the model registry)."""
+    return model_registry.get('cf_svd', joblib.load)
+
 
 def recommended_items_cf(user_id, top_k=10):
     """Recommend items for a user based on collaborative filtering (SVD)."""
     data = load_cf_svd()
     if not data:
-        data = train_cf_svd()
+        data = train_cf()
         if not data:
             return []
 
@@ -158,24 +224,25 @@ def recommended_items_cf(user_id, top_k=10):
 
     # Cold-start handling
     if user_id not in user_map:
-        popular = (
-            Rating.objects.values('item_id')
-            .annotate(avg=models.Avg('rating'))
-            .order_by('-avg')[:top_k]
-        )
-        return [Item.objects.get(pk=p['item_id']) for p in popular]
+        popular = popular_for_customer(user_id, top_k)
+        by_product = Item.objects.in_bulk(popular, field_name='product_id')
+        return [by_product[pid] for pid in popular if pid in by_product]
 
     # Compute recommendations
     uidx = user_map[user_id]
     user_vector = user_factors[uidx]  # (k,)
-    scores = item_factors.dot(user_vector)  # (n_items,)
-    top_idx = np.argsort(-scores)[:top_k]
+    ann = data.get('ann')
+    if ann is not None and len(item_ids) >= ANN_MIN_ITEMS:
+        # LSH candidates + exact re-rank (see recommender/ann.py)
+        top_idx = ann.search(user_vector, item_factors, top_k)
+    else:
+        top_idx = exact_top_k(item_factors, user_vector, top_k)
     top_item_ids = [item_ids[i] for i in top_idx]
 
     # Return Items in order
     id_to_order = {id_: i for i, id_ in enumerate(top_item_ids)}
-    items = list(Item.objects.filter(id__in=top_item_ids))
-    items.sort(key=lambda x: id_to_order[x.id])
+    items = list(Item.objects.filter(product_id__in=top_item_ids))
+    items.sort(key=lambda x: id_to_order[x.product_id])
     return items
 
  
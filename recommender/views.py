@@ -2,10 +2,11 @@
 
 from django.shortcuts import render
 from django.db import connection
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
 from django.core.paginator import Paginator
+from django.conf import settings
 import json
 import pickle
 import os
@@ -24,10 +25,14 @@ from .recommender_engine import (
     get_upsell_recommendations,
     get_crosssell_recommendations,
     generate_recommendations_for_user,
-    get_user_based_recommendations
+    get_precomputed_recommendations,
+    get_user_based_recommendations,
+    iter_recommendations,
+    recommend_many,
 )
 
 from .utils import send_recommendation_message
+from .result_cache import result_cache
 
 # Helper: Render placeholders
 def render_template(text, data):
@@ -115,7 +120,10 @@ def upsell_view(request, product_id):
 def crosssell_view(request, customer_id):
     try:
         results = get_crosssell_recommendations(customer_id)
-        return JsonResponse({'cross_sell_suggestions': results})
+        return JsonResponse({'cross_sell_suggestions': [
+            {'product_id': item.product_id, 'title': item.title, 'lift': getattr(item, 'score', None)}
+            for item in results
+        ]})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
@@ -231,6 +239,54 @@ def get_all_products(request):
 import logging
 logger = logging.getLogger(__name__)
 
+def _personalized_results(customer_id, top_n=5):
+    """Serialized top-N for api_ai_personalized (materialized item-CF top-N when it applies, else live scoring)."""
+    recommendations = get_precomputed_recommendations(customer_id, top_n=top_n)
+    if recommendations is None:
+        recommendations = generate_recommendations_for_user(
+            customer_id=customer_id,
+            top_n=top_n
+        )
+
+    results = []
+
+    for r in recommendations:
+        try:
+            # CASE 1: Item model returned
+            if isinstance(r, Item):
+                results.append({
+                    "product_id": r.product_id,
+                    "title": r.title,
+                    "category": r.category,
+                    "tags": r.tags,
+                    "confidence_score": getattr(r, "score", None),
+                })
+
+            # CASE 2: Product model returned
+            elif hasattr(r, "product_name"):
+                results.append({
+                    "product_id": r.id,
+                    "title": r.product_name,
+                    "category": getattr(r, "category", None),
+                    "tags": getattr(r, "tags", ""),
+                    "confidence_score": getattr(r, "score", None),
+                })
+
+            # Fallback
+            else:
+                results.append({
+                    "product_id": getattr(r, "id", None),
+                    "title": getattr(r, "title", "Unknown Item"),
+                    "category": getattr(r, "category", None),
+                    "tags": getattr(r, "tags", None),
+                    "confidence_score": getattr(r, "score", None),
+                })
+        except Exception as e:
+            logger.warning(f"Recommendation item processing error: {e}")
+            continue
+    return results
+
+
 @csrf_exempt
 @login_required
 def api_ai_personalized(request, customer_id):
@@ -238,52 +294,14 @@ def api_ai_personalized(request, customer_id):
         customer_id = int(customer_id)
         customer = get_object_or_404(customer_details, id=customer_id)
 
-        # Safe Recommendations
+        # Safe Recommendations (cached per customer / model version)
         try:
-            recommendations = generate_recommendations_for_user(
-                customer_id=customer_id,
-                top_n=5
+            results = result_cache.get_or_compute(
+                "personalized", customer_id, 5, lambda: _personalized_results(customer_id, top_n=5)
             )
         except Exception as e:
             logger.error(f"Error generating recommendations: {e}")
-            recommendations = []
-
-        results = []
-
-        for r in recommendations:
-            try:
-                # CASE 1: Item model returned
-                if isinstance(r, Item):
-                    results.append({
-                        "product_id": r.product_id,
-                        "title": r.title,
-                        "category": r.category,
-                        "tags": r.tags,
-                        "confidence_score": getattr(r, "score", None),
-                    })
-
-                # CASE 2: Product model returned
-                elif hasattr(r, "product_name"):
-                    results.append({
-                        "product_id": r.id,
-                        "title": r.product_name,
-                        "category": getattr(r, "category", None),
-                        "tags": getattr(r, "tags", ""),
-                        "confidence_score": getattr(r, "score", None),
-                    })
-
-                # Fallback
-                else:
-                    results.append({
-                        "product_id": getattr(r, "id", None),
-                        "title": getattr(r, "title", "Unknown Item"),
-                        "category": getattr(r, "category", None),
-                        "tags": getattr(r, "tags", None),
-                        "confidence_score": getattr(r, "score", None),
-                    })
-            except Exception as e:
-                logger.warning(f"Recommendation item processing error: {e}")
-                continue
+            results = []
 
         return JsonResponse({
             "customer_id": customer.id,
@@ -445,9 +463,18 @@ def send_message_view(request):
 # ============================================================
 # 1️⃣1️⃣ CUSTOMER RECOMMENDATIONS API
 # ============================================================
+def _customer_recommendation_titles(customer_id):
+    precomputed = get_precomputed_recommendations(customer_id)
+    if precomputed is not None:
+        return [f"{i.title} (Category: {i.category})" for i in precomputed]
+    return get_user_based_recommendations(customer_id)
+
+
 def customer_recommendations_api(request, customer_id):
     try:
-        recommendations = get_user_based_recommendations(customer_id)
+        recommendations = result_cache.get_or_compute(
+            "titles", customer_id, 5, lambda: _customer_recommendation_titles(customer_id)
+        )
         return JsonResponse({
             "customer_id": customer_id,
             "recommendations": recommendations
@@ -455,6 +482,95 @@ def customer_recommendations_api(request, customer_id):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+@login_required
+def recommendation_cache_stats(request):
+    """Hit ratio and size of this worker's recommendation result cache."""
+    return JsonResponse(result_cache.stats())
+
+# ============================================================
+# 1️⃣2️⃣ BATCH RECOMMENDATIONS API (campaigns)
+# ============================================================
+BATCH_MAX_CUSTOMERS = getattr(settings, "RECOMMENDER_BATCH_MAX_CUSTOMERS", 10000)
+BATCH_MAX_TOP_N = getattr(settings, "RECOMMENDER_BATCH_MAX_TOP_N", 100)
+
+
+@csrf_exempt
+@login_required
+def batch_recommendations_api(request):
+    """
+    Top-N for many customers in one call.
+
+    POST {"customer_ids": [1, 2, ...], "top_n": 5, "format": "json" | "ndjson"}
+    or GET ?customer_ids=1,2,3&top_n=5&format=ndjson
+
+    json   -> {"top_n": 5, "results": {"<customer_id>": [[product_id, score], ...]}}
+    ndjson -> one {"customer_id": ..., "recommendations": [[product_id, score], ...]} per line,
+              streamed while customers are scored; a customer that failed gets
+              {"customer_id": ..., "error": ...} instead.
+    """
+    try:
+        if request.method == "POST":
+            payload = json.loads(request.body or "{}")
+        else:
+            payload = {
+                "customer_ids": [c for c in request.GET.get("customer_ids", "").split(",") if c.strip()],
+                "top_n": request.GET.get("top_n", 5),
+                "format": request.GET.get("format"),
+            }
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON body."}, status=400)
+    if not isinstance(payload, dict):
+        return JsonResponse({"error": "Expected a JSON object with customer_ids."}, status=400)
+
+    raw_ids = payload.get("customer_ids") or []
+    if not isinstance(raw_ids, list):
+        return JsonResponse({"error": "customer_ids must be a list of integers"}, status=400)
+    if not raw_ids:
+        return JsonResponse({"error": "Please provide customer_ids."}, status=400)
+    if len(raw_ids) > BATCH_MAX_CUSTOMERS:
+        return JsonResponse({"error": f"At most {BATCH_MAX_CUSTOMERS} customers per request."}, status=400)
+    try:
+        customer_ids = [int(c) for c in raw_ids]
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "customer_ids must be a list of integers"}, status=400)
+    try:
+        top_n = payload.get("top_n")
+        top_n = 5 if top_n in (None, "") else int(top_n)
+    except (TypeError, ValueError):
+        top_n = 0
+    if not 1 <= top_n <= BATCH_MAX_TOP_N:
+        return JsonResponse({"error": f"top_n must be an integer between 1 and {BATCH_MAX_TOP_N}."}, status=400)
+
+    fmt = payload.get("format") or ""
+    if fmt == "ndjson" or "application/x-ndjson" in request.headers.get("Accept", ""):
+        def line(customer_id, **fields):
+            return json.dumps({"customer_id": customer_id, **fields}, separators=(",", ":")) + "\n"
+
+        def lines():
+            # headers are already sent: errors become per-customer lines, never a broken stream
+            pending = dict.fromkeys(customer_ids)
+            try:
+                for customer_id, recs in iter_recommendations(customer_ids, top_n):
+                    pending.pop(customer_id, None)
+                    try:
+                        yield line(customer_id, recommendations=recs)
+                    except (TypeError, ValueError) as e:
+                        logger.error(f"Batch recommendation error for customer {customer_id}: {e}")
+                        yield line(customer_id, error="Internal server error")
+            except Exception as e:
+                logger.error(f"Batch recommendation stream error: {e}")
+                for customer_id in pending:
+                    yield line(customer_id, error="Internal server error")
+        return StreamingHttpResponse(lines(), content_type="application/x-ndjson")
+
+    try:
+        results = recommend_many(customer_ids, top_n)
+        return JsonResponse({"top_n": top_n, "results": results}, json_dumps_params={"separators": (",", ":")})
+    except Exception as e:
+        logger.error(f"Batch recommendation error: {e}")
+        return JsonResponse({"error": "Internal server error"}, status=500)
+
+
 def get_all_customers(request):
     customers = customer_details.objects.all()
 
@@ -2,85 +2,288 @@
 # File: train_model_from_csv.py
 # Description: Train a Collaborative Filtering (SVD) model
 # using your prepared dataset (train.csv, val.csv, test.csv)
+#
+#   python train_model_from_csv.py                    # default config
+#   python train_model_from_csv.py --search grid      # full grid, in parallel
+#   python train_model_from_csv.py --search random --n-iter 20 --jobs 8
+#
+# Search: every config is fitted on train.csv and scored on val.csv
+# (RMSE + ranking metrics@k); the best one is refitted on train + val,
+# evaluated on test.csv and saved.
 # ============================================================
 
-import pandas as pd
-from surprise import Dataset, Reader, SVD, accuracy
-from surprise.model_selection import train_test_split
-import pickle
+import argparse
+import multiprocessing
 import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import ParameterGrid, ParameterSampler
+from surprise import Dataset, Reader, SVD
+
+RATING_SCALE = (1, 5)
+RELEVANT_RATING = 4.0   # held-out ratings at or above this count as relevant for ranking
+DEFAULT_PARAMS = {"n_factors": 50, "n_epochs": 25, "lr_all": 0.005, "reg_all": 0.02}
+PARAM_GRID = {
+    "n_factors": [20, 50, 100],
+    "n_epochs": [20, 40],
+    "lr_all": [0.002, 0.005, 0.01],
+    "reg_all": [0.02, 0.05, 0.1],
+}
+METRICS = ("rmse", "precision", "recall", "ndcg")
+SCORE_BLOCK = 1024      # users scored per matrix product
+
 
 # ------------------------------------------------------------
 # 1️⃣ Load datasets
 # ------------------------------------------------------------
-print("📥 Loading datasets...")
-train_path = "train.csv"
-val_path = "val.csv"
-test_path = "test.csv"
+def load_datasets(train_path="train.csv", val_path="val.csv", test_path="test.csv"):
+    print("📥 Loading datasets...")
+    train_df = pd.read_csv(train_path)
+    val_df = pd.read_csv(val_path)
+    test_df = pd.read_csv(test_path)
+    print(f"✅ Loaded: {len(train_df)} train, {len(val_df)} val, {len(test_df)} test records")
+    return train_df, val_df, test_df
+
 
-train_df = pd.read_csv(train_path)
-val_df = pd.read_csv(val_path)
-test_df = pd.read_csv(test_path)
+def build_trainset(df):
+    """Surprise needs: user, item, rating."""
+    reader = Reader(rating_scale=RATING_SCALE)
+    return Dataset.load_from_df(df[["user_idx", "item_idx", "rating"]], reader).build_full_trainset()
 
-print(f"✅ Loaded: {len(train_df)} train, {len(val_df)} val, {len(test_df)} test records")
 
 # ------------------------------------------------------------
-# 2️⃣ Combine train + val for full training (optional)
+# 2️⃣ Vectorized scoring straight from pu / qi / bu / bi
 # ------------------------------------------------------------
-full_train_df = pd.concat([train_df, val_df], ignore_index=True)
+class FactorScorer:
+    """
+    SVD.estimate() for many (user, item) pairs at once:
 
-# Surprise needs: user, item, rating
-reader = Reader(rating_scale=(1, 5))
-data = Dataset.load_from_df(full_train_df[['user_idx', 'item_idx', 'rating']], reader)
+        est = mu + bu[u] + bi[i] + qi[i] · pu[u]      (biased=True)
+        est = qi[i] · pu[u]                            (biased=False)
 
-# ------------------------------------------------------------
-# 3️⃣ Split data for quick evaluation
-# ------------------------------------------------------------
-trainset, testset = train_test_split(data, test_size=0.2, random_state=42)
+    where each bias / dot term only applies when the user / item is known;
+    an unbiased model falls back to mu unless both are known. Clipped to the
+    rating scale exactly like algo.predict().
+    """
 
-# ------------------------------------------------------------
-# 4️⃣ Train SVD (Matrix Factorization)
-# ------------------------------------------------------------
-print("🚀 Training SVD model...")
-algo = SVD(n_factors=50, n_epochs=25, lr_all=0.005, reg_all=0.02)
-algo.fit(trainset)
+    def __init__(self, algo, trainset):
+        self.mu = trainset.global_mean
+        self.biased = algo.biased
+        self.pu, self.qi = algo.pu, algo.qi
+        self.bu, self.bi = (algo.bu, algo.bi) if algo.biased else (None, None)
+        self.user_index = {trainset.to_raw_uid(u): u for u in trainset.all_users()}
+        self.item_ids = np.array([trainset.to_raw_iid(i) for i in trainset.all_items()])
+        self.item_index = {raw: i for i, raw in enumerate(self.item_ids.tolist())}
+        self.lower, self.upper = trainset.rating_scale
+        self.trainset = trainset
+
+    def _inner(self, index, raw_ids):
+        return pd.Series(raw_ids).map(index).fillna(-1).to_numpy(dtype=np.int64)
+
+    def predict(self, users, items):
+        """Estimates for aligned arrays of raw user / item ids."""
+        u, i = self._inner(self.user_index, users), self._inner(self.item_index, items)
+        known_u, known_i = u >= 0, i >= 0
+        both = known_u & known_i
+        est = np.full(len(u), self.mu, dtype=np.float64)
+        if self.biased:
+            est[known_u] += self.bu[u[known_u]]
+            est[known_i] += self.bi[i[known_i]]
+        else:
+            est[both] = 0.0
+        est[both] += np.einsum("ij,ij->i", self.qi[i[both]], self.pu[u[both]])
+        return np.clip(est, self.lower, self.upper)
+
+    def score_rows(self, rows):
+        """Dense (len(rows) x n_items) estimates for inner user ids."""
+        scores = self.pu[rows] @ self.qi.T
+        if self.biased:
+            scores += self.mu + self.bu[rows, None] + self.bi[None, :]
+        return np.clip(scores, self.lower, self.upper)
+
+    def top_n(self, raw_user, top_n=5, exclude_rated=False):
+        """[(raw item id, estimate), ...] best first over the training items."""
+        u = self.user_index.get(raw_user)
+        if u is None:
+            # unknown user: same fallback as predict() (mu + bi, or mu unbiased)
+            scores = self.predict([raw_user] * len(self.item_ids), self.item_ids)
+        else:
+            scores = self.score_rows([u])[0]
+            if exclude_rated:
+                scores[[i for i, _ in self.trainset.ur[u]]] = -np.inf
+        n = min(top_n, int(np.isfinite(scores).sum()))
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.item_ids[i].item(), float(scores[i])) for i in top]
 
-# ------------------------------------------------------------
-# 5️⃣ Evaluate model performance
-# ------------------------------------------------------------
-predictions = algo.test(testset)
-rmse = accuracy.rmse(predictions)
-print(f"📊 RMSE: {rmse:.4f}")
 
 # ------------------------------------------------------------
-# 6️⃣ Save trained model
+# 3️⃣ Evaluation (RMSE + ranking metrics@k on held-out ratings)
 # ------------------------------------------------------------
-model_dir = "models"
-os.makedirs(model_dir, exist_ok=True)
-model_path = os.path.join(model_dir, "recommender_model.pkl")
+def evaluate(algo, trainset, heldout_df, k=10, relevant=RELEVANT_RATING):
+    scorer = FactorScorer(algo, trainset)
+    est = scorer.predict(heldout_df["user_idx"].to_numpy(), heldout_df["item_idx"].to_numpy())
+    rmse = float(np.sqrt(np.mean((est - heldout_df["rating"].to_numpy(dtype=np.float64)) ** 2)))
 
-with open(model_path, "wb") as f:
-    pickle.dump(algo, f)
+    # ranking: unseen training items per known user, relevant = held-out ratings >= `relevant`
+    liked = heldout_df[heldout_df["rating"] >= relevant]
+    u = scorer._inner(scorer.user_index, liked["user_idx"].to_numpy())
+    i = scorer._inner(scorer.item_index, liked["item_idx"].to_numpy())
+    keep = (u >= 0) & (i >= 0)
+    relevant_items = pd.Series(i[keep]).groupby(u[keep]).agg(set)
+    users = relevant_items.index.to_numpy()
+
+    totals = {"precision": 0.0, "recall": 0.0, "ndcg": 0.0}
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    k_eff = min(k, len(scorer.item_ids))
+    for start in range(0, len(users) if k_eff else 0, SCORE_BLOCK):
+        rows = users[start:start + SCORE_BLOCK]
+        scores = scorer.score_rows(rows)
+        for pos, row in enumerate(rows):
+            scores[pos, [item for item, _ in trainset.ur[row]]] = -np.inf
+        top = np.argpartition(-scores, k_eff - 1, axis=1)[:, :k_eff]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        for row, ranked in zip(rows, top):
+            truth = relevant_items[row]
+            hits = np.fromiter((item in truth for item in ranked), dtype=bool, count=len(ranked))
+            ideal = discounts[:min(len(truth), k)].sum()
+            totals["precision"] += hits.sum() / k
+            totals["recall"] += hits.sum() / len(truth)
+            totals["ndcg"] += (discounts[:len(ranked)][hits]).sum() / ideal
+    n = max(len(users), 1)
+    return {"rmse": rmse, **{name: float(total / n) for name, total in totals.items()}, "users": int(len(users))}
 
-print(f"✅ Model saved to {model_path}")
 
 # ------------------------------------------------------------
-# 7️⃣ Quick sanity test (recommendations)
+# 4️⃣ Parallel hyperparameter search
 # ------------------------------------------------------------
-def recommend_for_user(algo, user_id, all_items, top_n=5):
-    """Generate top-N recommendations for a user."""
-    user_items = []
-    for iid in all_items:
-        est = algo.predict(user_id, iid).est
-        user_items.append((iid, est))
-    ranked = sorted(user_items, key=lambda x: x[1], reverse=True)[:top_n]
-    return ranked
-
-# test recommend for first user
-unique_items = train_df['item_idx'].unique().tolist()
-sample_user = int(train_df['user_idx'].iloc[0])
-top_recs = recommend_for_user(algo, sample_user, unique_items)
-
-print(f"\n🎯 Top Recommendations for user {sample_user}:")
-for iid, score in top_recs:
-    print(f"  Item {iid} → predicted rating {score:.2f}")
+_shared = {}
+
+
+def _init_worker(trainset, val_df, k, random_state):
+    # fork: inherited as-is (nothing pickled); spawn: pickled once per worker
+    _shared.update(trainset=trainset, val_df=val_df, k=k, random_state=random_state)
+
+
+def _fit_config(params):
+    started = time.perf_counter()
+    try:
+        algo = SVD(random_state=_shared["random_state"], **params)
+        algo.fit(_shared["trainset"])
+        metrics = evaluate(algo, _shared["trainset"], _shared["val_df"], k=_shared["k"])
+    except Exception as e:
+        return {"params": params, "error": str(e)}
+    return {"params": params, **metrics, "seconds": time.perf_counter() - started}
+
+
+def candidate_configs(search="grid", grid=PARAM_GRID, n_iter=20, random_state=42):
+    if search == "grid":
+        return list(ParameterGrid(grid))
+    if search == "random":
+        return list(ParameterSampler(grid, n_iter=n_iter, random_state=random_state))
+    return [DEFAULT_PARAMS]
+
+
+def select_best(results, metric="rmse"):
+    """Lowest RMSE (or highest ranking metric); the other metric breaks ties."""
+    ok = [r for r in results if "error" not in r]
+    if not ok:
+        return None
+    if metric == "rmse":
+        return min(ok, key=lambda r: (round(r["rmse"], 4), -r["ndcg"]))
+    return max(ok, key=lambda r: (round(r[metric], 4), -r["rmse"]))
+
+
+def run_search(trainset, val_df, configs, k=10, n_jobs=None, random_state=0):
+    """Fit every config on `trainset`, score on `val_df`, fanned out over a process pool."""
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(configs))
+    print(f"🔎 Searching {len(configs)} configs on {n_jobs} worker(s)...")
+    if n_jobs > 1:
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() else None
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=context, initializer=_init_worker,
+                                 initargs=(trainset, val_df, k, random_state)) as pool:
+            results = list(pool.map(_fit_config, configs))
+    else:
+        _init_worker(trainset, val_df, k, random_state)
+        results = [_fit_config(params) for params in configs]
+
+    for r in sorted(results, key=lambda r: r.get("rmse", np.inf)):
+        if "error" in r:
+            print(f"  ⚠️ {r['params']}: {r['error']}")
+        else:
+            print(f"  {r['params']} → RMSE {r['rmse']:.4f}  P@{k} {r['precision']:.4f}  "
+                  f"R@{k} {r['recall']:.4f}  NDCG@{k} {r['ndcg']:.4f}  ({r['seconds']:.1f}s)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the surprise SVD recommender from train/val/test CSVs")
+    parser.add_argument("--search", choices=["none", "grid", "random"], default="none")
+    parser.add_argument("--n-iter", type=int, default=20, help="Configs sampled by --search random")
+    parser.add_argument("--metric", choices=METRICS, default="rmse", help="Validation metric that picks the best config")
+    parser.add_argument("--k", type=int, default=10, help="Cut-off for the ranking metrics")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--model-dir", default="models")
+    args = parser.parse_args()
+
+    train_df, val_df, test_df = load_datasets()
+
+    # ------------------------------------------------------------
+    # 5️⃣ Pick the hyperparameters on train -> val
+    # ------------------------------------------------------------
+    params = DEFAULT_PARAMS
+    if args.search != "none":
+        results = run_search(build_trainset(train_df), val_df, candidate_configs(args.search, n_iter=args.n_iter,
+                             random_state=args.seed), k=args.k, n_jobs=args.jobs, random_state=args.seed)
+        best = select_best(results, args.metric)
+        if best is None:
+            print("❌ Every config failed; keeping the defaults.")
+        else:
+            params = best["params"]
+            print(f"🏆 Best by {args.metric}: {params}")
+
+    # ------------------------------------------------------------
+    # 6️⃣ Train SVD (Matrix Factorization) on train + val
+    # ------------------------------------------------------------
+    print("🚀 Training SVD model...")
+    full_train_df = pd.concat([train_df, val_df], ignore_index=True)
+    trainset = build_trainset(full_train_df)
+    algo = SVD(random_state=args.seed, **params)
+    algo.fit(trainset)
+
+    # ------------------------------------------------------------
+    # 7️⃣ Evaluate model performance on the held-out test set
+    # ------------------------------------------------------------
+    metrics = evaluate(algo, trainset, test_df, k=args.k)
+    print(f"📊 RMSE: {metrics['rmse']:.4f}  P@{args.k}: {metrics['precision']:.4f}  "
+          f"R@{args.k}: {metrics['recall']:.4f}  NDCG@{args.k}: {metrics['ndcg']:.4f}")
+
+    # ------------------------------------------------------------
+    # 8️⃣ Save trained model
+    # ------------------------------------------------------------
+    os.makedirs(args.model_dir, exist_ok=True)
+    model_path = os.path.join(args.model_dir, "recommender_model.pkl")
+    with open(model_path, "wb") as f:
+        pickle.dump(algo, f)
+    print(f"✅ Model saved to {model_path}")
+
+    # ------------------------------------------------------------
+    # 9️⃣ Quick sanity test (recommendations)
+    # ------------------------------------------------------------
+    sample_user = int(train_df["user_idx"].iloc[0])
+    top_recs = FactorScorer(algo, trainset).top_n(sample_user, top_n=5)
+    print(f"\n🎯 Top Recommendations for user {sample_user}:")
+    for iid, score in top_recs:
+        print(f"  Item {iid} → predicted rating {score:.2f}")
+
+
+if __name__ == "__main__":
+    main()